@@ -1,165 +1,719 @@
 from positional_data import *
+from ChessBoard import DEFAULT_EVAL_TABLES, MAX_PHASE, SQUARES, TYPE_MASK, PAWN, QUEEN, WHITE
+from TranspositionTable import TranspositionTable, BOUND_EXACT, BOUND_LOWER, BOUND_UPPER
+from PawnStructure import PawnHashTable
+from SearchStats import SearchStats
+from Utils import move_to_uci
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import math
+import multiprocessing
 import random
+import threading
+import time
+
+MATE_SCORE = 100000
+TB_WIN_SCORE = MATE_SCORE // 2  # a tablebase win, below any mate the search finds itself
+MAX_DEPTH = 63  # the transposition table stores depth in six bits
+DEFAULT_DEPTH = 2  # used when select_move gets neither a depth nor a time budget
+TIME_CHECK_INTERVAL = 256  # nodes between deadline checks, must be a power of two
+MAX_PLY = 128
+MATE_BOUND = MATE_SCORE - MAX_PLY  # scores beyond this are mates, MATE_SCORE less the plies to mate
+DISTANCE_BOUND = TB_WIN_SCORE - MAX_PLY  # scores beyond this, mates and tablebase wins, count plies from the root
+
+# Move ordering tiers: hash/PV move, then captures and queen promotions, then killers, then history
+FIRST_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 24
+KILLER_SCORE = 1 << 20
+HISTORY_LIMIT = KILLER_SCORE >> 1  # history is halved once any entry reaches this
+ORDERING_VALUES = (0, 1, 3, 3, 5, 9, 20)  # MVV-LVA weights by piece type code
+PROMOTION_SCORES = {'queen': CAPTURE_SCORE + 800, 'rook': -3, 'bishop': -2, 'knight': -1}
+
+# Selective search techniques; Player(features=...) turns any subset on, all by default
+SEARCH_FEATURES = ('pvs', 'null_move', 'lmr', 'futility', 'check_extensions')
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+LMR_MIN_DEPTH = 3
+LMR_FULL_MOVES = 3  # moves searched at full depth before late-move reductions start
+# Plies to reduce by remaining depth and move index, growing with the logarithm of both
+LMR_REDUCTIONS = [[int(0.75 + math.log(depth) * math.log(index) / 2.25) if depth and index else 0
+                   for index in range(64)] for depth in range(MAX_DEPTH + 1)]
+FUTILITY_MARGINS = (0, 100, 250)  # by remaining depth, so only depths 1 and 2 are pruned
+DELTA_MARGIN = 100  # positional swing a capture may bring beyond the captured piece's table value
+
+def score_to_table(score, ply):
+    """Make a score that counts plies from the root count them from this node instead, for the table."""
+    if score >= DISTANCE_BOUND:
+        return score + ply
+    if score <= -DISTANCE_BOUND:
+        return score - ply
+    return score
+
+def score_from_table(score, ply):
+    """Undo score_to_table for a node at ply, which may be reached by another path than the stored one."""
+    if score >= DISTANCE_BOUND:
+        return score - ply
+    if score <= -DISTANCE_BOUND:
+        return score + ply
+    return score
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the move deadline has passed."""
+
+# Per-process state of root-splitting workers, set up by _init_worker
+_worker_player = None
+_worker_alpha = None
+_worker_search_id = None
+
+def _init_worker(color, hash_mb, shared_alpha, shared_stop, tablebase=None, features=SEARCH_FEATURES,
+                 pawn_hash_mb=1, eval_tables=None):
+    global _worker_player, _worker_alpha
+    _worker_player = Player(color, human=False, hash_mb=hash_mb, eval_tables=eval_tables, tablebase=tablebase,
+                            features=features, pawn_hash_mb=pawn_hash_mb)
+    _worker_player.stop_event = shared_stop
+    _worker_alpha = shared_alpha
+
+def _search_root_move(search_id, board_class, fen, move, depth, alpha, deadline):
+    """
+    Search one root move in a worker process against the best alpha known so far.
+    Returns (move, score, exact, nodes, stats, line), with score None if the deadline
+    passed. A move that fails low only gets an upper bound, which may equal another
+    move's exact score, so exact is set only when the score beat the alpha searched with.
+    """
+    global _worker_search_id
+    player = _worker_player
+    if search_id != _worker_search_id:
+        # Killers and table age carry over between iterations but not between moves of the game
+        _worker_search_id = search_id
+        player.killers = [[None, None] for _ in range(MAX_PLY)]
+        player.age_history()
+        player.transposition_table.new_search()
+    player.deadline = deadline
+    player.nodes = 0
+    player.stats = SearchStats()
+    table = player.transposition_table
+    table.reset_stats()
+    player.pawn_table.reset_stats()
+
+    chess_board = board_class.from_fen(fen)
+    chess_board.set_eval_tables(player.eval_tables)
+    chess_board.make_move(move)
+    alpha = max(alpha, _worker_alpha.value)
+    try:
+        score = player.search_root_move(chess_board, depth, alpha, first=False)
+    except SearchTimeout:
+        return move, None, False, player.nodes, None, []
+    finally:
+        player.deadline = None
+    player.stats.tt_probes, player.stats.tt_hits, player.stats.tt_cutoffs = table.probes, table.hits, table.cutoffs
+    player.stats.pawn_probes, player.stats.pawn_hits = player.pawn_table.probes, player.pawn_table.hits
+
+    exact = score > alpha
+    if exact:
+        with _worker_alpha.get_lock():
+            if score > _worker_alpha.value:
+                _worker_alpha.value = score
+    return move, score, exact, player.nodes, player.stats.as_dict(), player.collect_pv(chess_board, depth - 1)
 
 class Player:
-    def __init__(self, color, human=True) -> None:
+    def __init__(self, color, human=True, hash_mb=16, workers=1, eval_tables=None, time_phases=False,
+                 stats_path=None, book=None, tablebase=None, features=SEARCH_FEATURES, pawn_hash_mb=1) -> None:
         self.color = color
         self.move = 0
-        self.endgame = 0
         self.human = human
-        self.pruning_counter = 0
+        self.stats = SearchStats()  # statistics of the latest select_move
+        self.stats_path = stats_path  # append each move's statistics to this file as a JSON line
+        self.hash_mb = hash_mb
+        self.transposition_table = TranspositionTable(hash_mb)
+        self.pawn_hash_mb = pawn_hash_mb
+        self.pawn_table = PawnHashTable(pawn_hash_mb)  # pawn structure terms by pawn-only key
+        self.workers = workers  # processes for root splitting; 1 searches serially and deterministically
+        self._pool = None
+        self._shared_alpha = None
+        self._shared_stop = None
+        self._search_id = 0
+        self.root_lines = {}  # root move -> best line below it, from the workers
+        # (midgame, endgame) tables from build_piece_square_tables to evaluate with. The board keeps its
+        # totals with them for the length of each search, so two Players with different tables can play
+        # each other at the same speed
+        self.eval_tables = eval_tables or DEFAULT_EVAL_TABLES
+        # Largest evaluation change capturing each piece type can bring, for delta pruning in quiescence
+        midgame, endgame = self.eval_tables
+        self.capture_gains = [max((max(abs(midgame[WHITE | piece_type][sq]), abs(endgame[WHITE | piece_type][sq]))
+                                   for sq in SQUARES), default=0) if piece_type else 0 for piece_type in range(7)]
+        self.nodes = 0
+        self.deadline = None
+        self.stop_event = threading.Event()  # set by stop() from another thread to end the search
+        self.on_iteration = None  # called with (depth, score, nodes, seconds, pv) after each iteration
+        self.pv_moves = {}  # hash key -> move along the previous iteration's best line
+        self.principal_variation = []
+        self.completed_depth = 0
+        self.best_score = 0
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [0] * (2 * 64 * 64)  # side, start square, end square
+        if time_phases:
+            # Timing every call costs speed, so the timed wrappers only shadow the methods when asked for
+            self.valid_moves = self._timed('movegen', self.valid_moves)
+            self.capture_moves = self._timed('movegen', self.capture_moves)
+            self.score_chessboard = self._timed('eval', self.score_chessboard)
+            self.order_moves = self._timed('ordering', self.order_moves)
+        self.book = book  # OpeningBook consulted before the built-in opening_book
+        self.tablebase = tablebase  # Tablebase probed at the root and inside the search
+        unknown = set(features) - set(SEARCH_FEATURES)
+        if unknown:
+            raise ValueError(f'Unknown search features: {sorted(unknown)}')
+        self.features = frozenset(features)
         self.choose_opening()  # Initialize the opening book when creating a Player
+
+    def _timed(self, phase, method):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.stats.phase_time[phase] += time.perf_counter() - start
+        return timed
         
     def valid_moves(self, chess_board, color):
-        board = chess_board.board
-        all_valid_moves = []
-        for rank in range(8):
-            for file in range(8):
-                cell = board[rank][file]
-                if cell.piece and color == cell.piece.color:
-                    start = (rank, file)
-                    for i in range(8):
-                        for j in range(8):
-                            end = (i, j)
-                            if cell.piece.is_valid_move(start, end, chess_board):
-                                all_valid_moves.append((start, end))
-        return all_valid_moves
+        return chess_board.generate_moves(color)
+
+    def capture_moves(self, chess_board, color):
+        return chess_board.generate_captures(color)
     
     def sort_valid_moves(self, valid_moves, chess_board):
+        return self.order_moves(chess_board, valid_moves)
+
+    def order_moves(self, chess_board, moves, first_move=None, ply=None):
+        """
+        Order moves without playing them: first_move (hash or PV move), then
+        captures by most valuable victim / least valuable attacker and queen
+        promotions, then this ply's killer moves, then the history table.
+        """
+        squares = chess_board.squares
+        en_passant = chess_board.en_passant
+        killers = self.killers[ply] if ply is not None and ply < MAX_PLY else (None, None)
+        history = self.history
+        side = 0 if chess_board.to_move == 'white' else 4096
+
         def orderer(move):
-            future_board = chess_board.clone()
-            future_board.push(move[0], move[1])
-            return self.score_chessboard(future_board)
+            if move == first_move:
+                return FIRST_MOVE_SCORE
+            start, end = move[0], move[1]
+            end_square = 21 + end[0] * 10 + end[1]
+            attacker = squares[21 + start[0] * 10 + start[1]] & TYPE_MASK
+            victim = squares[end_square] & TYPE_MASK
+            if attacker == PAWN and end_square == en_passant:
+                victim = PAWN
+            score = 0
+            if victim:
+                score = CAPTURE_SCORE + ORDERING_VALUES[victim] * 100 - ORDERING_VALUES[attacker]
+            if len(move) > 2:
+                score += PROMOTION_SCORES[move[2]]
+            if score:
+                return score
+            if move == killers[0]:
+                return KILLER_SCORE + 1
+            if move == killers[1]:
+                return KILLER_SCORE
+            return history[side + (start[0] * 8 + start[1]) * 64 + end[0] * 8 + end[1]]
+
+        return sorted(moves, key=orderer, reverse=True)
+
+    def record_cutoff(self, chess_board, move, depth, ply, move_index):
+        """Update killers and history after move caused a beta cutoff."""
+        self.stats.cutoffs += 1
+        if move_index == 0:
+            self.stats.first_move_cutoffs += 1
+        if chess_board.is_capture(move[0], move[1]) or len(move) > 2:
+            return
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        start, end = move[0], move[1]
+        index = (0 if chess_board.to_move == 'white' else 4096) + (start[0] * 8 + start[1]) * 64 + end[0] * 8 + end[1]
+        self.history[index] += depth * depth
+        if self.history[index] >= HISTORY_LIMIT:
+            self.age_history()
+
+    def age_history(self):
+        self.history = [value >> 1 for value in self.history]
+
+    def ordering_stats(self):
+        stats = self.stats.as_dict()
+        return {name: stats[name] for name in ('cutoffs', 'first_move_cutoffs', 'first_move_cutoff_rate')}
 
-        sorted_valid_moves = sorted(valid_moves, key=orderer, reverse=(self.color=='white'))
-        return sorted_valid_moves
-    
     def score_chessboard(self, chess_board):
         # Check for checkmate/stalemate
         if chess_board.game_over:
-            if chess_board.is_checkmate:
-                return float('-inf') if chess_board.to_move == self.color else float('inf')
+            if chess_board.is_check(chess_board.to_move):
+                return -MATE_SCORE if chess_board.to_move == self.color else MATE_SCORE
             return 0  # Draw
 
-        white_score = 0
-        black_score = 0
-        
-        # Detect endgame when material is low
-        total_material = 0
-        for row in chess_board.board:
-            for cell in row:
-                if cell.piece and cell.piece.type != 'king':
-                    total_material += piece_values.get(cell.piece.type, 0)
-        
-        self.endgame = 1 if total_material < 30 else 0
-
-        for row in chess_board.board:
-            for cell in row:
-                piece = cell.piece
-                if piece:
-                    value = piece_values.get(piece.type, 0)
-                    if piece.color == 'white':
-                        white_score += value
-                        white_score += postional_values(piece.type, self.endgame, 'white')[piece.coord[0]][piece.coord[1]]
-                    else:
-                        black_score += value
-                        black_score += postional_values(piece.type, self.endgame, 'black')[piece.coord[0]][piece.coord[1]]
-        
-        return white_score - black_score if self.color == 'white' else black_score - white_score
+        # The board keeps material and piece-square totals up to date on every move,
+        # so evaluation is a blend of the middlegame and endgame totals by game phase
+        phase = min(chess_board.phase, MAX_PHASE)
+        midgame_score, endgame_score = chess_board.midgame_score, chess_board.endgame_score
+        if chess_board.eval_tables is not self.eval_tables:
+            # Outside a search the board may keep its totals with other tables, so count them here
+            midgame, endgame = self.eval_tables
+            squares = chess_board.squares
+            midgame_score = endgame_score = 0
+            for sq in SQUARES:
+                code = squares[sq]
+                if code:
+                    midgame_score += midgame[code][sq]
+                    endgame_score += endgame[code][sq]
+        # Pawn structure only changes with pawn moves and captures, so it is nearly always cached
+        pawn_midgame, pawn_endgame = self.pawn_table.evaluate(chess_board)
+        midgame_score += pawn_midgame
+        endgame_score += pawn_endgame
+        score = (midgame_score * phase + endgame_score * (MAX_PHASE - phase)) // MAX_PHASE
+        return score if self.color == 'white' else -score
+
+    def check_deadline(self):
+        if self.stop_event.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline):
+            raise SearchTimeout()
+
+    def stop(self):
+        """Ask a running select_move to return its best move so far; safe to call from another thread."""
+        self.stop_event.set()
+        if self._shared_stop is not None:
+            self._shared_stop.set()
+
+    def quiescence(self, chess_board, alpha, beta, depth=4, ply=0):
+        """
+        Negamax search of captures and queen promotions until the position is
+        quiet, scored from the side to move's point of view. Captures that
+        lose material by static exchange, or that cannot bring the score back
+        up to alpha, are skipped. In check every evasion is searched instead.
+        """
+        self.nodes += 1
+        if not self.nodes & (TIME_CHECK_INTERVAL - 1):
+            self.check_deadline()
+        stats = self.stats
+        stats.qnodes += 1
+        if ply > stats.seldepth:
+            stats.seldepth = ply
 
-    def quiescence(self, chess_board, alpha, beta, depth=4):
         stand_pat = self.score_chessboard(chess_board)
-        
+        to_move = chess_board.to_move
+        if to_move != self.color:
+            stand_pat = -stand_pat
         if depth == 0:
             return stand_pat
-        
-        if stand_pat >= beta:
-            return beta
-        
-        alpha = max(alpha, stand_pat)
-        
-        # Only consider captures
-        for move in self.sort_valid_moves(self.valid_moves(chess_board, chess_board.to_move), chess_board):
-            if chess_board.is_capture(move[0], move[1]):
-                future_board = chess_board.clone()
-                future_board.push(move[0], move[1])
-                score = -self.quiescence(future_board, -beta, -alpha, depth - 1)
-                
+
+        if chess_board.is_check(to_move):
+            # Standing pat is not an option in check, and having no evasion is mate
+            moves = self.valid_moves(chess_board, to_move)
+            if not moves:
+                return -MATE_SCORE + ply
+            moves = self.order_moves(chess_board, moves)
+        else:
+            if stand_pat >= beta:
+                return beta
+            alpha = max(alpha, stand_pat)
+            squares = chess_board.squares
+            capture_gains = self.capture_gains
+            moves = []
+            for move in self.order_moves(chess_board, self.capture_moves(chess_board, to_move)):
+                end = 21 + move[1][0] * 10 + move[1][1]
+                captured = squares[end] & TYPE_MASK
+                if not captured and len(move) == 2:
+                    captured = PAWN  # en passant
+                gain = capture_gains[captured]
+                if len(move) > 2:
+                    gain += capture_gains[QUEEN]
+                if stand_pat + gain + DELTA_MARGIN <= alpha:
+                    continue
+                if chess_board.static_exchange(move) < 0:
+                    continue
+                moves.append(move)
+
+        for move in moves:
+            chess_board.make_move(move)
+            score = -self.quiescence(chess_board, -beta, -alpha, depth - 1, ply + 1)
+            chess_board.unmake_move()
+            if score >= beta:
+                return beta
+            alpha = max(alpha, score)
+        return alpha
+
+    def negamax(self, chess_board, depth, alpha, beta, ply=1, null_allowed=True):
+        """
+        Principal variation search, scored from the side to move's point of
+        view. The first move gets the full window and later ones a null window,
+        searched again in full only if they beat alpha. Which selective
+        techniques apply is set by the Player's features.
+        """
+        # Within the tables the result is known, so the search below this node can be skipped
+        tablebase = self.tablebase
+        if tablebase is not None and chess_board.piece_count <= tablebase.max_pieces:
+            result = tablebase.probe(chess_board, with_dtm=False)
+            if result is not None:
+                self.stats.tb_hits += 1
+                # Nearer wins score higher, so the search heads for the conversion
+                return result[0] * (TB_WIN_SCORE - ply)
+
+        features = self.features
+        to_move = chess_board.to_move
+        in_check = chess_board.is_check(to_move)
+        if in_check and 'check_extensions' in features and ply < MAX_DEPTH:
+            depth += 1
+        if depth <= 0:
+            return self.quiescence(chess_board, alpha, beta, ply=ply)
+
+        self.nodes += 1
+        if not self.nodes & (TIME_CHECK_INTERVAL - 1):
+            self.check_deadline()
+
+        # Reuse an earlier result for this position when it is deep enough to decide the node
+        table = self.transposition_table
+        key = chess_board.hash_key
+        tt_move = None
+        entry = table.probe(key)
+        if entry:
+            tt_depth, tt_score, tt_bound, tt_move = entry
+            tt_score = score_from_table(tt_score, ply)
+            if tt_depth >= depth and (tt_bound == BOUND_EXACT
+                                      or (tt_bound == BOUND_LOWER and tt_score >= beta)
+                                      or (tt_bound == BOUND_UPPER and tt_score <= alpha)):
+                table.cutoffs += 1
+                return tt_score
+
+        # Pruning decisions rest on the static evaluation, and are never made in check or, under PVS, on the PV
+        pvs = 'pvs' in features
+        futile = False
+        if not in_check and (beta - alpha <= 1 or not pvs):
+            static_eval = self.score_chessboard(chess_board)
+            if to_move != self.color:
+                static_eval = -static_eval
+            # Null move: if passing still holds beta, a real move will too. Positions with only
+            # pawns left are where passing is often the best move, so they are left alone
+            if ('null_move' in features and null_allowed and depth >= NULL_MOVE_MIN_DEPTH
+                    and static_eval >= beta and chess_board.has_non_pawn_material(to_move)):
+                chess_board.make_null_move()
+                score = -self.negamax(chess_board, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1, ply + 1, False)
+                chess_board.unmake_move()
                 if score >= beta:
+                    self.stats.null_cutoffs += 1
                     return beta
-                alpha = max(alpha, score)
-        
-        return alpha
+            # Futility: near the horizon, quiet moves cannot lift a hopeless evaluation up to alpha
+            futile = ('futility' in features and depth < len(FUTILITY_MARGINS)
+                      and static_eval + FUTILITY_MARGINS[depth] <= alpha)
 
-    def minimax(self, chess_board, depth, alpha, beta, is_maximizing_player):
-        if depth == 0 or chess_board.game_over:
-            return self.quiescence(chess_board, alpha, beta)
-        
-        valid_moves = self.valid_moves(chess_board, chess_board.to_move)
-        if not valid_moves:  # No valid moves available
-            return float('-inf') if is_maximizing_player else float('inf')
-
-        if is_maximizing_player:
-            max_eval = float('-inf')
-            for move in self.sort_valid_moves(valid_moves, chess_board):
-                future_board = chess_board.clone()
-                future_board.push(move[0], move[1])
-                eval = self.minimax(future_board, depth - 1, alpha, beta, False)
-                max_eval = max(max_eval, eval)
-                alpha = max(alpha, eval)
-                if beta <= alpha:
-                    self.pruning_counter += 1
-                    break
-            return max_eval
+        valid_moves = self.valid_moves(chess_board, to_move)
+        if not valid_moves:  # Checkmate or stalemate, nearer mates scoring further from zero
+            return -MATE_SCORE + ply if in_check else 0
+
+        # The previous iteration's best line goes first, then the table's best move
+        ordered_moves = self.order_moves(chess_board, valid_moves, self.pv_moves.get(key, tt_move), ply)
+
+        reduce_late = 'lmr' in features and depth >= LMR_MIN_DEPTH and not in_check
+        alpha_original = alpha
+        best_score = float('-inf')
+        best_move = None
+        for index, move in enumerate(ordered_moves):
+            quiet = len(move) == 2 and not chess_board.is_capture(move[0], move[1])
+            chess_board.make_move(move)
+            gives_check = (futile or reduce_late) and quiet and chess_board.is_check(chess_board.to_move)
+            if futile and index and quiet and not gives_check:
+                chess_board.unmake_move()
+                self.stats.futility_prunes += 1
+                continue
+
+            if index == 0:
+                score = -self.negamax(chess_board, depth - 1, -beta, -alpha, ply + 1)
+            else:
+                # Late quiet moves are searched shallower first, and again at full depth if they beat alpha
+                reduction = 0
+                if reduce_late and index >= LMR_FULL_MOVES and quiet and not gives_check:
+                    reduction = min(LMR_REDUCTIONS[min(depth, MAX_DEPTH)][min(index, 63)], depth - 2)
+                window = alpha + 1 if pvs else beta
+                score = -self.negamax(chess_board, depth - 1 - reduction, -window, -alpha, ply + 1)
+                if reduction > 0 and score > alpha:
+                    self.stats.lmr_researches += 1
+                    score = -self.negamax(chess_board, depth - 1, -window, -alpha, ply + 1)
+                if pvs and alpha < score < beta:
+                    score = -self.negamax(chess_board, depth - 1, -beta, -alpha, ply + 1)
+            chess_board.unmake_move()
+
+            if score > best_score:
+                best_score, best_move = score, move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                self.record_cutoff(chess_board, move, depth, ply, index)
+                break
+
+        if best_score <= alpha_original:
+            bound = BOUND_UPPER
+        elif best_score >= beta:
+            bound = BOUND_LOWER
         else:
-            min_eval = float('inf')
-            for move in self.sort_valid_moves(valid_moves, chess_board):
-                future_board = chess_board.clone()
-                future_board.push(move[0], move[1])
-                eval = self.minimax(future_board, depth - 1, alpha, beta, True)
-                min_eval = min(min_eval, eval)
-                beta = min(beta, eval)
-                if beta <= alpha:
-                    self.pruning_counter += 1
-                    break
-            return min_eval
+            bound = BOUND_EXACT
+        table.store(key, depth, score_to_table(best_score, ply), bound, best_move)
+        return best_score
 
     def choose_opening(self):
         # Simple opening book
         self.opening_book = {
             "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -": [
-                ((6, 4), (4, 4)),  # e4
-                ((6, 3), (4, 3)),  # d4
+                ((1, 4), (3, 4)),  # e4
+                ((1, 3), (3, 3)),  # d4
+            ],
+            "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3": [
+                ((6, 4), (4, 4)),  # e5
+                ((6, 2), (4, 2)),  # c5
+            ],
+            "rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR b KQkq d3": [
+                ((6, 3), (4, 3)),  # d5
+                ((7, 6), (5, 5)),  # Nf6
             ],
             # Add more opening positions and moves as needed
         }
 
     def get_opening_move(self, chess_board):
-        fen = chess_board.get_fen()
-        if fen in self.opening_book:
-            return random.choice(self.opening_book[fen])
+        if self.book is not None:
+            move = self.book.choose(chess_board)
+            if move is not None:
+                return move
+        # Keyed without the move counters so transpositions into a book position still hit
+        position = chess_board.get_position_key()
+        if position in self.opening_book:
+            return random.choice(self.opening_book[position])
         return None
 
-    def select_move(self, chess_board, depth):
+    def allocate_time(self, movetime=None, time_left=None, increment=0):
+        """Seconds to spend on this move, or None to search to a fixed depth."""
+        if movetime is not None:
+            return movetime
+        if time_left is not None:
+            # Plan for roughly 30 more moves, spend most of the increment and never half the clock
+            return min(time_left / 30 + increment * 0.75, time_left * 0.5)
+        return None
+
+    def select_move(self, chess_board, depth=None, movetime=None, time_left=None, increment=0, with_stats=False):
+        """
+        Pick a move by iterative deepening. Search stops at depth, when the
+        time budget (movetime, or a share of time_left plus increment, in
+        seconds) runs out, when a mate is found, or when stop() is called. An
+        interrupted iteration is discarded and the best move of the last
+        completed one is returned, as (move, SearchStats) if with_stats is set.
+        """
+        stats = self.stats = SearchStats()
+        start_time = time.perf_counter()
+        # Switching tables rescans the board once, then make/unmake keep this player's totals
+        previous_tables = chess_board.eval_tables
+        chess_board.set_eval_tables(self.eval_tables)
+        try:
+            move = self.iterative_deepening(chess_board, depth, movetime, time_left, increment)
+        finally:
+            chess_board.set_eval_tables(previous_tables)
+
+        stats.time = time.perf_counter() - start_time
+        stats.nodes = self.nodes
+        stats.depth = self.completed_depth
+        table = self.transposition_table
+        stats.tt_probes += table.probes
+        stats.tt_hits += table.hits
+        stats.tt_cutoffs += table.cutoffs
+        stats.pawn_probes += self.pawn_table.probes
+        stats.pawn_hits += self.pawn_table.hits
+        stats.move = move_to_uci(move) if move else None
+        stats.score = self.best_score if move and not stats.book else None
+        if self.stats_path:
+            with open(self.stats_path, 'a') as stats_file:
+                stats_file.write(stats.to_json() + '\n')
+        return (move, stats) if with_stats else move
+
+    def iterative_deepening(self, chess_board, depth, movetime, time_left, increment):
         # Try opening book first
         opening_move = self.get_opening_move(chess_board)
         if opening_move:
+            self.stats.book = True
             return opening_move
-            
-        self.pruning_counter = 0
+
+        # With few pieces left the tables give the best move outright
+        if self.tablebase is not None and chess_board.piece_count <= self.tablebase.max_pieces:
+            result = self.tablebase.best_move(chess_board)
+            if result is not None:
+                move, wdl, distance = result
+                self.stats.tb_hits += 1
+                self.nodes = 0
+                self.completed_depth = 0
+                self.best_score = wdl * (TB_WIN_SCORE - distance)
+                self.principal_variation = [(chess_board.hash_key, move)]
+                return move
+
+        budget = self.allocate_time(movetime, time_left, increment)
+        if depth is None:
+            depth = MAX_DEPTH if budget is not None else DEFAULT_DEPTH
+        start_time = time.monotonic()
+        self.deadline = start_time + budget if budget is not None else None
+
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.age_history()
+        self.nodes = 0
+        self.pv_moves = {}
+        self.principal_variation = []
+        self.completed_depth = 0
+        table = self.transposition_table
+        table.new_search()
+        table.reset_stats()
+        self.pawn_table.reset_stats()
+        iteration_start_nodes = 0
         valid_moves = self.valid_moves(chess_board, self.color)
         if not valid_moves:
+            self.finish_search()
             return None
-            
+
+        entry = table.probe(chess_board.hash_key)
+        ordered_moves = self.order_moves(chess_board, valid_moves, entry[3] if entry else None, 0)
+        best_move = ordered_moves[0]  # Fallback if even depth 1 runs out of time
+
+        stack_depth = len(chess_board.move_stack)
+        parallel = self.workers > 1 and len(ordered_moves) > 1
+        self._search_id += 1
+        for current_depth in range(1, min(depth, MAX_DEPTH) + 1):
+            try:
+                if parallel and current_depth > 1:
+                    score, move = self.search_root_parallel(chess_board, current_depth, ordered_moves)
+                else:
+                    score, move = self.search_root(chess_board, current_depth, ordered_moves)
+            except SearchTimeout:
+                # Unwind the moves the aborted search left on the board
+                while len(chess_board.move_stack) > stack_depth:
+                    chess_board.unmake_move()
+                break
+
+            best_move = move
+            self.best_score = score
+            self.completed_depth = current_depth
+            self.stats.iteration_nodes.append(self.nodes - iteration_start_nodes)
+            iteration_start_nodes = self.nodes
+            ordered_moves.remove(move)
+            ordered_moves.insert(0, move)
+            self.principal_variation = self.collect_pv(chess_board, current_depth)
+            if len(self.principal_variation) < 2 and move in self.root_lines:
+                # A worker searched the best move, so the line below it is in that worker's table
+                self.principal_variation = [(chess_board.hash_key, move)] + self.root_lines[move]
+            self.pv_moves = {key: pv_move for key, pv_move in self.principal_variation}
+            if self.on_iteration is not None:
+                self.on_iteration(current_depth, score, self.nodes, time.monotonic() - start_time,
+                                  [pv_move for _, pv_move in self.principal_variation])
+
+            if abs(score) >= MATE_BOUND:
+                break
+            # The next iteration usually costs more than all earlier ones together
+            if budget is not None and time.monotonic() - start_time > budget / 2:
+                break
+
+        self.finish_search()
+        return best_move
+
+    def finish_search(self):
+        # A stop request is used up by the search it ended
+        self.deadline = None
+        self.stop_event.clear()
+        if self._shared_stop is not None:
+            self._shared_stop.clear()
+
+    def search_root(self, chess_board, depth, ordered_moves):
+        """Search every root move to depth and return (best_score, best_move)."""
         best_score = float('-inf')
-        best_move = valid_moves[0]  # Default to first valid move
-        
-        for move in self.sort_valid_moves(valid_moves, chess_board):
-            future_board = chess_board.clone()
-            future_board.push(move[0], move[1])
-            score = self.minimax(future_board, depth - 1, float('-inf'), float('inf'), False)
+        best_move = ordered_moves[0]
+
+        for index, move in enumerate(ordered_moves):
+            chess_board.make_move(move)
+            score = self.search_root_move(chess_board, depth, best_score, first=index == 0)
+            chess_board.unmake_move()
             if score > best_score:
                 best_score = score
                 best_move = move
-        
-        return best_move
\ No newline at end of file
+
+        self.transposition_table.store(chess_board.hash_key, depth, best_score, BOUND_EXACT, best_move)
+        return best_score, best_move
+
+    def search_root_move(self, chess_board, depth, alpha, first):
+        """
+        Score the root move just played on chess_board for the root side. Under
+        PVS only the first move gets an open window; the others must first beat
+        alpha in a null-window search, and are searched again with the window
+        open above alpha when they do. A score at or below alpha is an upper bound.
+        """
+        if not first and 'pvs' in self.features:
+            score = -self.negamax(chess_board, depth - 1, -alpha - 1, -alpha)
+            if score <= alpha:
+                return score
+        return -self.negamax(chess_board, depth - 1, float('-inf'), -alpha)
+
+    def search_root_parallel(self, chess_board, depth, ordered_moves):
+        """
+        Root splitting: search the first (PV) move here to set alpha, then hand the
+        remaining root moves to the worker pool. Workers share the best alpha through
+        a multiprocessing.Value, so moves started later are still pruned against it.
+        Only exact worker scores can replace the best move, whatever order they arrive in.
+        """
+        best_move = ordered_moves[0]
+        chess_board.make_move(best_move)
+        best_score = self.search_root_move(chess_board, depth, float('-inf'), first=True)
+        chess_board.unmake_move()
+        self.root_lines = {}
+
+        pool = self._get_pool()
+        self._shared_alpha.value = best_score
+        fen = chess_board.get_fen()
+        futures = [pool.submit(_search_root_move, self._search_id, type(chess_board), fen, move, depth,
+                               best_score, self.deadline)
+                   for move in ordered_moves[1:]]
+        timed_out = False
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            move, score, exact, nodes, worker_stats, line = future.result()
+            self.nodes += nodes
+            if worker_stats:
+                self.stats.merge(worker_stats)
+            if score is None:
+                timed_out = True
+                for pending in futures:
+                    pending.cancel()
+                continue
+            self.root_lines[move] = line
+            if exact and score > best_score:
+                best_score = score
+                best_move = move
+        if timed_out:
+            raise SearchTimeout()
+
+        self.transposition_table.store(chess_board.hash_key, depth, best_score, BOUND_EXACT, best_move)
+        return best_score, best_move
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._shared_alpha = multiprocessing.Value('d', float('-inf'))
+            self._shared_stop = multiprocessing.Event()
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(self.color, self.hash_mb, self._shared_alpha,
+                                                       self._shared_stop, self.tablebase, self.features,
+                                                       self.pawn_hash_mb, self.eval_tables))
+        return self._pool
+
+    def close(self):
+        """Shut down the worker pool of a parallel Player."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def collect_pv(self, chess_board, depth):
+        """Follow best moves through the transposition table as a list of (hash key, move)."""
+        line = []
+        for _ in range(depth):
+            entry = self.transposition_table.probe(chess_board.hash_key)
+            if not entry or entry[3] not in chess_board.generate_moves(chess_board.to_move):
+                break
+            line.append((chess_board.hash_key, entry[3]))
+            chess_board.make_move(entry[3])
+        for _ in line:
+            chess_board.unmake_move()
+        return line
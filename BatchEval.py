@@ -0,0 +1,181 @@
+"""
+Vectorized evaluation of many positions at once with NumPy.
+
+Positions are encoded as (N, 64) int8 arrays of piece indices, square a1
+first, where 0 is empty, 1-6 a white pawn to king and 7-12 a black one.
+Material plus piece-square totals and the game phase are then gathered
+from (64, 13) tables and summed per row, and the pawn structure terms are
+computed on (N, 8, 8) pawn masks, giving exactly the white-relative score
+Player.score_chessboard blends from a board's totals and pawn hash table:
+
+    evaluator = BatchEvaluator()
+    scores = evaluator.evaluate_fens(fens)  # white's view, like the PSTs
+
+Terminal positions are scored like any other; the search, not the static
+evaluation, knows about mate and stalemate.
+"""
+from typing import Iterable, List
+
+import numpy as np
+
+from ChessBoard import (ChessBoard, MAX_PHASE, PHASE_WEIGHTS, PST_ENDGAME, PST_MIDGAME, SQUARES, FEN_SYMBOLS,
+                        WHITE, BLACK, PAWN, KING)
+from PawnStructure import BACKWARD, DOUBLED, ISOLATED, PASSED_ENDGAME, PASSED_MIDGAME
+
+# Piece code -> index in the encoded arrays, and back
+PIECE_INDEX = np.zeros((BLACK | KING) + 1, dtype=np.int8)
+INDEX_CODES = [0]
+for _color in (WHITE, BLACK):
+    for _piece_type in range(PAWN, KING + 1):
+        PIECE_INDEX[_color | _piece_type] = len(INDEX_CODES)
+        INDEX_CODES.append(_color | _piece_type)
+PLANES = len(INDEX_CODES)
+
+# FEN placement bytes -> piece index (-1 for anything that is not a piece, digit or
+# separator) and how many squares each byte covers, so np.repeat expands the empty runs
+FEN_INDEX = np.full(256, -1, dtype=np.int8)
+FEN_SQUARES = np.ones(256, dtype=np.int64)
+for _code, _symbol in FEN_SYMBOLS.items():
+    FEN_INDEX[ord(_symbol)] = PIECE_INDEX[_code]
+for _count in range(1, 9):
+    FEN_INDEX[ord(str(_count))] = 0
+    FEN_SQUARES[ord(str(_count))] = _count
+for _separator in b'/ ':
+    FEN_INDEX[_separator] = 0
+    FEN_SQUARES[_separator] = 0
+RANK_ENDS = np.frombuffer(b'/////// ', dtype=np.uint8)  # what ends each rank of one placement
+
+SQUARE_OFFSETS = np.arange(64) * PLANES
+MAILBOX_SQUARES = np.array(SQUARES)
+DEFAULT_CHUNK = 1 << 16  # rows gathered at a time, bounding the (chunk, 64) temporaries
+
+def encode_boards(boards: Iterable[ChessBoard]) -> np.ndarray:
+    """Encode boards into an (N, 64) int8 array from their mailboxes."""
+    mailboxes = b''.join(bytes(board.squares) for board in boards)
+    codes = np.frombuffer(mailboxes, dtype=np.uint8).reshape(-1, 120)[:, MAILBOX_SQUARES]
+    return PIECE_INDEX[codes]
+
+def encode_fens(fens: Iterable[str]) -> np.ndarray:
+    """
+    Encode the piece placement field of each FEN into an (N, 64) int8 array
+    without building boards. Raises ValueError on a malformed placement.
+    """
+    placements = [fen.split(None, 1)[0] if fen.strip() else '' for fen in fens]
+    encoded = _encode_placements(placements)
+    if encoded is None:
+        for placement in placements:
+            if _encode_placements([placement]) is None:
+                raise ValueError(f'Malformed FEN piece placement: {placement!r}')
+    return encoded
+
+def _encode_placements(placements: List[str]):
+    """All placements in one pass over their joined bytes, or None if any of them is malformed."""
+    try:
+        text = np.frombuffer((' '.join(placements) + ' ').encode('ascii'), dtype=np.uint8)
+    except UnicodeEncodeError:
+        return None
+    # Every placement must be eight ranks of eight squares with nothing unknown in them
+    rank_ends = np.flatnonzero((text == ord('/')) | (text == ord(' ')))
+    if len(rank_ends) != 8 * len(placements) or not (text[rank_ends].reshape(-1, 8) == RANK_ENDS).all():
+        return None
+    squares = FEN_SQUARES[text]
+    rank_starts = np.concatenate(([0], rank_ends[:-1] + 1))
+    indices = FEN_INDEX[text]
+    if not (np.add.reduceat(squares, rank_starts) == 8).all() or (indices < 0).any():
+        return None
+    # FEN lists rank 8 first, the encoding rank 1 first
+    return np.repeat(indices, squares).reshape(-1, 8, 8)[:, ::-1].reshape(-1, 64)
+
+def piece_square_arrays(eval_tables=None):
+    """(midgame, endgame) int32 arrays of shape (64, 13) from build_piece_square_tables-style tables."""
+    midgame, endgame = eval_tables or (PST_MIDGAME, PST_ENDGAME)
+    arrays = []
+    for tables in (midgame, endgame):
+        array = np.zeros((64, PLANES), dtype=np.int32)
+        for index, code in enumerate(INDEX_CODES[1:], 1):
+            array[:, index] = [tables[code][sq] for sq in SQUARES]
+        arrays.append(array)
+    return tuple(arrays)
+
+PHASE_ARRAY = np.array([PHASE_WEIGHTS[code] for code in INDEX_CODES], dtype=np.int32)
+PASSED_ARRAYS = (np.array(PASSED_MIDGAME)[:, None], np.array(PASSED_ENDGAME)[:, None])  # by rank, against files
+
+def _neighbour_files(masks: np.ndarray) -> np.ndarray:
+    """(N, 8, 8) rank-by-file masks set wherever the file to either side is set."""
+    result = np.zeros_like(masks)
+    result[:, :, 1:] |= masks[:, :, :-1]
+    result[:, :, :-1] |= masks[:, :, 1:]
+    return result
+
+def _ranks_above(masks: np.ndarray) -> np.ndarray:
+    """Masks set wherever the same file holds a set square on a strictly higher rank."""
+    at_or_above = np.logical_or.accumulate(masks[:, ::-1], axis=1)[:, ::-1]
+    result = np.zeros_like(masks)
+    result[:, :-1] = at_or_above[:, 1:]
+    return result
+
+def _pawn_side_terms(own: np.ndarray, enemy: np.ndarray):
+    """PawnStructure._side_terms on masks whose ranks count from own's back rank."""
+    counts = own.sum(axis=1)
+    doubled = np.maximum(counts - 1, 0).sum(axis=1)
+    isolated = own & ~_neighbour_files(counts[:, None, :] > 0)
+    supported = _neighbour_files(np.logical_or.accumulate(own, axis=1))  # a neighbour on this rank or behind
+    guarded_stop = np.zeros_like(own)
+    guarded_stop[:, :-2] = enemy[:, 2:]
+    backward = own & ~isolated & ~supported & _neighbour_files(guarded_stop)
+    enemy_ahead = _ranks_above(enemy)
+    passed = own & ~(enemy_ahead | _neighbour_files(enemy_ahead)) & ~_ranks_above(own)
+    common = isolated.sum(axis=(1, 2)), backward.sum(axis=(1, 2))
+    return tuple(doubled * weights[0] + common[0] * weights[1] + common[1] * weights[2]
+                 + (passed * passed_bonus).sum(axis=(1, 2))
+                 for weights, passed_bonus in (((DOUBLED[0], ISOLATED[0], BACKWARD[0]), PASSED_ARRAYS[0]),
+                                               ((DOUBLED[1], ISOLATED[1], BACKWARD[1]), PASSED_ARRAYS[1])))
+
+def pawn_terms(encoded: np.ndarray):
+    """White-minus-black (midgame, endgame) pawn structure terms, as PawnStructure.evaluate_pawns computes them."""
+    boards = encoded.reshape(-1, 8, 8)
+    white = boards == PIECE_INDEX[WHITE | PAWN]
+    black = boards == PIECE_INDEX[BLACK | PAWN]
+    white_midgame, white_endgame = _pawn_side_terms(white, black)
+    black_midgame, black_endgame = _pawn_side_terms(black[:, ::-1], white[:, ::-1])
+    return white_midgame - black_midgame, white_endgame - black_endgame
+
+class BatchEvaluator:
+    """Scores encoded positions with one set of tables, Player(eval_tables=...)'s or the built-in ones."""
+
+    def __init__(self, eval_tables=None, chunk_size: int = DEFAULT_CHUNK) -> None:
+        self.midgame, self.endgame = piece_square_arrays(eval_tables)
+        self.chunk_size = chunk_size
+
+    def terms(self, encoded: np.ndarray):
+        """(midgame, endgame, phase) int64 totals per position, pawn structure included."""
+        count = len(encoded)
+        midgame = np.empty(count, dtype=np.int64)
+        endgame = np.empty(count, dtype=np.int64)
+        phase = np.empty(count, dtype=np.int64)
+        for start in range(0, count, self.chunk_size):
+            chunk = encoded[start:start + self.chunk_size]
+            rows = slice(start, start + len(chunk))
+            # Offset each square's index into its row of the flattened tables, then gather and sum
+            flat = chunk + SQUARE_OFFSETS
+            pawn_midgame, pawn_endgame = pawn_terms(chunk)
+            midgame[rows] = self.midgame.take(flat).sum(axis=1, dtype=np.int64) + pawn_midgame
+            endgame[rows] = self.endgame.take(flat).sum(axis=1, dtype=np.int64) + pawn_endgame
+            phase[rows] = PHASE_ARRAY[chunk].sum(axis=1, dtype=np.int64)
+        return midgame, endgame, phase
+
+    def evaluate(self, encoded: np.ndarray) -> np.ndarray:
+        """White-relative scores of encoded positions, tapered between midgame and endgame by phase."""
+        midgame, endgame, phase = self.terms(encoded)
+        np.minimum(phase, MAX_PHASE, out=phase)
+        return (midgame * phase + endgame * (MAX_PHASE - phase)) // MAX_PHASE
+
+    def evaluate_boards(self, boards: Iterable[ChessBoard]) -> np.ndarray:
+        return self.evaluate(encode_boards(boards))
+
+    def evaluate_fens(self, fens: Iterable[str]) -> np.ndarray:
+        return self.evaluate(encode_fens(fens))
+
+def side_to_move_signs(fens: List[str]) -> np.ndarray:
+    """+1 for each FEN with white to move and -1 for black, to turn white-relative scores around."""
+    return np.array([-1 if fen.split(None, 2)[1:2] == ['b'] else 1 for fen in fens], dtype=np.int64)
@@ -0,0 +1,323 @@
+from typing import List
+from ChessBoard import (ChessBoard, Move, SQUARES, COORDS, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
+                        WHITE, BLACK, TYPE_MASK, COLOR_MASK, COLOR_CODES, PROMOTION_TYPES)
+
+# Bit n of a bitboard is row n // 8, column n % 8, so a1 is bit 0 and h8 is bit 63
+BIT_TO_SQUARE = SQUARES
+SQUARE_TO_BIT = [-1] * 120
+for _bit, _sq in enumerate(SQUARES):
+    SQUARE_TO_BIT[_sq] = _bit
+FULL_BOARD = (1 << 64) - 1
+
+def _on_board(row, col):
+    return 0 <= row < 8 and 0 <= col < 8
+
+def _build_step_masks(offsets):
+    masks = []
+    for bit in range(64):
+        row, col = divmod(bit, 8)
+        mask = 0
+        for dr, dc in offsets:
+            if _on_board(row + dr, col + dc):
+                mask |= 1 << ((row + dr) * 8 + col + dc)
+        masks.append(mask)
+    return masks
+
+def _build_ray_masks(dr, dc):
+    # Every square from the given one outwards in a single direction, excluding the square itself
+    masks = []
+    for bit in range(64):
+        row, col = divmod(bit, 8)
+        mask = 0
+        r, c = row + dr, col + dc
+        while _on_board(r, c):
+            mask |= 1 << (r * 8 + c)
+            r, c = r + dr, c + dc
+        masks.append(mask)
+    return masks
+
+KNIGHT_ATTACKS = _build_step_masks(((2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)))
+KING_ATTACKS = _build_step_masks(((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)))
+# Squares attacked by a pawn of the given color standing on each square
+PAWN_ATTACKS = {WHITE: _build_step_masks(((1, -1), (1, 1))), BLACK: _build_step_masks(((-1, -1), (-1, 1)))}
+
+# Rays that grow towards higher bits stop at their lowest blocker, the others at their highest
+POSITIVE_ROOK_RAYS = (_build_ray_masks(1, 0), _build_ray_masks(0, 1))
+NEGATIVE_ROOK_RAYS = (_build_ray_masks(-1, 0), _build_ray_masks(0, -1))
+POSITIVE_BISHOP_RAYS = (_build_ray_masks(1, 1), _build_ray_masks(1, -1))
+NEGATIVE_BISHOP_RAYS = (_build_ray_masks(-1, -1), _build_ray_masks(-1, 1))
+
+def _slider_attacks(bit, occupied, positive_rays, negative_rays):
+    attacks = 0
+    for rays in positive_rays:
+        ray = rays[bit]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for rays in negative_rays:
+        ray = rays[bit]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+def rook_attacks(bit: int, occupied: int) -> int:
+    return _slider_attacks(bit, occupied, POSITIVE_ROOK_RAYS, NEGATIVE_ROOK_RAYS)
+
+def bishop_attacks(bit: int, occupied: int) -> int:
+    return _slider_attacks(bit, occupied, POSITIVE_BISHOP_RAYS, NEGATIVE_BISHOP_RAYS)
+
+class BitBoard(ChessBoard):
+    """
+    ChessBoard backend that keeps one bitboard per piece code next to the mailbox.
+    Attack detection and move generation use the precomputed masks above, while
+    make/unmake, FEN and the UI views are shared with ChessBoard.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._sync_bitboards()
+
+    def set_fen(self, fen: str) -> None:
+        super().set_fen(fen)
+        self._sync_bitboards()
+
+    def _sync_bitboards(self) -> None:
+        """Rebuild every bitboard from the mailbox."""
+        self.bitboards: List[int] = [0] * 23  # indexed by piece code
+        self.occupancy = {WHITE: 0, BLACK: 0}
+        for bit, sq in enumerate(BIT_TO_SQUARE):
+            code = self.squares[sq]
+            if code:
+                self.bitboards[code] |= 1 << bit
+                self.occupancy[code & COLOR_MASK] |= 1 << bit
+
+    def _apply_undo_record(self, record) -> None:
+        # Every change is an XOR, so the same update plays a move and takes it back
+        start, end, moving, placed, captured, captured_square, rook_move = record[:7]
+        bitboards = self.bitboards
+        start_bit = 1 << SQUARE_TO_BIT[start]
+        end_bit = 1 << SQUARE_TO_BIT[end]
+        color = moving & COLOR_MASK
+        bitboards[moving] ^= start_bit
+        bitboards[placed] ^= end_bit
+        self.occupancy[color] ^= start_bit | end_bit
+        if captured:
+            captured_bit = 1 << SQUARE_TO_BIT[captured_square]
+            bitboards[captured] ^= captured_bit
+            self.occupancy[captured & COLOR_MASK] ^= captured_bit
+        if rook_move:
+            rook_bits = (1 << SQUARE_TO_BIT[rook_move[0]]) | (1 << SQUARE_TO_BIT[rook_move[1]])
+            bitboards[color | ROOK] ^= rook_bits
+            self.occupancy[color] ^= rook_bits
+
+    def make_move(self, move: Move) -> None:
+        super().make_move(move)
+        self._apply_undo_record(self.move_stack[-1])
+
+    def unmake_move(self) -> None:
+        record = self.move_stack[-1]
+        if record[0] is not None:  # null moves leave the bitboards alone
+            self._apply_undo_record(record)
+        super().unmake_move()
+
+    def has_non_pawn_material(self, color: str) -> bool:
+        us = COLOR_CODES[color]
+        bitboards = self.bitboards
+        return bool(bitboards[us | KNIGHT] | bitboards[us | BISHOP] | bitboards[us | ROOK] | bitboards[us | QUEEN])
+
+    def clone(self):
+        cloned_board = super().clone()
+        cloned_board.bitboards = list(self.bitboards)
+        cloned_board.occupancy = dict(self.occupancy)
+        return cloned_board
+
+    def find_king(self, color):
+        kings = self.bitboards[COLOR_CODES[color] | KING]
+        if not kings:
+            return None
+        return COORDS[BIT_TO_SQUARE[(kings & -kings).bit_length() - 1]]
+
+    def _attacked(self, sq: int, by: int) -> bool:
+        return self._attacked_bit(SQUARE_TO_BIT[sq], by, self.occupancy[WHITE] | self.occupancy[BLACK], FULL_BOARD)
+
+    def _attacked_bit(self, bit: int, by: int, occupied: int, remaining: int) -> bool:
+        """Is bit attacked by color by, given the occupancy and the mask of by's pieces still on the board."""
+        bitboards = self.bitboards
+        if KNIGHT_ATTACKS[bit] & bitboards[by | KNIGHT] & remaining:
+            return True
+        if KING_ATTACKS[bit] & bitboards[by | KING]:
+            return True
+        # A pawn of by attacks bit exactly when a pawn of the other color on bit would attack it back
+        if PAWN_ATTACKS[by ^ COLOR_MASK][bit] & bitboards[by | PAWN] & remaining:
+            return True
+        queens = bitboards[by | QUEEN]
+        rooks = (bitboards[by | ROOK] | queens) & remaining
+        if rooks and rook_attacks(bit, occupied) & rooks:
+            return True
+        bishops = (bitboards[by | BISHOP] | queens) & remaining
+        if bishops and bishop_attacks(bit, occupied) & bishops:
+            return True
+        return False
+
+    def _attack_map(self, them, king_square):
+        """ChessBoard._attack_map from the attack masks, sliders seeing through our king."""
+        bitboards = self.bitboards
+        occupied = (self.occupancy[WHITE] | self.occupancy[BLACK]) ^ (1 << SQUARE_TO_BIT[king_square])
+        attacks = 0
+        for piece_type, masks in ((PAWN, PAWN_ATTACKS[them]), (KNIGHT, KNIGHT_ATTACKS), (KING, KING_ATTACKS)):
+            pieces = bitboards[them | piece_type]
+            while pieces:
+                low = pieces & -pieces
+                pieces ^= low
+                attacks |= masks[low.bit_length() - 1]
+        queens = bitboards[them | QUEEN]
+        for pieces, slider_attacks in ((bitboards[them | ROOK] | queens, rook_attacks),
+                                       (bitboards[them | BISHOP] | queens, bishop_attacks)):
+            while pieces:
+                low = pieces & -pieces
+                pieces ^= low
+                attacks |= slider_attacks(low.bit_length() - 1, occupied)
+
+        attacked = bytearray(120)
+        while attacks:
+            low = attacks & -attacks
+            attacks ^= low
+            attacked[BIT_TO_SQUARE[low.bit_length() - 1]] = 1
+        return attacked
+
+    def _is_king_safe_after(self, start, end, us, king_square):
+        """Test king safety on adjusted occupancy masks instead of editing the board."""
+        start_bit = 1 << SQUARE_TO_BIT[start]
+        end_bit = 1 << SQUARE_TO_BIT[end]
+        occupied = ((self.occupancy[WHITE] | self.occupancy[BLACK]) ^ start_bit) | end_bit
+        remaining = FULL_BOARD ^ end_bit
+
+        moving = self.squares[start]
+        if end == self.en_passant and moving & TYPE_MASK == PAWN:
+            captured_bit = 1 << SQUARE_TO_BIT[end - 10 if us == WHITE else end + 10]
+            occupied ^= captured_bit
+            remaining ^= captured_bit
+
+        if moving & TYPE_MASK == KING:
+            king_square = end
+        if king_square is None:
+            return True
+        return not self._attacked_bit(SQUARE_TO_BIT[king_square], us ^ COLOR_MASK, occupied, remaining)
+
+    def generate_captures(self, color: str) -> List[Move]:
+        """Captures, en passant and queen promotions from the attack masks, as in ChessBoard.generate_captures."""
+        us = COLOR_CODES[color]
+        bitboards = self.bitboards
+        enemy = self.occupancy[us ^ COLOR_MASK]
+        occupied = self.occupancy[us] | enemy
+        candidates = []
+        append = candidates.append
+
+        for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            pieces = bitboards[us | piece_type]
+            while pieces:
+                low = pieces & -pieces
+                pieces ^= low
+                bit = low.bit_length() - 1
+                if piece_type == KNIGHT:
+                    targets = KNIGHT_ATTACKS[bit]
+                elif piece_type == BISHOP:
+                    targets = bishop_attacks(bit, occupied)
+                elif piece_type == ROOK:
+                    targets = rook_attacks(bit, occupied)
+                elif piece_type == QUEEN:
+                    targets = rook_attacks(bit, occupied) | bishop_attacks(bit, occupied)
+                else:
+                    targets = KING_ATTACKS[bit]
+                targets &= enemy
+                start = BIT_TO_SQUARE[bit]
+                while targets:
+                    low = targets & -targets
+                    targets ^= low
+                    append((start, BIT_TO_SQUARE[low.bit_length() - 1], None))
+
+        forward = 8 if us == WHITE else -8
+        last_row = 7 if us == WHITE else 0
+        en_passant_bit = 1 << SQUARE_TO_BIT[self.en_passant] if self.en_passant is not None else 0
+        pawns = bitboards[us | PAWN]
+        while pawns:
+            low = pawns & -pawns
+            pawns ^= low
+            bit = low.bit_length() - 1
+            start = BIT_TO_SQUARE[bit]
+            targets = PAWN_ATTACKS[us][bit] & (enemy | en_passant_bit)
+            push = bit + forward
+            promotion = 'queen' if push >> 3 == last_row else None
+            if promotion and not occupied >> push & 1:
+                targets |= 1 << push
+            while targets:
+                low = targets & -targets
+                targets ^= low
+                append((start, BIT_TO_SQUARE[low.bit_length() - 1], promotion))
+        return self._legal_moves(candidates, us)
+
+    def generate_moves(self, color: str) -> List[Move]:
+        """Generate every legal move for color from the attack masks, in ChessBoard's move format."""
+        us = COLOR_CODES[color]
+        them = us ^ COLOR_MASK
+        bitboards = self.bitboards
+        own = self.occupancy[us]
+        enemy = self.occupancy[them]
+        occupied = own | enemy
+        not_own = FULL_BOARD ^ own
+        candidates = []
+        append = candidates.append
+
+        for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            pieces = bitboards[us | piece_type]
+            while pieces:
+                low = pieces & -pieces
+                pieces ^= low
+                bit = low.bit_length() - 1
+                if piece_type == KNIGHT:
+                    targets = KNIGHT_ATTACKS[bit]
+                elif piece_type == BISHOP:
+                    targets = bishop_attacks(bit, occupied)
+                elif piece_type == ROOK:
+                    targets = rook_attacks(bit, occupied)
+                elif piece_type == QUEEN:
+                    targets = rook_attacks(bit, occupied) | bishop_attacks(bit, occupied)
+                else:
+                    targets = KING_ATTACKS[bit]
+                targets &= not_own
+                start = BIT_TO_SQUARE[bit]
+                while targets:
+                    low = targets & -targets
+                    targets ^= low
+                    append((start, BIT_TO_SQUARE[low.bit_length() - 1], None))
+        self._castling_candidates(us, them, candidates)
+
+        forward = 8 if us == WHITE else -8
+        home_row = 1 if us == WHITE else 6
+        last_row = 7 if us == WHITE else 0
+        en_passant_bit = 1 << SQUARE_TO_BIT[self.en_passant] if self.en_passant is not None else 0
+        pawns = bitboards[us | PAWN]
+        while pawns:
+            low = pawns & -pawns
+            pawns ^= low
+            bit = low.bit_length() - 1
+            start = BIT_TO_SQUARE[bit]
+            targets = PAWN_ATTACKS[us][bit] & (enemy | en_passant_bit)
+            push = bit + forward
+            if not occupied >> push & 1:
+                targets |= 1 << push
+                if bit >> 3 == home_row and not occupied >> (push + forward) & 1:
+                    targets |= 1 << (push + forward)
+            while targets:
+                low = targets & -targets
+                targets ^= low
+                target_bit = low.bit_length() - 1
+                end = BIT_TO_SQUARE[target_bit]
+                if target_bit >> 3 == last_row:
+                    candidates.extend((start, end, promotion) for promotion in PROMOTION_TYPES)
+                else:
+                    append((start, end, None))
+        return self._legal_moves(candidates, us)
@@ -1,4 +1,6 @@
 class Cell:
+    __slots__ = ('piece',)
+
     def __init__(self, piece=None) -> None:
         self.piece = piece #holds a piece
 
@@ -8,4 +10,3 @@ class Cell:
         cloned_cell.piece = self.piece.clone() if self.piece else None
 
         return cloned_cell
- 
\ No newline at end of file
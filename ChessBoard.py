@@ -1,6 +1,159 @@
 from typing import List, Tuple, Optional, Dict
+import random
 from Cell import Cell
 from Pieces import Piece
+from Utils import algebraic_to_cartesian, cartesian_to_algebraic
+from positional_data import piece_values, positional_dict
+
+# Piece codes: the low three bits hold the type, the next two the color
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 1, 2, 3, 4, 5, 6
+WHITE, BLACK = 8, 16
+OFFBOARD = 32
+TYPE_MASK = 7
+COLOR_MASK = WHITE | BLACK
+
+PIECE_NAMES = (None, 'pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+PIECE_CODES = {name: code for code, name in enumerate(PIECE_NAMES) if name}
+COLOR_CODES = {'white': WHITE, 'black': BLACK}
+COLOR_NAMES = {WHITE: 'white', BLACK: 'black'}
+
+# 10x12 mailbox: rows 0-7 (ranks 1-8) sit between two guard rows on each end
+# and one guard column on each side, so every knight jump stays inside the array
+def square(row: int, col: int) -> int:
+    return 21 + row * 10 + col
+
+SQUARES = tuple(square(row, col) for row in range(8) for col in range(8))
+COORDS: List[Optional[Tuple[int, int]]] = [None] * 120
+for _row in range(8):
+    for _col in range(8):
+        COORDS[square(_row, _col)] = (_row, _col)
+
+EMPTY_MAILBOX = bytearray(OFFBOARD if COORDS[sq] is None else EMPTY for sq in range(120))
+
+KNIGHT_OFFSETS = (-21, -19, -12, -8, 8, 12, 19, 21)
+KING_OFFSETS = (-11, -10, -9, -1, 1, 9, 10, 11)
+ROOK_DIRECTIONS = (-10, -1, 1, 10)
+BISHOP_DIRECTIONS = (-11, -9, 9, 11)
+
+def _build_step_table(offsets):
+    # For every square, the squares reachable with a single step of each offset
+    table = [()] * 120
+    for sq in SQUARES:
+        table[sq] = tuple(sq + offset for offset in offsets if COORDS[sq + offset] is not None)
+    return table
+
+def _build_ray_table(directions):
+    # For every square, one tuple of squares per direction, ordered outwards from the square
+    table = [()] * 120
+    for sq in SQUARES:
+        rays = []
+        for direction in directions:
+            ray = []
+            target = sq + direction
+            while COORDS[target] is not None:
+                ray.append(target)
+                target += direction
+            if ray:
+                rays.append(tuple(ray))
+        table[sq] = tuple(rays)
+    return table
+
+KNIGHT_MOVES = _build_step_table(KNIGHT_OFFSETS)
+KING_MOVES = _build_step_table(KING_OFFSETS)
+ROOK_RAYS = _build_ray_table(ROOK_DIRECTIONS)
+BISHOP_RAYS = _build_ray_table(BISHOP_DIRECTIONS)
+QUEEN_RAYS = [ROOK_RAYS[sq] + BISHOP_RAYS[sq] for sq in range(120)]
+SLIDER_RAYS = (None, None, None, BISHOP_RAYS, ROOK_RAYS, QUEEN_RAYS, None)
+
+# Castling rights bits, cleared through CASTLING_MASK whenever a king or rook square is touched
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+ALL_CASTLING = WHITE_KINGSIDE | WHITE_QUEENSIDE | BLACK_KINGSIDE | BLACK_QUEENSIDE
+CASTLING_MASK = [ALL_CASTLING] * 120
+CASTLING_MASK[square(0, 4)] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASK[square(0, 7)] &= ~WHITE_KINGSIDE
+CASTLING_MASK[square(0, 0)] &= ~WHITE_QUEENSIDE
+CASTLING_MASK[square(7, 4)] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_MASK[square(7, 7)] &= ~BLACK_KINGSIDE
+CASTLING_MASK[square(7, 0)] &= ~BLACK_QUEENSIDE
+
+# (right, king start, king end, rook start, squares that must be empty, squares the king crosses)
+CASTLING_MOVES = {
+    WHITE: (
+        (WHITE_KINGSIDE, square(0, 4), square(0, 6), square(0, 7), (square(0, 5), square(0, 6)), (square(0, 5),)),
+        (WHITE_QUEENSIDE, square(0, 4), square(0, 2), square(0, 0),
+         (square(0, 1), square(0, 2), square(0, 3)), (square(0, 3),)),
+    ),
+    BLACK: (
+        (BLACK_KINGSIDE, square(7, 4), square(7, 6), square(7, 7), (square(7, 5), square(7, 6)), (square(7, 5),)),
+        (BLACK_QUEENSIDE, square(7, 4), square(7, 2), square(7, 0),
+         (square(7, 1), square(7, 2), square(7, 3)), (square(7, 3),)),
+    ),
+}
+
+# Zobrist keys, drawn from a fixed seed so hash keys are stable across runs and processes
+_zobrist_random = random.Random(0x5EED)
+ZOBRIST_PIECES = [[0] * 120 for _ in range((BLACK | KING) + 1)]  # indexed by piece code, then square
+for _color in (WHITE, BLACK):
+    for _piece_type in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+        for _sq in SQUARES:
+            ZOBRIST_PIECES[_color | _piece_type][_sq] = _zobrist_random.getrandbits(64)
+ZOBRIST_CASTLING = [_zobrist_random.getrandbits(64) for _ in range(ALL_CASTLING + 1)]
+_zobrist_files = [_zobrist_random.getrandbits(64) for _ in range(8)]
+ZOBRIST_EN_PASSANT = [_zobrist_files[COORDS[sq][1]] if COORDS[sq] else 0 for sq in range(120)]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+# Pawn-only key for the pawn hash table: the pawns' piece keys, and zeros for every other code
+ZOBRIST_PAWNS = [ZOBRIST_PIECES[code] if code & TYPE_MASK == PAWN else [0] * 120
+                 for code in range(len(ZOBRIST_PIECES))]
+
+# Material plus piece-square value per piece code and square, positive for white and
+# negative for black, so the board can keep white-minus-black totals by adding deltas
+def build_piece_square_tables(values, tables):
+    """Build (midgame, endgame) tables indexed by piece code and square from positional_data-style inputs."""
+    midgame = [[0] * 120 for _ in range((BLACK | KING) + 1)]
+    endgame = [[0] * 120 for _ in range((BLACK | KING) + 1)]
+    for color, sign in ((WHITE, 1), (BLACK, -1)):
+        for piece_type in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            name = PIECE_NAMES[piece_type]
+            value = values.get(name, 0)
+            for sq in SQUARES:
+                row, col = COORDS[sq]
+                table_row = row if color == WHITE else 7 - row  # tables are written from white's side
+                midgame[color | piece_type][sq] = sign * (value + tables[name][0][table_row][col])
+                endgame[color | piece_type][sq] = sign * (value + tables[name][1][table_row][col])
+    return midgame, endgame
+
+PST_MIDGAME, PST_ENDGAME = build_piece_square_tables(piece_values, positional_dict)
+DEFAULT_EVAL_TABLES = (PST_MIDGAME, PST_ENDGAME)
+
+# Game phase counts minor pieces as 1, rooks 2 and queens 4, for 24 at the start
+PHASE_WEIGHTS = [0] * ((BLACK | KING) + 1)
+for _color in (WHITE, BLACK):
+    PHASE_WEIGHTS[_color | KNIGHT] = PHASE_WEIGHTS[_color | BISHOP] = 1
+    PHASE_WEIGHTS[_color | ROOK] = 2
+    PHASE_WEIGHTS[_color | QUEEN] = 4
+MAX_PHASE = 24
+
+BACK_RANK = (ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK)
+PROMOTION_TYPES = ('queen', 'rook', 'bishop', 'knight')
+
+# Static exchange piece values in centipawns, by piece type code; the king outweighs any exchange
+SEE_VALUES = (0, 100, 320, 330, 500, 900, 20000)
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+FEN_SYMBOLS = {
+    WHITE | PAWN: 'P', WHITE | ROOK: 'R',
+    WHITE | KNIGHT: 'N', WHITE | BISHOP: 'B',
+    WHITE | QUEEN: 'Q', WHITE | KING: 'K',
+    BLACK | PAWN: 'p', BLACK | ROOK: 'r',
+    BLACK | KNIGHT: 'n', BLACK | BISHOP: 'b',
+    BLACK | QUEEN: 'q', BLACK | KING: 'k'
+}
+FEN_CODES = {symbol: code for code, symbol in FEN_SYMBOLS.items()}
+CASTLING_SYMBOLS = ((WHITE_KINGSIDE, 'K'), (WHITE_QUEENSIDE, 'Q'), (BLACK_KINGSIDE, 'k'), (BLACK_QUEENSIDE, 'q'))
+
+# (start, end) or (start, end, promotion); a missing promotion means queen
+Move = Tuple
 
 class ChessBoard:
     BOARD_SIZE = 8
@@ -15,54 +168,184 @@ class ChessBoard:
         }
     }
 
+    # (midgame, endgame) tables the incremental totals are kept with, see set_eval_tables
+    eval_tables = DEFAULT_EVAL_TABLES
+
     def __init__(self) -> None:
-        self.board: List[List[Cell]] = [[Cell() for _ in range(self.BOARD_SIZE)] for _ in range(self.BOARD_SIZE)]
+        self.squares: bytearray = bytearray(EMPTY_MAILBOX)
+        self.kings: Dict[int, Optional[int]] = {WHITE: None, BLACK: None}
         self.initialize_pieces()
         self.to_move: str = 'white'
         self.game_over: bool = False
-  
+        self.castling: int = ALL_CASTLING
+        self.en_passant: Optional[int] = None  # square a pawn may capture onto en passant
+        self.move_stack: List[tuple] = []  # undo records for make_move/unmake_move
+        self.halfmove_clock: int = 0  # plies since the last capture or pawn move
+        self.fullmove_number: int = 1
+        self.hash_key: int = self.compute_hash()
+        self.pawn_key: int = self.compute_pawn_key()
+        self.compute_evaluation_terms()
+
+    @classmethod
+    def from_fen(cls, fen: str) -> 'ChessBoard':
+        """Build a board straight from a FEN string; the move counters may be omitted."""
+        board = cls.__new__(cls)
+        board.set_fen(fen)
+        return board
+
+    def set_fen(self, fen: str) -> None:
+        """Replace the whole position with the one described by fen. Raises ValueError if it is malformed."""
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f'FEN needs at least four fields: {fen!r}')
+        ranks = fields[0].split('/')
+        if len(ranks) != 8:
+            raise ValueError(f'FEN placement needs eight ranks: {fen!r}')
+
+        squares = bytearray(EMPTY_MAILBOX)
+        kings = {WHITE: None, BLACK: None}
+        for index, rank in enumerate(ranks):
+            row, col = 7 - index, 0
+            for char in rank:
+                if char.isdigit():
+                    col += int(char)
+                    continue
+                if char not in FEN_CODES or col > 7:
+                    raise ValueError(f'Bad FEN rank {rank!r}')
+                code = FEN_CODES[char]
+                squares[square(row, col)] = code
+                if code & TYPE_MASK == KING:
+                    kings[code & COLOR_MASK] = square(row, col)
+                col += 1
+            if col != 8:
+                raise ValueError(f'Bad FEN rank {rank!r}')
+
+        if fields[1] not in ('w', 'b'):
+            raise ValueError(f'Bad side to move {fields[1]!r}')
+        castling = 0
+        if fields[2] != '-':
+            for right, symbol in CASTLING_SYMBOLS:
+                if symbol in fields[2]:
+                    castling |= right
+        # A right is kept only while its king is at home, so castling is never generated from an empty square
+        for color, moves in CASTLING_MOVES.items():
+            for right, king_start, _, _, _, _ in moves:
+                if kings[color] != king_start:
+                    castling &= ~right
+        en_passant = None
+        if fields[3] != '-':
+            # The square is behind a pawn of the side not to move that has just advanced two ranks
+            white_to_move = fields[1] == 'w'
+            if len(fields[3]) != 2 or fields[3][0] not in 'abcdefgh' or fields[3][1] != ('6' if white_to_move else '3'):
+                raise ValueError(f'Bad en passant square {fields[3]!r}')
+            en_passant = square(*algebraic_to_cartesian(fields[3]))
+            pawn_square = en_passant - 10 if white_to_move else en_passant + 10
+            if squares[en_passant] or squares[pawn_square] != (BLACK if white_to_move else WHITE) | PAWN:
+                raise ValueError(f'Bad en passant square {fields[3]!r}')
+
+        self.squares = squares
+        self.kings = kings
+        self.to_move = 'white' if fields[1] == 'w' else 'black'
+        self.game_over = False
+        self.castling = castling
+        self.en_passant = en_passant
+        self.move_stack = []
+        self.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+        self.fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+        self.hash_key = self.compute_hash()
+        self.pawn_key = self.compute_pawn_key()
+        self.compute_evaluation_terms()
+
+    def compute_hash(self) -> int:
+        """Compute the 64-bit Zobrist key of the position from scratch."""
+        key = 0
+        for sq in SQUARES:
+            code = self.squares[sq]
+            if code:
+                key ^= ZOBRIST_PIECES[code][sq]
+        key ^= ZOBRIST_CASTLING[self.castling]
+        if self.en_passant is not None:
+            key ^= ZOBRIST_EN_PASSANT[self.en_passant]
+        if self.to_move == 'black':
+            key ^= ZOBRIST_BLACK_TO_MOVE
+        return key
+
+    def compute_pawn_key(self) -> int:
+        """Compute the Zobrist key of the pawns alone from scratch."""
+        key = 0
+        for sq in SQUARES:
+            key ^= ZOBRIST_PAWNS[self.squares[sq]][sq]
+        return key
+
+    def compute_evaluation_terms(self) -> None:
+        """Recompute the material/piece-square totals, game phase and piece count from scratch."""
+        midgame, endgame = self.eval_tables
+        self.midgame_score = 0
+        self.endgame_score = 0
+        self.phase = 0
+        self.piece_count = 0  # both kings included, kept up to date by make_move/unmake_move
+        for sq in SQUARES:
+            code = self.squares[sq]
+            if code:
+                self.midgame_score += midgame[code][sq]
+                self.endgame_score += endgame[code][sq]
+                self.phase += PHASE_WEIGHTS[code]
+                self.piece_count += 1
+
+    def set_eval_tables(self, eval_tables=None) -> None:
+        """
+        Keep the totals with (midgame, endgame) tables from build_piece_square_tables,
+        or the built-in ones for None. Undo records made before a switch hold totals
+        from the old tables, so switch back before unmaking those moves.
+        """
+        eval_tables = eval_tables or DEFAULT_EVAL_TABLES
+        if eval_tables is not self.eval_tables:
+            self.eval_tables = eval_tables
+            self.compute_evaluation_terms()
+
     def initialize_pieces(self):
-        #pawns
-        for i in range(8):
-            self.board[1][i] = Cell(Piece('pawn', 'white', (1, i)))
-            self.board[6][i] = Cell(Piece('pawn', 'black', (6, i)))
-        #rooks
-        for i in range(0,8,7):
-            self.board[0][i] = Cell(Piece('rook', 'white', (0, i)))
-            self.board[7][i] = Cell(Piece('rook', 'black', (7, i)))
-        #knights
-        for i in range(1,7,5):
-            self.board[0][i] = Cell(Piece('knight', 'white', (0, i)))
-            self.board[7][i] = Cell(Piece('knight', 'black', (7, i)))
-        #bishops
-        for i in range(2,6,3):
-            self.board[0][i] = Cell(Piece('bishop', 'white', (0, i)))
-            self.board[7][i] = Cell(Piece('bishop', 'black', (7, i)))
-        #queen and kings
-        self.board[0][3] = Cell(Piece('queen', 'white', (0, 3)))
-        self.board[7][3] = Cell(Piece('queen', 'black', (7, 3)))
-        self.board[0][4] = Cell(Piece('king', 'white', (0, 4)))
-        self.board[7][4] = Cell(Piece('king', 'black', (7, 4)))
+        squares = self.squares
+        for col in range(8):
+            squares[square(0, col)] = WHITE | BACK_RANK[col]
+            squares[square(1, col)] = WHITE | PAWN
+            squares[square(6, col)] = BLACK | PAWN
+            squares[square(7, col)] = BLACK | BACK_RANK[col]
+        self.kings = {WHITE: square(0, 4), BLACK: square(7, 4)}
 
-    def disp_board(self):
-        pieces = {
-            'white': { 
-                'pawn': '♙', 'rook': '♖', 'knight': '♘',
-                'bishop': '♗', 'queen': '♕', 'king': '♔'
-            },
-            'black': {
-                'pawn': '♟', 'rook': '♜', 'knight': '♞',
-                'bishop': '♝', 'queen': '♛', 'king': '♚'
-            }
-        }
+    def piece_at(self, coord: Tuple[int, int]) -> Optional[Piece]:
+        """Return a Piece view of whatever stands on coord, or None."""
+        code = self.squares[square(coord[0], coord[1])]
+        if not code:
+            return None
+        piece = Piece(PIECE_NAMES[code & TYPE_MASK], COLOR_NAMES[code & COLOR_MASK], coord)
+        row = coord[0]
+        if piece.type == 'king':
+            rights = (WHITE_KINGSIDE | WHITE_QUEENSIDE) if code & WHITE else (BLACK_KINGSIDE | BLACK_QUEENSIDE)
+            piece.moved = not self.castling & rights
+        elif piece.type == 'rook':
+            piece.moved = not self.castling & ~CASTLING_MASK[square(coord[0], coord[1])]
+        elif piece.type == 'pawn':
+            piece.moved = row != (1 if code & WHITE else 6)
+            if self.en_passant is not None:
+                piece.new_pawn_two_squares = self.en_passant in (square(coord[0], coord[1]) - 10,
+                                                                 square(coord[0], coord[1]) + 10)
+        return piece
 
+    @property
+    def board(self) -> List[List[Cell]]:
+        """Cell/Piece view of the position, rebuilt on every access for the terminal UI."""
+        return [[Cell(self.piece_at((row, col))) for col in range(self.BOARD_SIZE)]
+                for row in range(self.BOARD_SIZE)]
+
+    def disp_board(self):
         to_print_board = [['[ ]' for _ in range(8)] for _ in range(8)]
 
-        for i in range(8):
-            for j in range(8):
-                if self.board[i][j].piece:
-                    piece = self.board[i][j].piece
-                    to_print_board[i][j] = '[' + pieces[piece.color][piece.type.lower()] + ']'
+        for sq in SQUARES:
+            code = self.squares[sq]
+            if code:
+                row, col = COORDS[sq]
+                symbol = self.PIECE_SYMBOLS[COLOR_NAMES[code & COLOR_MASK]][PIECE_NAMES[code & TYPE_MASK]]
+                to_print_board[row][col] = '[' + symbol + ']'
 
         to_print_board = to_print_board[::-1]
 
@@ -72,170 +355,688 @@ class ChessBoard:
             print(row_label, ' '.join(row))
             row_label -= 1
         print(column_label)
-    
-    def handle_promote(self, end: Tuple[int, int]) -> str:
-        """Handle pawn promotion with input validation."""
+
+    def handle_promote(self) -> str:
+        """Ask for a promotion piece with input validation."""
         valid_promotions = {
-            'q': 'queen', 'r': 'rook', 
+            'q': 'queen', 'r': 'rook',
             'k': 'knight', 'b': 'bishop'
         }
-        
+
         try:
             choice = input('Select promotion piece [Q)ueen R)ook K)night B)ishop]: ').lower()
-            piece_type = valid_promotions.get(choice, 'queen')  # Default to queen if invalid input
-            self.board[end[0]][end[1]].piece.type = piece_type
-            return choice
+            return valid_promotions.get(choice, 'queen')  # Default to queen if invalid input
         except Exception:
-            self.board[end[0]][end[1]].piece.type = 'queen'
-            return 'q'
-    
+            return 'queen'
+
     def push(self, start, end):
-        self.board[end[0]][end[1]].piece = self.board[start[0]][start[1]].piece
-        self.board[end[0]][end[1]].piece.moved = True
-        self.board[end[0]][end[1]].piece.coord = end
-        self.board[start[0]][start[1]].piece = None
+        self.make_move((start, end))
 
-    def move_piece(self, start: Tuple[int, int], end: Tuple[int, int], player_color: str) -> bool:
+    def move_piece(self, start: Tuple[int, int], end: Tuple[int, int], player_color: str,
+                   promotion: Optional[str] = None) -> bool:
         """
         Move a piece if the move is valid.
         Returns True if move was successful, False otherwise.
         """
-        start_cell = self.board[start[0]][start[1]]
-        if not start_cell.piece or start_cell.piece.color != player_color:
+        code = self.squares[square(start[0], start[1])]
+        if not code & COLOR_CODES[player_color]:
             return False
 
-        if start_cell.piece.is_valid_move(start, end, self):
-            self._execute_move(start, end)
-            
-            # Handle pawn promotion
-            end_piece = self.board[end[0]][end[1]].piece
-            if end_piece.type == 'pawn' and (end[0] == 0 or end[0] == self.BOARD_SIZE - 1):
-                print(f'{end_piece.type}:', start, end)
-                self.handle_promote(end)
-            
-            return True
-        return False
+        if not any(move[0] == start and move[1] == end for move in self.generate_moves(player_color)):
+            return False
 
-    def _execute_move(self, start: Tuple[int, int], end: Tuple[int, int]) -> None:
-        """Execute the actual piece movement."""
-        self.board[end[0]][end[1]].piece = self.board[start[0]][start[1]].piece
-        self.board[end[0]][end[1]].piece.moved = True
-        self.board[end[0]][end[1]].piece.coord = end
-        self.board[start[0]][start[1]].piece = None
+        # Handle pawn promotion
+        if code & TYPE_MASK == PAWN and (end[0] == 0 or end[0] == self.BOARD_SIZE - 1) and not promotion:
+            promotion = self.handle_promote()
+
+        self.make_move((start, end, promotion))
+        return True
+
+    def make_move(self, move: Move) -> None:
+        """
+        Play a move in place, including castling, en passant and promotion,
+        and push an undo record so unmake_move can restore the position.
+        """
+        squares = self.squares
+        start = 21 + move[0][0] * 10 + move[0][1]
+        end = 21 + move[1][0] * 10 + move[1][1]
+        moving = squares[start]
+        placed = moving
+        captured = squares[end]
+        captured_square = end
+        rook_move = None
+        piece_type = moving & TYPE_MASK
+        key = self.hash_key
+
+        if piece_type == PAWN:
+            if end == self.en_passant:
+                # En passant takes the pawn beside the start square
+                captured_square = end - 10 if moving & WHITE else end + 10
+                captured = squares[captured_square]
+                squares[captured_square] = EMPTY
+            elif end >= 91 or end <= 28:
+                promotion = move[2] if len(move) > 2 else None
+                placed = (moving & COLOR_MASK) | PIECE_CODES[promotion or 'queen']
+        elif piece_type == KING:
+            self.kings[moving & COLOR_MASK] = end
+            # Castling also relocates the rook
+            if end - start == 2:
+                rook_move = (start + 3, start + 1)
+            elif start - end == 2:
+                rook_move = (start - 4, start - 1)
+        self.move_stack.append((start, end, moving, placed, captured, captured_square, rook_move,
+                                self.castling, self.en_passant, self.hash_key, self.pawn_key,
+                                self.midgame_score, self.endgame_score, self.phase, self.halfmove_clock))
+
+        midgame, endgame = self.eval_tables
+        if rook_move:
+            rook = squares[rook_move[0]]
+            squares[rook_move[1]] = rook
+            squares[rook_move[0]] = EMPTY
+            key ^= ZOBRIST_PIECES[rook][rook_move[0]] ^ ZOBRIST_PIECES[rook][rook_move[1]]
+            self.midgame_score += midgame[rook][rook_move[1]] - midgame[rook][rook_move[0]]
+            self.endgame_score += endgame[rook][rook_move[1]] - endgame[rook][rook_move[0]]
+
+        squares[end] = placed
+        squares[start] = EMPTY
+        key ^= ZOBRIST_PIECES[moving][start] ^ ZOBRIST_PIECES[placed][end]
+        # Empty squares have zero entries, so quiet moves need no branch here
+        self.midgame_score += (midgame[placed][end] - midgame[moving][start]
+                               - midgame[captured][captured_square])
+        self.endgame_score += (endgame[placed][end] - endgame[moving][start]
+                               - endgame[captured][captured_square])
+        if piece_type == PAWN or captured & TYPE_MASK == PAWN:
+            self.pawn_key ^= (ZOBRIST_PAWNS[moving][start] ^ ZOBRIST_PAWNS[placed][end]
+                              ^ ZOBRIST_PAWNS[captured][captured_square])
+        if captured:
+            key ^= ZOBRIST_PIECES[captured][captured_square]
+            self.phase -= PHASE_WEIGHTS[captured]
+            self.piece_count -= 1
+        if placed != moving:
+            self.phase += PHASE_WEIGHTS[placed]
+
+        castling = self.castling & CASTLING_MASK[start] & CASTLING_MASK[end]
+        if castling != self.castling:
+            key ^= ZOBRIST_CASTLING[self.castling] ^ ZOBRIST_CASTLING[castling]
+            self.castling = castling
+        if self.en_passant is not None:
+            key ^= ZOBRIST_EN_PASSANT[self.en_passant]
+        if piece_type == PAWN and (end - start == 20 or start - end == 20):
+            self.en_passant = (start + end) // 2
+            key ^= ZOBRIST_EN_PASSANT[self.en_passant]
+        else:
+            self.en_passant = None
+
+        self.halfmove_clock = 0 if piece_type == PAWN or captured else self.halfmove_clock + 1
+        if self.to_move == 'black':
+            self.fullmove_number += 1
+        self.to_move = 'black' if self.to_move == 'white' else 'white'
+        self.hash_key = key ^ ZOBRIST_BLACK_TO_MOVE
+
+    def make_null_move(self) -> None:
+        """Pass the turn without moving, for null-move pruning. unmake_move takes it back."""
+        self.move_stack.append((None, self.en_passant, self.hash_key, self.halfmove_clock))
+        key = self.hash_key ^ ZOBRIST_BLACK_TO_MOVE
+        if self.en_passant is not None:
+            key ^= ZOBRIST_EN_PASSANT[self.en_passant]
+            self.en_passant = None
+        self.hash_key = key
+        self.halfmove_clock += 1
+        self.to_move = 'black' if self.to_move == 'white' else 'white'
+
+    def unmake_move(self) -> None:
+        """Take back the last move played with make_move or make_null_move."""
+        record = self.move_stack.pop()
+        if record[0] is None:
+            _, self.en_passant, self.hash_key, self.halfmove_clock = record
+            self.to_move = 'black' if self.to_move == 'white' else 'white'
+            return
+        (start, end, moving, placed, captured, captured_square, rook_move,
+         castling, en_passant, hash_key, pawn_key, midgame_score, endgame_score, phase, halfmove_clock) = record
+        squares = self.squares
+
+        squares[start] = moving
+        squares[end] = EMPTY
+        squares[captured_square] = captured
+        if moving & TYPE_MASK == KING:
+            self.kings[moving & COLOR_MASK] = start
+            if rook_move:
+                squares[rook_move[0]] = squares[rook_move[1]]
+                squares[rook_move[1]] = EMPTY
+
+        self.castling = castling
+        self.en_passant = en_passant
+        self.hash_key = hash_key
+        self.pawn_key = pawn_key
+        self.midgame_score = midgame_score
+        self.endgame_score = endgame_score
+        self.phase = phase
+        if captured:
+            self.piece_count += 1
+        self.halfmove_clock = halfmove_clock
+        self.to_move = 'black' if self.to_move == 'white' else 'white'
+        if self.to_move == 'black':
+            self.fullmove_number -= 1
 
     def switch_players(self):
         self.to_move = 'black' if self.to_move == 'white' else 'white'
-    
+        self.hash_key ^= ZOBRIST_BLACK_TO_MOVE
+
     def find_king(self, color):
-        for i in range(8):
-            for j in range(8):
-                piece = self.board[i][j].piece
-                if piece and piece.type == 'king' and piece.color == color:
-                    return (i, j)
-        return None
-    
+        king_square = self.kings[COLOR_CODES[color]]
+        return COORDS[king_square] if king_square is not None else None
+
     def is_check(self, color: str) -> bool:
         """Determine if the specified color's king is in check."""
-        king_pos = self.find_king(color)
-        if not king_pos:
+        us = COLOR_CODES[color]
+        king_square = self.kings[us]
+        if king_square is None:
             return False
-        
-        # Check all opponent pieces for attacks on king
-        opponent_color = 'black' if color == 'white' else 'white'
-        for i in range(self.BOARD_SIZE):
-            for j in range(self.BOARD_SIZE):
-                piece = self.board[i][j].piece
-                if piece and piece.color == opponent_color:
-                    if piece.can_move_to((i, j), king_pos, self):
+        return self._attacked(king_square, us ^ COLOR_MASK)
+
+    def is_square_attacked(self, square_coord: Tuple[int, int], by_color: str) -> bool:
+        """Check if any piece of by_color attacks the given square."""
+        return self._attacked(square(square_coord[0], square_coord[1]), COLOR_CODES[by_color])
+
+    def _attacked(self, sq: int, by: int) -> bool:
+        squares = self.squares
+
+        # Walk outwards from the square and look for a matching attacker
+        knight = by | KNIGHT
+        for target in KNIGHT_MOVES[sq]:
+            if squares[target] == knight:
+                return True
+        king = by | KING
+        for target in KING_MOVES[sq]:
+            if squares[target] == king:
+                return True
+
+        # Pawns attack diagonally forwards, so look one row behind the square
+        pawn = by | PAWN
+        if by == WHITE:
+            if squares[sq - 9] == pawn or squares[sq - 11] == pawn:
+                return True
+        elif squares[sq + 9] == pawn or squares[sq + 11] == pawn:
+            return True
+
+        rook, queen = by | ROOK, by | QUEEN
+        for ray in ROOK_RAYS[sq]:
+            for target in ray:
+                piece = squares[target]
+                if piece:
+                    if piece == rook or piece == queen:
                         return True
+                    break
+        bishop = by | BISHOP
+        for ray in BISHOP_RAYS[sq]:
+            for target in ray:
+                piece = squares[target]
+                if piece:
+                    if piece == bishop or piece == queen:
+                        return True
+                    break
+        return False
+
+    def generate_moves(self, color: str) -> List[Move]:
+        """
+        Generate every legal move for color as (start, end) coordinate pairs,
+        with a third promotion element for pawns reaching the last rank.
+        Moves are produced per piece from the precomputed step and ray tables,
+        then filtered against the position's checkers, pins and enemy attacks.
+        """
+        squares = self.squares
+        us = COLOR_CODES[color]
+        them = us ^ COLOR_MASK
+        candidates = []
+        append = candidates.append
+        for sq in SQUARES:
+            code = squares[sq]
+            if not code & us:
+                continue
+            piece_type = code & TYPE_MASK
+            if piece_type == PAWN:
+                self._pawn_candidates(sq, us, them, candidates)
+            elif piece_type == KNIGHT:
+                for target in KNIGHT_MOVES[sq]:
+                    if not squares[target] & us:
+                        append((sq, target, None))
+            elif piece_type == KING:
+                for target in KING_MOVES[sq]:
+                    if not squares[target] & us:
+                        append((sq, target, None))
+                self._castling_candidates(us, them, candidates)
+            else:
+                for ray in SLIDER_RAYS[piece_type][sq]:
+                    for target in ray:
+                        piece = squares[target]
+                        if piece:
+                            if piece & them:
+                                append((sq, target, None))
+                            break
+                        append((sq, target, None))
+        return self._legal_moves(candidates, us)
+
+    def generate_captures(self, color: str) -> List[Move]:
+        """
+        Generate the legal captures (en passant included) and queen promotions
+        for color, in generate_moves' format. Quiescence search only needs
+        these, so the quiet moves are never built or tested for legality.
+        """
+        squares = self.squares
+        us = COLOR_CODES[color]
+        them = us ^ COLOR_MASK
+        candidates = []
+        append = candidates.append
+        for sq in SQUARES:
+            code = squares[sq]
+            if not code & us:
+                continue
+            piece_type = code & TYPE_MASK
+            if piece_type == PAWN:
+                target = sq + (10 if us == WHITE else -10)
+                promotion = 'queen' if target >= 91 or target <= 28 else None
+                if promotion and not squares[target]:
+                    append((sq, target, promotion))
+                for capture in (target - 1, target + 1):
+                    if squares[capture] & them or capture == self.en_passant:
+                        append((sq, capture, promotion))
+            elif piece_type == KNIGHT or piece_type == KING:
+                for target in (KNIGHT_MOVES if piece_type == KNIGHT else KING_MOVES)[sq]:
+                    if squares[target] & them:
+                        append((sq, target, None))
+            else:
+                for ray in SLIDER_RAYS[piece_type][sq]:
+                    for target in ray:
+                        piece = squares[target]
+                        if piece:
+                            if piece & them:
+                                append((sq, target, None))
+                            break
+        return self._legal_moves(candidates, us)
+
+    def static_exchange(self, move: Move) -> int:
+        """
+        Static exchange evaluation: the material the side to move gains in
+        centipawns by playing move and letting both sides recapture on its
+        square with their least valuable attacker for as long as it pays.
+        Pieces behind an attacker join in once it has gone; pins are ignored.
+        """
+        squares = bytearray(self.squares)
+        start = 21 + move[0][0] * 10 + move[0][1]
+        end = 21 + move[1][0] * 10 + move[1][1]
+        moving = squares[start]
+        side = moving & COLOR_MASK
+        if moving & TYPE_MASK == PAWN and end == self.en_passant:
+            gains = [SEE_VALUES[PAWN]]
+            squares[end - 10 if side == WHITE else end + 10] = EMPTY
+        else:
+            gains = [SEE_VALUES[squares[end] & TYPE_MASK]]
+        on_square = SEE_VALUES[moving & TYPE_MASK]
+        if moving & TYPE_MASK == PAWN and (end >= 91 or end <= 28):
+            promoted = PIECE_CODES[move[2] if len(move) > 2 else 'queen']
+            gains[0] += SEE_VALUES[promoted] - SEE_VALUES[PAWN]
+            on_square = SEE_VALUES[promoted]
+        squares[start] = EMPTY
+
+        side ^= COLOR_MASK
+        while True:
+            attacker = self._least_valuable_attacker(squares, end, side)
+            if attacker is None:
+                break
+            # What this side stands to win by recapturing, if the opponent then stops
+            gains.append(on_square - gains[-1])
+            on_square = SEE_VALUES[squares[attacker] & TYPE_MASK]
+            squares[attacker] = EMPTY
+            side ^= COLOR_MASK
+        # Either side may decline to continue the exchange, so fold the gains back from the end
+        while len(gains) > 1:
+            last = gains.pop()
+            gains[-1] = -max(-gains[-1], last)
+        return gains[0]
+
+    @staticmethod
+    def _least_valuable_attacker(squares, sq: int, by: int) -> Optional[int]:
+        """Square of the cheapest piece of color by attacking sq on squares, or None."""
+        pawn = by | PAWN
+        behind = sq - 10 if by == WHITE else sq + 10
+        if squares[behind - 1] == pawn:
+            return behind - 1
+        if squares[behind + 1] == pawn:
+            return behind + 1
+        knight = by | KNIGHT
+        for source in KNIGHT_MOVES[sq]:
+            if squares[source] == knight:
+                return source
+        # The first piece along each ray is the only one that can attack through it
+        diagonal = []
+        for ray in BISHOP_RAYS[sq]:
+            for source in ray:
+                if squares[source]:
+                    diagonal.append(source)
+                    break
+        straight = []
+        for ray in ROOK_RAYS[sq]:
+            for source in ray:
+                if squares[source]:
+                    straight.append(source)
+                    break
+        for source in diagonal:
+            if squares[source] == by | BISHOP:
+                return source
+        for source in straight:
+            if squares[source] == by | ROOK:
+                return source
+        queen = by | QUEEN
+        for source in diagonal + straight:
+            if squares[source] == queen:
+                return source
+        king = by | KING
+        for source in KING_MOVES[sq]:
+            if squares[source] == king:
+                return source
+        return None
+
+    def _pawn_candidates(self, sq, us, them, candidates):
+        squares = self.squares
+        forward = 10 if us == WHITE else -10
+        target = sq + forward
+
+        # Pawns reaching the last rank produce one move per promotion piece
+        if target >= 91 or target <= 28:
+            if not squares[target]:
+                candidates.extend((sq, target, promotion) for promotion in PROMOTION_TYPES)
+            for capture in (target - 1, target + 1):
+                if squares[capture] & them:
+                    candidates.extend((sq, capture, promotion) for promotion in PROMOTION_TYPES)
+            return
+
+        # Forward pushes, two squares from the home row
+        if not squares[target]:
+            candidates.append((sq, target, None))
+            home_row = 31 <= sq <= 38 if us == WHITE else 81 <= sq <= 88
+            if home_row and not squares[target + forward]:
+                candidates.append((sq, target + forward, None))
+
+        # Captures, including en passant onto the square behind a pawn that just moved two squares
+        for capture in (target - 1, target + 1):
+            if squares[capture] & them or capture == self.en_passant:
+                candidates.append((sq, capture, None))
+
+    def _castling_candidates(self, us, them, candidates):
+        squares = self.squares
+        for right, king_start, king_end, rook_start, empty, transit in CASTLING_MOVES[us]:
+            if not self.castling & right or squares[rook_start] != us | ROOK:
+                continue
+            if any(squares[sq] for sq in empty):
+                continue
+            # Check, the transit square and the destination are left to the legality filter
+            candidates.append((king_start, king_end, None))
+
+    def _legal_moves(self, candidates, us) -> List[Move]:
+        """
+        Keep the pseudo-legal (start, end, promotion) candidates that do not
+        leave us in check and convert them to coordinate moves. The king may
+        only step to unattacked squares, and castles only out of check over an
+        unattacked transit square. Other pieces must block or capture a single
+        checker and stay on their pin ray. En passant removes two pieces from
+        one rank, so it alone is tested by playing it on the board.
+        """
+        king_square = self.kings[us]
+        moves = []
+        append = moves.append
+        if king_square is None:
+            for start, end, promotion in candidates:
+                append((COORDS[start], COORDS[end], promotion) if promotion else (COORDS[start], COORDS[end]))
+            return moves
+
+        attacked, evasions, pins = self._legality(us, king_square)
+        en_passant = self.en_passant
+        squares = self.squares
+        for start, end, promotion in candidates:
+            if start == king_square:
+                if attacked[end]:
+                    continue
+                if (end == start + 2 or end == start - 2) and (evasions is not None or attacked[(start + end) >> 1]):
+                    continue
+            elif end == en_passant and squares[start] & TYPE_MASK == PAWN:
+                if not self._is_king_safe_after(start, end, us, king_square):
+                    continue
+            else:
+                if evasions is not None and end not in evasions:
+                    continue
+                if start in pins and end not in pins[start]:
+                    continue
+            append((COORDS[start], COORDS[end], promotion) if promotion else (COORDS[start], COORDS[end]))
+        return moves
+
+    def _legality(self, us, king_square):
+        """
+        Everything the legality filter needs, computed once per position:
+        the squares them attacks with our king lifted off the board, the
+        squares a non-king move must land on (None when not in check, empty
+        in double check) and the ray from the king through each pinned piece
+        to its pinner.
+        """
+        squares = self.squares
+        them = us ^ COLOR_MASK
+        checks = []
+        pins = {}
+
+        knight = them | KNIGHT
+        for target in KNIGHT_MOVES[king_square]:
+            if squares[target] == knight:
+                checks.append((target,))
+        pawn = them | PAWN
+        for target in ((king_square + 9, king_square + 11) if us == WHITE else (king_square - 9, king_square - 11)):
+            if squares[target] == pawn:
+                checks.append((target,))
+
+        # Walk each ray from the king: an enemy slider behind zero own pieces checks, behind one it pins
+        queen = them | QUEEN
+        for rays, slider in ((ROOK_RAYS, them | ROOK), (BISHOP_RAYS, them | BISHOP)):
+            for ray in rays[king_square]:
+                shield = None
+                for index, target in enumerate(ray):
+                    piece = squares[target]
+                    if not piece:
+                        continue
+                    if piece & us:
+                        if shield is not None:
+                            break
+                        shield = target
+                        continue
+                    if piece == slider or piece == queen:
+                        if shield is None:
+                            checks.append(ray[:index + 1])
+                        else:
+                            pins[shield] = ray[:index + 1]
+                    break
+
+        if not checks:
+            evasions = None
+        elif len(checks) == 1:
+            evasions = checks[0]
+        else:
+            evasions = ()
+        return self._attack_map(them, king_square), evasions, pins
+
+    def _attack_map(self, them, king_square):
+        """Flags indexed by square for every square them attacks, seeing through our king."""
+        squares = self.squares
+        attacked = bytearray(120)
+        king = squares[king_square]
+        squares[king_square] = EMPTY
+        for sq in SQUARES:
+            code = squares[sq]
+            if not code & them:
+                continue
+            piece_type = code & TYPE_MASK
+            if piece_type == PAWN:
+                forward = 10 if them == WHITE else -10
+                attacked[sq + forward - 1] = attacked[sq + forward + 1] = 1
+            elif piece_type == KNIGHT or piece_type == KING:
+                for target in (KNIGHT_MOVES if piece_type == KNIGHT else KING_MOVES)[sq]:
+                    attacked[target] = 1
+            else:
+                for ray in SLIDER_RAYS[piece_type][sq]:
+                    for target in ray:
+                        attacked[target] = 1
+                        if squares[target]:
+                            break
+        squares[king_square] = king
+        return attacked
+
+    def _is_king_safe_after(self, start, end, us, king_square):
+        """Play a candidate move in place, test the king and put everything back."""
+        squares = self.squares
+        moving = squares[start]
+        captured = squares[end]
+        squares[end] = moving
+        squares[start] = EMPTY
+
+        # En passant removes a pawn from a square other than the destination
+        en_passant_square = None
+        if end == self.en_passant and moving & TYPE_MASK == PAWN:
+            en_passant_square = end - 10 if us == WHITE else end + 10
+            en_passant_pawn = squares[en_passant_square]
+            squares[en_passant_square] = EMPTY
+
+        if moving & TYPE_MASK == KING:
+            king_square = end
+        safe = king_square is None or not self._attacked(king_square, us ^ COLOR_MASK)
+
+        squares[start] = moving
+        squares[end] = captured
+        if en_passant_square:
+            squares[en_passant_square] = en_passant_pawn
+        return safe
+
+    def has_non_pawn_material(self, color: str) -> bool:
+        """True if color has a knight, bishop, rook or queen, the usual guard against zugzwang."""
+        us = COLOR_CODES[color]
+        squares = self.squares
+        for sq in SQUARES:
+            code = squares[sq]
+            if code & us and code & TYPE_MASK not in (PAWN, KING):
+                return True
         return False
-    
+
     def is_mate(self, color):
-        for i in range(8):
-            for j in range(8):
-                piece = self.board[i][j].piece
-                if piece and piece.color == color:
-                    for k in range(8):
-                        for l in range(8):
-                            if piece.is_valid_move((i, j), (k, l), self):
-                                return False
-        return True # mate
-
-    def reset_pawn_flags(self):
-        for row in self.board:
-            for cell in row:
-                if cell.piece and cell.piece.type == 'pawn' and cell.piece.color == self.to_move:
-                    cell.piece.new_pawn_two_squares = False
+        """True when color has no legal moves (checkmate or stalemate)."""
+        return not self.generate_moves(color)
 
     def clone(self):
-        cloned_board = ChessBoard.__new__(ChessBoard)
+        cloned_board = self.__class__.__new__(self.__class__)
 
-        cloned_board.board = [[cell.clone() for cell in row] for row in self.board]
+        cloned_board.squares = bytearray(self.squares)
+        cloned_board.kings = dict(self.kings)
         cloned_board.to_move = self.to_move
         cloned_board.game_over = self.game_over
+        cloned_board.castling = self.castling
+        cloned_board.en_passant = self.en_passant
+        cloned_board.move_stack = list(self.move_stack)
+        cloned_board.hash_key = self.hash_key
+        cloned_board.pawn_key = self.pawn_key
+        cloned_board.eval_tables = self.eval_tables
+        cloned_board.midgame_score = self.midgame_score
+        cloned_board.endgame_score = self.endgame_score
+        cloned_board.phase = self.phase
+        cloned_board.piece_count = self.piece_count
+        cloned_board.halfmove_clock = self.halfmove_clock
+        cloned_board.fullmove_number = self.fullmove_number
 
         return cloned_board
 
     def get_fen(self) -> str:
         """Returns the current board state in Forsyth–Edwards Notation (FEN)."""
-        # Dictionary to map piece types to FEN characters
-        fen_symbols = {
-            ('white', 'pawn'): 'P', ('white', 'rook'): 'R',
-            ('white', 'knight'): 'N', ('white', 'bishop'): 'B',
-            ('white', 'queen'): 'Q', ('white', 'king'): 'K',
-            ('black', 'pawn'): 'p', ('black', 'rook'): 'r',
-            ('black', 'knight'): 'n', ('black', 'bishop'): 'b',
-            ('black', 'queen'): 'q', ('black', 'king'): 'k'
-        }
-        
         fen_parts = []
         # Process board position
         for row in range(7, -1, -1):  # FEN starts from rank 8 (index 7)
             empty_squares = 0
             row_str = ''
-            
+
             for col in range(8):
-                piece = self.board[row][col].piece
-                if piece is None:
+                code = self.squares[square(row, col)]
+                if not code:
                     empty_squares += 1
                 else:
                     if empty_squares > 0:
                         row_str += str(empty_squares)
                         empty_squares = 0
-                    row_str += fen_symbols[(piece.color, piece.type)]
-            
+                    row_str += FEN_SYMBOLS[code]
+
             if empty_squares > 0:
                 row_str += str(empty_squares)
             fen_parts.append(row_str)
-        
+
         position = '/'.join(fen_parts)
         active_color = 'w' if self.to_move == 'white' else 'b'
-        
-        # For now, using placeholder values for castling and en passant
-        # These could be implemented more accurately with additional tracking
-        castling = 'KQkq'  # Assuming all castling rights available
-        en_passant = '-'   # No en passant target
-        halfmove = '0'     # Placeholder for halfmove clock
-        fullmove = '1'     # Placeholder for fullmove number
-        
-        return f"{position} {active_color} {castling} {en_passant} {halfmove} {fullmove}"
+        castling = ''.join(symbol for right, symbol in CASTLING_SYMBOLS if self.castling & right) or '-'
+        en_passant = cartesian_to_algebraic(*COORDS[self.en_passant]) if self.en_passant is not None else '-'
+
+        return f"{position} {active_color} {castling} {en_passant} {self.halfmove_clock} {self.fullmove_number}"
+
+    def get_position_key(self) -> str:
+        """FEN without the move counters, for lookups that should not depend on move history."""
+        return self.get_fen().rsplit(' ', 2)[0]
+
+    def get_san(self, move: Move) -> str:
+        """Standard algebraic notation of a legal move in the current position, with check and mate marks."""
+        start = square(move[0][0], move[0][1])
+        end = square(move[1][0], move[1][1])
+        code = self.squares[start]
+        piece_type = code & TYPE_MASK
+
+        if piece_type == KING and abs(end - start) == 2:
+            san = 'O-O' if end > start else 'O-O-O'
+        else:
+            capture = 'x' if self.is_capture(move[0], move[1]) else ''
+            target = cartesian_to_algebraic(*move[1])
+            if piece_type == PAWN:
+                san = (cartesian_to_algebraic(*move[0])[0] + capture if capture else '') + target
+                if move[1][0] in (0, 7):
+                    promotion = move[2] if len(move) > 2 and move[2] else 'queen'
+                    san += '=' + FEN_SYMBOLS[WHITE | PIECE_CODES[promotion]]
+            else:
+                # Name the start file, rank or both when another piece of the same kind can reach the target
+                rivals = [other[0] for other in self.generate_moves(self.to_move)
+                          if other[1] == move[1] and other[0] != move[0]
+                          and self.squares[square(other[0][0], other[0][1])] == code]
+                origin = cartesian_to_algebraic(*move[0])
+                if not rivals:
+                    disambiguation = ''
+                elif all(rival[1] != move[0][1] for rival in rivals):
+                    disambiguation = origin[0]
+                elif all(rival[0] != move[0][0] for rival in rivals):
+                    disambiguation = origin[1]
+                else:
+                    disambiguation = origin
+                san = FEN_SYMBOLS[WHITE | piece_type] + disambiguation + capture + target
+
+        self.make_move(move)
+        if self.is_check(self.to_move):
+            san += '+' if self.generate_moves(self.to_move) else '#'
+        self.unmake_move()
+        return san
+
+    def is_insufficient_material(self) -> bool:
+        """True when neither side can ever mate: bare kings, or kings and a single minor piece."""
+        minors = 0
+        for sq in SQUARES:
+            piece_type = self.squares[sq] & TYPE_MASK
+            if piece_type in (PAWN, ROOK, QUEEN):
+                return False
+            if piece_type in (KNIGHT, BISHOP):
+                minors += 1
+        return minors <= 1
 
     def is_capture(self, start: Tuple[int, int], end: Tuple[int, int]) -> bool:
         """Check if a move from start to end position results in a capture."""
-        # Check if there's a piece at the end position
-        end_piece = self.board[end[0]][end[1]].piece
-        if not end_piece:
-            # Special case: en passant capture for pawns
-            if self.board[start[0]][start[1]].piece.type == 'pawn':
-                if abs(end[1] - start[1]) == 1:  # Diagonal move
-                    # Check for adjacent pawn that just moved two squares
-                    adjacent_piece = self.board[start[0]][end[1]].piece
-                    if (adjacent_piece and 
-                        adjacent_piece.type == 'pawn' and 
-                        adjacent_piece.color != self.board[start[0]][start[1]].piece.color and
-                        adjacent_piece.new_pawn_two_squares):
-                        return True
-            return False
-        
+        squares = self.squares
+        moving = squares[square(start[0], start[1])]
+        end_square = square(end[0], end[1])
         # Regular capture: check if the end position has an opponent's piece
-        return end_piece.color != self.board[start[0]][start[1]].piece.color
\ No newline at end of file
+        if squares[end_square] & (moving & COLOR_MASK ^ COLOR_MASK):
+            return True
+        # Special case: en passant capture for pawns
+        return moving & TYPE_MASK == PAWN and end_square == self.en_passant
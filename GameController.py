@@ -3,24 +3,25 @@ from AI import Player
 from Utils import *
 
 class GameController:
-    def __init__(self) -> None:
-        self.board = ChessBoard()
+    def __init__(self, board_class=ChessBoard) -> None:
+        # board_class can be ChessBoard or BitBoard; both expose the same interface
+        self.board = board_class()
         self.players = {
             'white': Player('white'),
             'black': Player('black')
         }
     
     def handle_post_move(self):
-        self.board.switch_players()
-
+        # One generation pass answers both mate and stalemate
+        has_moves = bool(self.board.generate_moves(self.board.to_move))
         if self.board.is_check(self.board.to_move):
-            if self.board.is_mate(self.board.to_move):
+            if not has_moves:
                 self.board.game_over = True
                 print(f'Checkmate! {self.board.to_move.capitalize()} loses!')
             else:
                 print('King is in check!')
         else:
-            if self.board.is_mate(self.board.to_move):
+            if not has_moves:
                 self.board.game_over = True
                 print('Stalemate!')
     
@@ -59,13 +60,12 @@ class GameController:
         if black_ai == 'y':
             self.players['black'].human = False
         
-        depth = 2
+        move_time = 5.0  # seconds per AI move
             
         while not self.board.game_over:
             # Display Board
             self.board.disp_board()
             
-            self.board.reset_pawn_flags()
             print(f'{self.board.to_move.capitalize()} to Move!')
 
             if self.players[self.board.to_move].human:
@@ -77,10 +77,11 @@ class GameController:
                 else:
                     print('Invalid move, try again.')
             else:
-                ai_move = self.players[self.board.to_move].select_move(self.board, depth)
+                ai_move = self.players[self.board.to_move].select_move(self.board, movetime=move_time)
                 if ai_move:
-                    start_position, end_position = ai_move
-                    if self.board.move_piece(start_position, end_position, self.board.to_move):
+                    start_position, end_position = ai_move[0], ai_move[1]
+                    promotion = ai_move[2] if len(ai_move) > 2 else None
+                    if self.board.move_piece(start_position, end_position, self.board.to_move, promotion):
                         print(f'AI moves from {start_position} to {end_position}')
                         self.handle_post_move()
                     else:
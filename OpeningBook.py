@@ -0,0 +1,200 @@
+import mmap
+import os
+import random
+import struct
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ChessBoard import (COLOR_CODES, COLOR_MASK, COORDS, KING, PAWN, SQUARES, TYPE_MASK, WHITE,
+                        WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE, square)
+from polyglot_data import RANDOM64
+
+# Polyglot .bin entry: big-endian key, move, weight and learn data, 16 bytes, sorted by key
+ENTRY = struct.Struct('>QHHI')
+KEY = struct.Struct('>Q')
+
+# Offsets into the 781-number Random64 table
+RANDOM_PIECE = 0  # 64 * kind + 8 * row + file, kind = 2 * (type - 1) + (1 if white)
+RANDOM_CASTLE = 768  # white short, white long, black short, black long
+RANDOM_EN_PASSANT = 772  # + file
+RANDOM_TURN = 780  # white to move
+RANDOM64_SIZE = 781
+
+POLYGLOT_PROMOTIONS = {1: 'knight', 2: 'bishop', 3: 'rook', 4: 'queen'}
+POLYGLOT_PROMOTION_CODES = {name: code for code, name in POLYGLOT_PROMOTIONS.items()}
+CASTLE_RIGHTS = (WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE)
+
+# The standard Polyglot table, so books from other tools are read as written; load_random64
+# reads another table for books hashed with one
+DEFAULT_RANDOM64 = RANDOM64
+
+def load_random64(path: str) -> Tuple[int, ...]:
+    """Read a Random64 table written as 781 hex numbers, e.g. the array from Polyglot's source."""
+    with open(path) as table:
+        text = table.read()
+    numbers = []
+    for token in text.replace(',', ' ').replace('{', ' ').replace('}', ' ').split():
+        token = token.rstrip('ULul;')
+        if token.lower().startswith('0x'):
+            numbers.append(int(token, 16))
+    if len(numbers) != RANDOM64_SIZE:
+        raise ValueError(f'Random64 table needs {RANDOM64_SIZE} numbers, found {len(numbers)} in {path}')
+    return tuple(numbers)
+
+def polyglot_key(board, randoms: Sequence[int] = DEFAULT_RANDOM64) -> int:
+    """Polyglot hash of the position on board, computed with the given Random64 table."""
+    key = 0
+    squares = board.squares
+    for sq in SQUARES:
+        code = squares[sq]
+        if code:
+            row, col = COORDS[sq]
+            kind = 2 * ((code & TYPE_MASK) - 1) + (code & COLOR_MASK == WHITE)
+            key ^= randoms[RANDOM_PIECE + 64 * kind + 8 * row + col]
+    for index, right in enumerate(CASTLE_RIGHTS):
+        if board.castling & right:
+            key ^= randoms[RANDOM_CASTLE + index]
+    # Polyglot only hashes the en passant file when a pawn of the side to move can capture there
+    if board.en_passant is not None:
+        us = COLOR_CODES[board.to_move]
+        behind = -10 if us == WHITE else 10
+        target = board.en_passant + behind
+        if squares[target - 1] == us | PAWN or squares[target + 1] == us | PAWN:
+            key ^= randoms[RANDOM_EN_PASSANT + COORDS[board.en_passant][1]]
+    if board.to_move == 'white':
+        key ^= randoms[RANDOM_TURN]
+    return key
+
+def decode_polyglot_move(code: int, board):
+    """Turn a Polyglot move into the board's move format; castling is stored as king takes rook."""
+    start = (code >> 9 & 7, code >> 6 & 7)
+    end = (code >> 3 & 7, code & 7)
+    piece = board.squares[square(*start)]
+    if piece & TYPE_MASK == KING and start[1] == 4 and end[0] == start[0] and end[1] in (0, 7):
+        end = (end[0], 6 if end[1] == 7 else 2)
+    promotion = POLYGLOT_PROMOTIONS.get(code >> 12 & 7)
+    return (start, end, promotion) if promotion else (start, end)
+
+def encode_polyglot_move(move, board) -> int:
+    start, end = move[0], move[1]
+    piece = board.squares[square(*start)]
+    if piece & TYPE_MASK == KING and abs(end[1] - start[1]) == 2:
+        end = (end[0], 7 if end[1] > start[1] else 0)
+    promotion = move[2] if len(move) > 2 else None
+    if promotion is None and piece & TYPE_MASK == PAWN and end[0] in (0, 7):
+        promotion = 'queen'  # a missing promotion means queen
+    return (POLYGLOT_PROMOTION_CODES.get(promotion, 0) << 12 | start[0] << 9 | start[1] << 6
+            | end[0] << 3 | end[1])
+
+def write_book(path: str, entries: Iterable[Tuple[int, int, int, int]]) -> int:
+    """Write (key, move, weight, learn) entries as a Polyglot book, sorted as readers expect. Returns the count."""
+    entries = sorted(entries, key=lambda entry: (entry[0], -entry[2]))
+    with open(path, 'wb') as book:
+        for entry in entries:
+            book.write(ENTRY.pack(*entry))
+    return len(entries)
+
+def build_book(path: str, games: Iterable[Sequence], board_class, max_ply: int = 16,
+               randoms: Sequence[int] = DEFAULT_RANDOM64) -> int:
+    """
+    Write a book from games given as move sequences from the start position.
+    Each move's weight is the number of games that played it, capped at the
+    16-bit field size. Returns the number of entries written.
+    """
+    counts: Dict[Tuple[int, int], int] = {}
+    for moves in games:
+        board = board_class()
+        for move in moves[:max_ply]:
+            entry = (polyglot_key(board, randoms), encode_polyglot_move(move, board))
+            counts[entry] = counts.get(entry, 0) + 1
+            board.make_move(move)
+    return write_book(path, ((key, move, min(count, 0xFFFF), 0) for (key, move), count in counts.items()))
+
+class OpeningBook:
+    """
+    Read-only Polyglot .bin book. The file is memory-mapped and searched in
+    place with a binary search on the key, so opening it costs nothing however
+    large it is, and processes using the same book share one copy through the
+    page cache.
+
+    selection is 'weighted' (random in proportion to the entry weights) or
+    'best' (highest weight). max_ply stops using the book after that many plies
+    of the game, counted from the board's move number.
+    """
+
+    def __init__(self, path: str, selection: str = 'weighted', max_ply: Optional[int] = None,
+                 randoms: Sequence[int] = DEFAULT_RANDOM64, seed: Optional[int] = None) -> None:
+        if selection not in ('weighted', 'best'):
+            raise ValueError(f'Unknown book selection {selection!r}')
+        self.path = path
+        self.selection = selection
+        self.max_ply = max_ply
+        self.randoms = randoms
+        self.random = random.Random(seed)
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self.entries = size // ENTRY.size
+        # mmap refuses empty files, and an empty book needs no mapping
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.entries else None
+
+    def __len__(self) -> int:
+        return self.entries
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __getstate__(self):
+        # Process pools pickle the book by path; each process maps the file itself
+        return {'path': self.path, 'selection': self.selection, 'max_ply': self.max_ply, 'randoms': self.randoms}
+
+    def __setstate__(self, state) -> None:
+        self.__init__(**state)
+
+    def _lower_bound(self, key: int) -> int:
+        low, high = 0, self.entries
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self._map, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def probe(self, board) -> List[Tuple[tuple, int, int]]:
+        """All legal book moves for the position as (move, weight, learn), highest weight first."""
+        if self._map is None:
+            return []
+        key = polyglot_key(board, self.randoms)
+        index = self._lower_bound(key)
+        found = []
+        while index < self.entries:
+            entry_key, code, weight, learn = ENTRY.unpack_from(self._map, index * ENTRY.size)
+            if entry_key != key:
+                break
+            found.append((decode_polyglot_move(code, board), weight, learn))
+            index += 1
+        if not found:
+            return []
+        # A key collision or a corrupt book must never make the engine play an illegal move
+        legal = {(move[0], move[1]) for move in board.generate_moves(board.to_move)}
+        found = [entry for entry in found if (entry[0][0], entry[0][1]) in legal]
+        found.sort(key=lambda entry: entry[1], reverse=True)
+        return found
+
+    def choose(self, board):
+        """Pick a book move for the position, or None when out of book."""
+        if self.max_ply is not None:
+            ply = 2 * (board.fullmove_number - 1) + (board.to_move == 'black')
+            if ply >= self.max_ply:
+                return None
+        found = self.probe(board)
+        if not found:
+            return None
+        if self.selection == 'best':
+            return found[0][0]
+        weights = [weight for _, weight, _ in found]
+        if not any(weights):
+            return self.random.choice(found)[0]
+        return self.random.choices([move for move, _, _ in found], weights)[0]
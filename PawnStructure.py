@@ -0,0 +1,115 @@
+from array import array
+from typing import Dict, Tuple
+
+from ChessBoard import SQUARES, COORDS, PAWN, WHITE, BLACK
+
+# (midgame, endgame) terms in centipawns for the pawn's own side
+DOUBLED = (-10, -20)  # per pawn beyond the first on a file
+ISOLATED = (-10, -15)  # no friendly pawn on either neighbouring file
+BACKWARD = (-8, -12)  # every neighbouring pawn is further advanced and an enemy pawn guards the stop square
+# By rank counted from the pawn's own side; a passed pawn has no enemy pawn ahead on its own or a
+# neighbouring file, and no friendly pawn ahead on its own file
+PASSED_MIDGAME = (0, 5, 10, 15, 25, 45, 70, 0)
+PASSED_ENDGAME = (0, 10, 15, 25, 45, 75, 120, 0)
+
+ENTRY_BYTES = 16  # one 64-bit key plus the two 32-bit scores
+
+# (square, row, file + 1) of every square a pawn can stand on
+PAWN_SQUARES = tuple((sq, COORDS[sq][0], COORDS[sq][1] + 1) for sq in SQUARES if 1 <= COORDS[sq][0] <= 6)
+
+def _side_terms(own, enemy):
+    """
+    (midgame, endgame) for one side's pawns. Both arguments hold each side's
+    ranks counted from its own back rank, by file with a guard file at each end,
+    so an enemy pawn on rank r stands on rank 7 - r from this side's view.
+    """
+    midgame = endgame = 0
+    enemy_lowest = [min(ranks) if ranks else 8 for ranks in enemy]
+    for file in range(1, 9):
+        ranks = own[file]
+        if not ranks:
+            continue
+        if len(ranks) > 1:
+            midgame += DOUBLED[0] * (len(ranks) - 1)
+            endgame += DOUBLED[1] * (len(ranks) - 1)
+        neighbours = own[file - 1] + own[file + 1]
+        front = max(ranks)
+        blockers = min(enemy_lowest[file - 1], enemy_lowest[file], enemy_lowest[file + 1])
+        for rank in ranks:
+            if not neighbours:
+                midgame += ISOLATED[0]
+                endgame += ISOLATED[1]
+            elif min(neighbours) > rank and (5 - rank in enemy[file - 1] or 5 - rank in enemy[file + 1]):
+                # An enemy pawn two ranks ahead on a neighbouring file guards the stop square
+                midgame += BACKWARD[0]
+                endgame += BACKWARD[1]
+            if rank == front and blockers >= 7 - rank:
+                midgame += PASSED_MIDGAME[rank]
+                endgame += PASSED_ENDGAME[rank]
+    return midgame, endgame
+
+def evaluate_pawns(squares) -> Tuple[int, int]:
+    """White-minus-black (midgame, endgame) pawn structure terms of a mailbox."""
+    white = [[] for _ in range(10)]
+    black = [[] for _ in range(10)]
+    white_pawn, black_pawn = WHITE | PAWN, BLACK | PAWN
+    for sq, row, file in PAWN_SQUARES:
+        code = squares[sq]
+        if code == white_pawn:
+            white[file].append(row)
+        elif code == black_pawn:
+            black[file].append(7 - row)
+    white_midgame, white_endgame = _side_terms(white, black)
+    black_midgame, black_endgame = _side_terms(black, white)
+    return white_midgame - black_midgame, white_endgame - black_endgame
+
+class PawnHashTable:
+    """
+    Fixed-size cache of evaluate_pawns results keyed by the board's pawn-only
+    Zobrist key, preallocated as flat arrays like the TranspositionTable.
+    Pawn moves and pawn captures are the only moves that change the key,
+    so most evaluations in a search find their entry here.
+    """
+
+    def __init__(self, size_mb: float = 1) -> None:
+        entries = max(1, int(size_mb * 1024 * 1024) // ENTRY_BYTES)
+        self.entries = 1 << (entries.bit_length() - 1)
+        self.mask = self.entries - 1
+        # A zeroed slot holds the correct entry for key 0, the position without pawns
+        self.keys = array('Q', [0]) * self.entries
+        self.midgame = array('i', [0]) * self.entries
+        self.endgame = array('i', [0]) * self.entries
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self) -> None:
+        for i in range(self.entries):
+            self.keys[i] = 0
+            self.midgame[i] = 0
+            self.endgame[i] = 0
+        self.reset_stats()
+
+    def evaluate(self, board) -> Tuple[int, int]:
+        """The board's pawn structure terms, from the table or computed and stored."""
+        self.probes += 1
+        key = board.pawn_key
+        index = key & self.mask
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.midgame[index], self.endgame[index]
+        midgame, endgame = evaluate_pawns(board.squares)
+        self.keys[index] = key
+        self.midgame[index] = midgame
+        self.endgame[index] = endgame
+        return midgame, endgame
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'size_entries': self.entries,
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.probes if self.probes else 0.0,
+        }
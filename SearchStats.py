@@ -0,0 +1,93 @@
+import json
+from typing import Dict, List
+
+PHASES = ('movegen', 'eval', 'ordering')
+
+# Counters that add up when a parallel search merges its workers' statistics
+SUMMED_COUNTERS = ('qnodes', 'cutoffs', 'first_move_cutoffs', 'tt_probes', 'tt_hits', 'tt_cutoffs', 'tb_hits',
+                   'null_cutoffs', 'lmr_researches', 'futility_prunes', 'pawn_probes', 'pawn_hits')
+
+class SearchStats:
+    """
+    Statistics of one select_move call. The search fills the counters as it
+    runs; select_move adds the transposition table counters, totals and the
+    result when it finishes.
+
+    nodes counts every node, qnodes the quiescence share of them.
+    phase_time is only filled when the Player was created with time_phases=True.
+    """
+
+    def __init__(self) -> None:
+        self.nodes = 0
+        self.qnodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_cutoffs = 0
+        self.tb_hits = 0  # endgame table probes that answered
+        self.null_cutoffs = 0
+        self.lmr_researches = 0  # reduced searches that beat alpha and were searched again at full depth
+        self.futility_prunes = 0
+        self.pawn_probes = 0  # pawn structure lookups by the evaluation
+        self.pawn_hits = 0
+        self.depth = 0
+        self.seldepth = 0
+        self.iteration_nodes: List[int] = []  # nodes spent on each completed iteration
+        self.time = 0.0
+        self.phase_time: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+        self.move = None
+        self.score = None
+        self.book = False
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.time if self.time else 0.0
+
+    @property
+    def effective_branching_factor(self) -> float:
+        """Node growth from the second-to-last to the last completed iteration."""
+        if len(self.iteration_nodes) < 2 or not self.iteration_nodes[-2]:
+            return 0.0
+        return self.iteration_nodes[-1] / self.iteration_nodes[-2]
+
+    def merge(self, counters: Dict) -> None:
+        """Add counters from a worker's as_dict() into these statistics."""
+        for name in SUMMED_COUNTERS:
+            setattr(self, name, getattr(self, name) + counters[name])
+        self.seldepth = max(self.seldepth, counters['seldepth'])
+        for phase in PHASES:
+            self.phase_time[phase] += counters['phase_time'][phase]
+
+    def as_dict(self) -> Dict:
+        return {
+            'move': self.move,
+            'score': self.score,
+            'book': self.book,
+            'depth': self.depth,
+            'seldepth': self.seldepth,
+            'nodes': self.nodes,
+            'qnodes': self.qnodes,
+            'nps': self.nps,
+            'time': self.time,
+            'cutoffs': self.cutoffs,
+            'first_move_cutoffs': self.first_move_cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_hit_rate': self.tt_hits / self.tt_probes if self.tt_probes else 0.0,
+            'tt_cutoffs': self.tt_cutoffs,
+            'tb_hits': self.tb_hits,
+            'null_cutoffs': self.null_cutoffs,
+            'lmr_researches': self.lmr_researches,
+            'futility_prunes': self.futility_prunes,
+            'pawn_probes': self.pawn_probes,
+            'pawn_hits': self.pawn_hits,
+            'pawn_hit_rate': self.pawn_hits / self.pawn_probes if self.pawn_probes else 0.0,
+            'iteration_nodes': list(self.iteration_nodes),
+            'effective_branching_factor': self.effective_branching_factor,
+            'phase_time': dict(self.phase_time),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict())
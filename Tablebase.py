@@ -0,0 +1,395 @@
+import mmap
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ChessBoard import (BISHOP, BLACK, COLOR_CODES, COLOR_MASK, COORDS, EMPTY_MAILBOX, KING, KNIGHT, PAWN,
+                        PIECE_CODES, QUEEN, ROOK, SQUARES, TYPE_MASK, WHITE, ChessBoard, square)
+
+# Endgame tables in the engine's own format (not Syzygy): one file pair per material signature
+# such as KRvK. The .wdl file packs a 2-bit win/draw/loss code per position, four to a byte; the
+# .dtm file holds one byte per position with the distance to mate in plies. Both are indexed by
+# side to move, the white king's square after symmetry reduction, then each other piece's square.
+MAX_PIECES = 5
+WDL_MAGIC = b'TBW1'
+DTM_MAGIC = b'TBD1'
+HEADER_BYTES = 4
+LOSS, DRAW, WIN, INVALID = 0, 1, 2, 3  # WDL codes, from the side to move's point of view
+MAX_DTM = 254
+
+TYPE_ORDER = (KING, QUEEN, ROOK, BISHOP, KNIGHT, PAWN)  # piece order inside a signature
+PIECE_LETTERS = {KING: 'K', QUEEN: 'Q', ROOK: 'R', BISHOP: 'B', KNIGHT: 'N', PAWN: 'P'}
+LETTER_TYPES = {letter: piece_type for piece_type, letter in PIECE_LETTERS.items()}
+LETTER_VALUES = {'K': 0, 'Q': 9, 'R': 5, 'B': 3, 'N': 3, 'P': 1}
+PROMOTION_LETTERS = 'QRBN'
+
+def _transform(flip_rank: bool, flip_file: bool, transpose: bool) -> Tuple[int, ...]:
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        if flip_rank:
+            row = 7 - row
+        if flip_file:
+            col = 7 - col
+        if transpose:
+            row, col = col, row
+        table.append(row * 8 + col)
+    return tuple(table)
+
+IDENTITY = _transform(False, False, False)
+MIRROR_FILES = _transform(False, True, False)
+ALL_TRANSFORMS = [_transform(rank, file, transpose)
+                  for rank in (False, True) for file in (False, True) for transpose in (False, True)]
+
+def _symmetry(pawns: bool):
+    """
+    For every white king square, the board transform that brings it into the
+    reduced region, and the king slot numbering of that region. Pawns only
+    allow mirroring the files (king on files a-d); pawnless tables use all
+    eight symmetries (king in the a1-d1-d4 triangle).
+    """
+    if pawns:
+        transforms = [IDENTITY if sq % 8 < 4 else MIRROR_FILES for sq in range(64)]
+        region = [sq for sq in range(64) if sq % 8 < 4]
+    else:
+        region = [row * 8 + col for col in range(4) for row in range(col + 1)]
+        transforms = [next(t for t in ALL_TRANSFORMS if t[sq] in region) for sq in range(64)]
+    return transforms, {sq: slot for slot, sq in enumerate(region)}
+
+def signature_of(white: str, black: str) -> str:
+    order = {PIECE_LETTERS[piece_type]: index for index, piece_type in enumerate(TYPE_ORDER)}
+    return ''.join(sorted(white, key=order.get)) + 'v' + ''.join(sorted(black, key=order.get))
+
+def canonical_signature(signature: str) -> str:
+    """The orientation tables are stored in: the side with more material is white."""
+    white, black = signature.split('v')
+    strength = lambda side: (sum(LETTER_VALUES[letter] for letter in side), len(side), side)
+    if strength(black) > strength(white):
+        white, black = black, white
+    return signature_of(white, black)
+
+def is_drawn_material(signature: str) -> bool:
+    """Bare kings, or a single minor piece with no pawns: no table needed."""
+    pieces = signature.replace('K', '').replace('v', '')
+    return len(pieces) == 0 or pieces in ('B', 'N')
+
+class _Table:
+    """Index arithmetic of one material signature, plus its mapped files once opened."""
+
+    def __init__(self, signature: str) -> None:
+        self.signature = signature
+        white, black = signature.split('v')
+        self.codes = (tuple(WHITE | LETTER_TYPES[letter] for letter in white)
+                      + tuple(BLACK | LETTER_TYPES[letter] for letter in black))
+        self.transforms, self.king_slots = _symmetry('P' in signature)
+        self.region = sorted(self.king_slots, key=self.king_slots.get)
+        self.size = 2 * len(self.king_slots) * 64 ** (len(self.codes) - 1)
+        self.wdl = None
+        self.dtm = None
+        self._files = []
+
+    def index(self, squares: Sequence[int], white_to_move: bool) -> int:
+        """Index of pieces on squares (0-63, in self.codes order) with the given side to move."""
+        transform = self.transforms[squares[0]]
+        index = self.king_slots[transform[squares[0]]]
+        for sq in squares[1:]:
+            index = index * 64 + transform[sq]
+        return index * 2 + (0 if white_to_move else 1)
+
+    def decode(self, index: int) -> Tuple[List[int], bool]:
+        white_to_move = index % 2 == 0
+        index //= 2
+        squares = []
+        for _ in range(len(self.codes) - 1):
+            index, sq = divmod(index, 64)
+            squares.append(sq)
+        squares.append(self.region[index])
+        return squares[::-1], white_to_move
+
+    def open(self, directory: str) -> None:
+        for suffix, magic, name in (('.wdl', WDL_MAGIC, 'wdl'), ('.dtm', DTM_MAGIC, 'dtm')):
+            handle = open(os.path.join(directory, self.signature + suffix), 'rb')
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            if mapped[:HEADER_BYTES] != magic:
+                raise ValueError(f'{self.signature}{suffix} is not a tablebase file')
+            self._files.append((handle, mapped))
+            setattr(self, name, mapped)
+
+    def close(self) -> None:
+        for handle, mapped in self._files:
+            mapped.close()
+            handle.close()
+        self._files = []
+        self.wdl = self.dtm = None
+
+    def read(self, index: int, with_dtm: bool) -> Tuple[int, Optional[int]]:
+        code = self.wdl[HEADER_BYTES + (index >> 2)] >> ((index & 3) * 2) & 3
+        return code, self.dtm[HEADER_BYTES + index] if with_dtm else None
+
+class Tablebase:
+    """
+    Probe the endgame tables found in directory (see generate_table). Files
+    are memory-mapped when first needed, and recent results are kept in a
+    small cache keyed by the board's hash.
+
+    probe() answers (wdl, dtm) for the side to move: wdl is 1, 0 or -1 and
+    dtm the plies to mate with best play. Positions with castling rights or
+    a possible en passant capture are not in the tables and return None.
+    """
+
+    def __init__(self, directory: str, cache_size: int = 65536) -> None:
+        self.directory = directory
+        self.cache_size = cache_size
+        self.cache: OrderedDict = OrderedDict()
+        self.tables: Dict[str, _Table] = {}
+        self.available = set()
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Rescan the directory for table files."""
+        self.available = {name[:-4] for name in os.listdir(self.directory)
+                          if name.endswith('.wdl') and os.path.exists(os.path.join(self.directory, name[:-4] + '.dtm'))}
+        self.max_pieces = max((len(signature) - 1 for signature in self.available), default=0)
+        self.cache.clear()
+
+    def close(self) -> None:
+        for table in self.tables.values():
+            table.close()
+        self.tables = {}
+
+    def __getstate__(self):
+        # Worker processes map the files themselves
+        return {'directory': self.directory, 'cache_size': self.cache_size}
+
+    def __setstate__(self, state) -> None:
+        self.__init__(**state)
+
+    def _table(self, signature: str) -> _Table:
+        table = self.tables.get(signature)
+        if table is None:
+            table = self.tables[signature] = _Table(signature)
+            table.open(self.directory)
+        return table
+
+    def lookup(self, pieces: Sequence[Tuple[int, int]], white_to_move: bool,
+               with_dtm: bool = True) -> Optional[Tuple[int, Optional[int]]]:
+        """(wdl, dtm) for pieces given as (piece code, square 0-63), or None if no table covers them."""
+        white = ''.join(PIECE_LETTERS[code & TYPE_MASK] for code, _ in pieces if code & WHITE)
+        black = ''.join(PIECE_LETTERS[code & TYPE_MASK] for code, _ in pieces if code & BLACK)
+        signature = signature_of(white, black)
+        if is_drawn_material(signature):
+            return 0, 0
+        stored = canonical_signature(signature)
+        if stored not in self.available:
+            return None
+        if stored != signature:
+            # Swap the colors and mirror the ranks so the stored side is white
+            pieces = [(code ^ COLOR_MASK, sq ^ 56) for code, sq in pieces]
+            white_to_move = not white_to_move
+        table = self._table(stored)
+        order = {code: index for index, code in enumerate(table.codes)}
+        squares = [sq for _, sq in sorted(pieces, key=lambda piece: order[piece[0]])]
+        code, dtm = table.read(table.index(squares, white_to_move), with_dtm)
+        if code == INVALID:
+            return None
+        return code - 1, dtm
+
+    def probe(self, board, with_dtm: bool = True) -> Optional[Tuple[int, Optional[int]]]:
+        if board.piece_count > self.max_pieces or board.castling:
+            return None
+        key = board.hash_key
+        cached = self.cache.get(key)
+        if cached is not None and (cached[1] is not None or not with_dtm):
+            self.cache.move_to_end(key)
+            return cached
+
+        squares = board.squares
+        if board.en_passant is not None:
+            us = COLOR_CODES[board.to_move]
+            target = board.en_passant + (-10 if us == WHITE else 10)
+            if squares[target - 1] == us | PAWN or squares[target + 1] == us | PAWN:
+                return None
+        pieces = []
+        for sq in SQUARES:
+            code = squares[sq]
+            if code:
+                row, col = COORDS[sq]
+                pieces.append((code, row * 8 + col))
+        result = self.lookup(pieces, board.to_move == 'white', with_dtm)
+        if result is not None:
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
+
+    def best_move(self, board):
+        """
+        (move, wdl, dtm) of the best move by the tables: the fastest win, else
+        a draw, else the slowest loss. None if any reply is outside the tables.
+        """
+        if self.probe(board, with_dtm=False) is None:
+            return None
+        best = None
+        for move in board.generate_moves(board.to_move):
+            board.make_move(move)
+            result = self.probe(board)
+            board.unmake_move()
+            if result is None:
+                return None
+            wdl, dtm = -result[0], result[1] + 1
+            rank = (wdl, -dtm if wdl > 0 else dtm)
+            if best is None or rank > best[0]:
+                best = (rank, move, wdl, dtm)
+        return best[1:] if best else None
+
+def _child_signatures(signature: str) -> List[str]:
+    """Signatures reachable by one capture and/or promotion."""
+    white, black = signature.split('v')
+    children = set()
+    for side, other, flip in ((white, black, False), (black, white, True)):
+        captures = [other] + [other.replace(letter, '', 1) for letter in set(other) if letter != 'K']
+        for remaining in captures:
+            promotions = [side] + [side.replace('P', letter, 1) for letter in PROMOTION_LETTERS if 'P' in side]
+            for promoted in promotions:
+                pair = (remaining, promoted) if flip else (promoted, remaining)
+                children.add(canonical_signature(signature_of(*pair)))
+    children.discard(canonical_signature(signature))
+    return sorted(children)
+
+def generate_table(signature: str, directory: str, board_class=ChessBoard, verbose: bool = False) -> str:
+    """
+    Solve signature (e.g. 'KRvK') by retrograde analysis and write its files to
+    directory, generating any smaller table it converts into first. Returns
+    the stored signature.
+
+    Every legal position's moves are generated once; captures and promotions
+    are scored from the smaller tables, and the rest become edges inside this
+    table. Results then spread backwards level by level from mates and
+    conversions. En passant rights are not part of a position, so double
+    pawn pushes in tables with pawns on both sides are slightly approximate.
+    Practical in pure Python for three and four pieces.
+    """
+    signature = canonical_signature(signature)
+    if len(signature) - 1 > MAX_PIECES:
+        raise ValueError(f'Tables go up to {MAX_PIECES} pieces: {signature}')
+    os.makedirs(directory, exist_ok=True)
+    tablebase = Tablebase(directory)
+    for child in _child_signatures(signature):
+        if not is_drawn_material(child) and child not in tablebase.available:
+            generate_table(child, directory, board_class, verbose)
+            tablebase.refresh()
+
+    table = _Table(signature)
+    size = table.size
+    result = bytearray([INVALID]) * size
+    dtm = bytearray(size)
+    parents: Dict[int, List[int]] = {}
+    remaining = {}  # unresolved position -> children not yet known to be won by the opponent
+    longest = {}  # unresolved position -> longest known win among its children
+    levels: Dict[int, List[Tuple[int, int]]] = {}  # dtm -> (position, result) waiting to be settled
+
+    def schedule(position, level, value):
+        levels.setdefault(level, []).append((position, value))
+
+    board = board_class()
+    board.castling = 0
+    board.en_passant = None
+    for index in range(size):
+        squares, white_to_move = table.decode(index)
+        if len(set(squares)) != len(squares):
+            continue
+        if any(code & TYPE_MASK == PAWN and sq // 8 in (0, 7) for code, sq in zip(table.codes, squares)):
+            continue
+        board.squares = bytearray(EMPTY_MAILBOX)
+        for code, sq in zip(table.codes, squares):
+            board.squares[square(*divmod(sq, 8))] = code
+        board.kings = {WHITE: square(*divmod(squares[table.codes.index(WHITE | KING)], 8)),
+                       BLACK: square(*divmod(squares[table.codes.index(BLACK | KING)], 8))}
+        board.to_move = 'white' if white_to_move else 'black'
+        if board.is_check('black' if white_to_move else 'white'):
+            continue  # the side that just moved cannot be in check
+        moves = board.generate_moves(board.to_move)
+        if not moves:
+            result[index] = LOSS if board.is_check(board.to_move) else DRAW
+            continue
+
+        result[index] = DRAW  # until proven otherwise
+        children = []
+        all_wins, longest_win = True, -1
+        for move in moves:
+            start, end = move[0][0] * 8 + move[0][1], move[1][0] * 8 + move[1][1]
+            moved = squares.index(start)
+            captured = squares.index(end) if end in squares else None
+            promotion = move[2] if len(move) > 2 else None
+            if captured is None and promotion is None:
+                child_squares = list(squares)
+                child_squares[moved] = end
+                children.append(table.index(child_squares, not white_to_move))
+                continue
+            pieces = [(code, end if i == moved else sq) for i, (code, sq) in enumerate(zip(table.codes, squares))
+                      if i != captured]
+            if promotion:
+                pieces = [((code & COLOR_MASK) | PIECE_CODES[promotion], sq) if sq == end else (code, sq)
+                          for code, sq in pieces]
+            child = tablebase.lookup(pieces, not white_to_move)
+            if child is None:
+                raise ValueError(f'No table for a conversion out of {signature}')
+            child_wdl, child_dtm = child
+            if child_wdl < 0:
+                schedule(index, child_dtm + 1, WIN)
+                all_wins = False
+            elif child_wdl == 0:
+                all_wins = False
+            else:
+                longest_win = max(longest_win, child_dtm)
+        if not all_wins:
+            remaining[index] = None  # can never be lost
+        else:
+            remaining[index] = len(children)
+            longest[index] = longest_win
+            if not children:
+                schedule(index, longest_win + 1, LOSS)
+        for child in children:
+            parents.setdefault(child, []).append(index)
+        if index and index % 100000 == 0 and verbose:
+            print(f'{signature}: {index}/{size} positions set up')
+
+    # Mates settle at level 0, then every settled position settles its parents one level higher
+    for index in range(size):
+        if result[index] == LOSS:
+            schedule(index, 0, LOSS)
+    settled = set()
+    level = 0
+    while levels:
+        for index, value in levels.pop(level, []):
+            if index in settled or level > MAX_DTM:
+                continue
+            settled.add(index)
+            result[index] = value
+            dtm[index] = level
+            for parent in parents.get(index, ()):
+                if parent in settled:
+                    continue
+                if value == LOSS:
+                    schedule(parent, level + 1, WIN)
+                elif remaining[parent] is not None:
+                    remaining[parent] -= 1
+                    longest[parent] = max(longest[parent], level)
+                    if remaining[parent] == 0:
+                        schedule(parent, longest[parent] + 1, LOSS)
+        level += 1
+
+    packed = bytearray((size + 3) // 4)
+    for index in range(size):
+        packed[index >> 2] |= result[index] << ((index & 3) * 2)
+    for suffix, magic, data in (('.wdl', WDL_MAGIC, packed), ('.dtm', DTM_MAGIC, dtm)):
+        path = os.path.join(directory, signature + suffix)
+        with open(path + '.tmp', 'wb') as output:
+            output.write(magic)
+            output.write(data)
+        os.replace(path + '.tmp', path)
+    if verbose:
+        counts = [result.count(code) for code in (WIN, DRAW, LOSS)]
+        print(f'{signature}: {counts[0]} wins, {counts[1]} draws, {counts[2]} losses, longest mate {max(dtm)} plies')
+    tablebase.close()
+    return signature
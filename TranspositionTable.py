@@ -0,0 +1,111 @@
+from array import array
+from typing import Dict, Optional, Tuple
+
+# Bound types stored with each score
+BOUND_LOWER = 1  # search failed high, the real score is at least this
+BOUND_UPPER = 2  # search failed low, the real score is at most this
+BOUND_EXACT = 3
+
+ENTRY_BYTES = 16  # one 64-bit key plus one packed 64-bit data word
+SLOTS_PER_BUCKET = 2  # slot 0 is depth-preferred, slot 1 is always-replace
+
+PROMOTION_CODES = {None: 0, 'queen': 1, 'rook': 2, 'bishop': 3, 'knight': 4}
+PROMOTION_NAMES = {code: name for name, code in PROMOTION_CODES.items()}
+
+def encode_move(move) -> int:
+    """Pack a (start, end[, promotion]) move into 15 bits; 0 means no move."""
+    if move is None:
+        return 0
+    start, end = move[0], move[1]
+    promotion = move[2] if len(move) > 2 else None
+    return (start[0] * 8 + start[1]) | (end[0] * 8 + end[1]) << 6 | PROMOTION_CODES[promotion] << 12
+
+def decode_move(code: int):
+    if not code:
+        return None
+    start, end, promotion = code & 63, code >> 6 & 63, PROMOTION_NAMES[code >> 12]
+    move = (divmod(start, 8), divmod(end, 8))
+    return move + (promotion,) if promotion else move
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results, preallocated as two flat arrays
+    (keys and packed data) so memory use never grows during a game.
+
+    Each data word packs score (signed, bits 32+), move (bits 16-31),
+    age (bits 8-15), depth (bits 2-7) and bound (bits 0-1).
+    """
+
+    def __init__(self, size_mb: float = 16) -> None:
+        buckets = max(1, int(size_mb * 1024 * 1024) // (ENTRY_BYTES * SLOTS_PER_BUCKET))
+        # Round down to a power of two so the bucket index is a mask
+        self.buckets = 1 << (buckets.bit_length() - 1)
+        self.mask = self.buckets - 1
+        self.keys = array('Q', [0]) * (self.buckets * SLOTS_PER_BUCKET)
+        self.data = array('q', [0]) * (self.buckets * SLOTS_PER_BUCKET)
+        self.age = 0
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0  # incremented by the search when a hit ends the node
+        self.stores = 0
+        self.overwrites = 0
+
+    def clear(self) -> None:
+        for i in range(len(self.keys)):
+            self.keys[i] = 0
+            self.data[i] = 0
+        self.age = 0
+        self.reset_stats()
+
+    def new_search(self) -> None:
+        """Age the table so entries from earlier searches are replaced first."""
+        self.age = (self.age + 1) & 0xFF
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, object]]:
+        """Return (depth, score, bound, move) stored for key, or None."""
+        self.probes += 1
+        index = (key & self.mask) * SLOTS_PER_BUCKET
+        for slot in (index, index + 1):
+            if self.keys[slot] == key:
+                data = self.data[slot]
+                if data:
+                    self.hits += 1
+                    return (data >> 2 & 0x3F, data >> 32, data & 3, decode_move(data >> 16 & 0xFFFF))
+        return None
+
+    def store(self, key: int, depth: int, score: int, bound: int, move=None) -> None:
+        index = (key & self.mask) * SLOTS_PER_BUCKET
+        keys, data = self.keys, self.data
+
+        # Depth-preferred slot: take it for the same position, a stale entry or an equal or deeper search
+        slot = index + 1
+        old = data[index]
+        if keys[index] == key or not old or (old >> 8 & 0xFF) != self.age or depth >= (old >> 2 & 0x3F):
+            slot = index
+
+        old_key = keys[slot]
+        if old_key == key:
+            # Keep the known best move when a shallower re-search has none
+            if move is None:
+                move = decode_move(data[slot] >> 16 & 0xFFFF)
+        elif data[slot]:
+            self.overwrites += 1
+
+        keys[slot] = key
+        data[slot] = (int(score) << 32 | encode_move(move) << 16 | self.age << 8
+                      | min(depth, 0x3F) << 2 | bound)
+        self.stores += 1
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'size_entries': len(self.keys),
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.probes if self.probes else 0.0,
+            'cutoffs': self.cutoffs,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+        }
@@ -6,8 +6,8 @@ def is_valid_coordinate(coord):
 
 def algebraic_to_cartesian(coord):
     # Converts chess coordinates from algebraic (e4) to Cartesian (3, 4)
-    file = ord('coord[0]') - ord('a')
-    rank = int(coord[0]) - 1
+    file = ord(coord[0]) - ord('a')
+    rank = int(coord[1]) - 1
     return (rank, file)
 
 def cartesian_to_algebraic(x, y):
@@ -16,6 +16,23 @@ def cartesian_to_algebraic(x, y):
     rank = str(x+1)
     return file + rank
 
+PROMOTION_LETTERS = {'queen': 'q', 'rook': 'r', 'bishop': 'b', 'knight': 'n'}
+PROMOTION_PIECES = {letter: piece for piece, letter in PROMOTION_LETTERS.items()}
+
+def move_to_uci(move):
+    # Converts a ((3, 4), (4, 4)) style move, with optional promotion piece, to long algebraic (e4e5)
+    text = cartesian_to_algebraic(*move[0]) + cartesian_to_algebraic(*move[1])
+    if len(move) > 2 and move[2]:
+        text += PROMOTION_LETTERS[move[2]]
+    return text
+
+def uci_to_move(text):
+    # Converts long algebraic (e7e8q) back to a ((6, 4), (7, 4), 'queen') style move
+    move = (algebraic_to_cartesian(text[0:2]), algebraic_to_cartesian(text[2:4]))
+    if len(text) > 4:
+        move += (PROMOTION_PIECES[text[4]],)
+    return move
+
 def flip_table(table):
     return table[::-1]
 
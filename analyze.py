@@ -0,0 +1,204 @@
+"""
+Headless batch analysis: stream FEN/EPD positions from a file through a pool
+of searchers and write one JSON line per position as results complete.
+
+    python analyze.py positions.epd --depth 4 --workers 8 --output labels.jsonl
+    python analyze.py positions.epd --movetime 0.5 --start-line 120000 --output labels.jsonl
+
+Results can arrive out of input order; every record carries its input line
+number, so an interrupted run can be resumed with --start-line past the
+highest line with every earlier line done. Output is appended when resuming.
+
+With --static, positions are scored by the static evaluation in NumPy
+batches (BatchEval) instead of searched, in input order:
+
+    python analyze.py positions.epd --static --output evals.jsonl
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, Optional, Tuple
+
+from AI import Player
+from ChessBoard import ChessBoard
+from Utils import move_to_uci
+
+# Per-process searchers, one per side to move, set up by _init_worker
+_players = {}
+_worker_settings = {}
+
+def read_positions(path: str, start_line: int = 0) -> Iterator[Tuple[int, str, str]]:
+    """
+    Yield (line number, fen, epd id) for each position in the file, skipping the
+    first start_line lines, blank lines and # comments. EPD lines get default
+    move counters; their id operation, if any, is passed through.
+    """
+    with open(path) as positions:
+        for line_number, line in enumerate(positions):
+            if line_number < start_line:
+                continue
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split(None, 6)
+            if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit():
+                yield line_number, ' '.join(fields[:6]), None
+            else:
+                fields = line.split(None, 4)
+                operations = fields[4] if len(fields) > 4 else ''
+                yield line_number, ' '.join(fields[:4]), _epd_id(operations)
+
+def _epd_id(operations: str) -> Optional[str]:
+    for operation in operations.split(';'):
+        operation = operation.strip()
+        if operation.startswith('id '):
+            return operation[3:].strip().strip('"')
+    return None
+
+def _init_worker(hash_mb: int, depth: Optional[int], movetime: Optional[float]) -> None:
+    _worker_settings.update(hash_mb=hash_mb, depth=depth, movetime=movetime)
+    _players.clear()
+
+def analyze_position(line_number: int, fen: str, epd_id: Optional[str]) -> dict:
+    """Search one position and return its JSON-ready result record."""
+    result = {'line': line_number, 'fen': fen}
+    if epd_id is not None:
+        result['id'] = epd_id
+    try:
+        chess_board = ChessBoard.from_fen(fen)
+    except ValueError as error:
+        result['error'] = str(error)
+        return result
+
+    color = chess_board.to_move
+    if color not in _players:
+        _players[color] = Player(color, human=False, hash_mb=_worker_settings['hash_mb'])
+        _players[color].opening_book = {}  # label positions by search, never by book
+    player = _players[color]
+
+    start = time.perf_counter()
+    move = player.select_move(chess_board, depth=_worker_settings['depth'], movetime=_worker_settings['movetime'])
+    result.update({
+        'best_move': move_to_uci(move) if move else None,
+        'score': player.best_score if move else None,  # side to move's view, mate in n plies is +-(MATE_SCORE - n)
+        'depth': player.completed_depth,
+        'nodes': player.nodes,
+        'time': round(time.perf_counter() - start, 4),
+        'pv': [move_to_uci(pv_move) for _, pv_move in player.principal_variation],
+    })
+    return result
+
+def analyze_file(path: str, output, depth: Optional[int] = None, movetime: Optional[float] = None,
+                 workers: int = 1, hash_mb: int = 16, start_line: int = 0, max_in_flight: Optional[int] = None) -> int:
+    """
+    Analyze every position in path, writing JSONL records to output as they
+    complete. At most max_in_flight positions are queued at once, so memory
+    stays flat however large the input is. Returns the number of positions written.
+    """
+    positions = read_positions(path, start_line)
+    written = 0
+
+    def emit(result):
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+
+    if workers <= 1:
+        _init_worker(hash_mb, depth, movetime)
+        for position in positions:
+            emit(analyze_position(*position))
+            written += 1
+        return written
+
+    max_in_flight = max_in_flight or workers * 4
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(hash_mb, depth, movetime)) as pool:
+        in_flight = set()
+        for position in positions:
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    emit(future.result())
+                    written += 1
+            in_flight.add(pool.submit(analyze_position, *position))
+        for future in wait(in_flight).done:
+            emit(future.result())
+            written += 1
+    return written
+
+def static_eval_file(path: str, output, start_line: int = 0, batch_size: int = 65536, eval_tables=None) -> int:
+    """
+    Score every position in path with the vectorized static evaluation and
+    write {line, fen, score} records in input order, score from the side to
+    move's view like the searched records. Returns the number written.
+    """
+    from BatchEval import BatchEvaluator, encode_fens, side_to_move_signs  # needs NumPy, unlike the search
+
+    evaluator = BatchEvaluator(eval_tables)
+    written = 0
+
+    def flush(batch):
+        fens = [fen for _, fen, _ in batch]
+        try:
+            scores = (evaluator.evaluate(encode_fens(fens)) * side_to_move_signs(fens)).tolist()
+        except ValueError:
+            # Score the batch one position at a time so only the malformed ones become error records
+            scores = []
+            for fen in fens:
+                try:
+                    scores.append(int(evaluator.evaluate(encode_fens([fen]))[0] * side_to_move_signs([fen])[0]))
+                except ValueError as error:
+                    scores.append(error)
+        for (line_number, fen, epd_id), score in zip(batch, scores):
+            result = {'line': line_number, 'fen': fen}
+            if epd_id is not None:
+                result['id'] = epd_id
+            if isinstance(score, ValueError):
+                result['error'] = str(score)
+            else:
+                result['score'] = score
+            output.write(json.dumps(result) + '\n')
+        output.flush()
+        return len(batch)
+
+    batch = []
+    for position in read_positions(path, start_line):
+        batch.append(position)
+        if len(batch) >= batch_size:
+            written += flush(batch)
+            batch = []
+    if batch:
+        written += flush(batch)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze a FEN/EPD file and write JSONL results')
+    parser.add_argument('positions', help='file with one FEN or EPD position per line')
+    parser.add_argument('--depth', type=int, help='fixed search depth per position')
+    parser.add_argument('--movetime', type=float, help='seconds per position')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--hash', type=int, default=16, help='transposition table MB per searcher')
+    parser.add_argument('--start-line', type=int, default=0, help='skip this many input lines')
+    parser.add_argument('--max-in-flight', type=int, help='positions queued at once, default 4 per worker')
+    parser.add_argument('--output', help='JSONL file, default stdout')
+    parser.add_argument('--static', action='store_true', help='score with the batched static evaluation instead')
+    args = parser.parse_args()
+
+    if args.output:
+        output = open(args.output, 'a' if args.start_line else 'w')
+    else:
+        output = sys.stdout
+    try:
+        if args.static:
+            written = static_eval_file(args.positions, output, args.start_line)
+        else:
+            written = analyze_file(args.positions, output, args.depth, args.movetime, args.workers,
+                                   args.hash, args.start_line, args.max_in_flight)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f'analyzed {written} positions', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
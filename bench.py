@@ -0,0 +1,166 @@
+"""
+Fixed-depth search benchmark and profiling harness.
+
+    python bench.py                         # print the bench signature
+    python bench.py --profile cprofile      # ranked table of hot functions
+    python bench.py --profile sample --collapsed bench.folded
+    python bench.py --disable lmr,null_move   # measure what a search feature is worth
+
+The signature line ("bench: <nodes> nodes <nps> nps") is deterministic in
+nodes for a given search, so a changed node count flags a search change and
+nps can be compared across commits on the same machine. The collapsed stack
+file is the "frame;frame;frame count" format read by flamegraph.pl and
+speedscope.
+"""
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from AI import SEARCH_FEATURES, Player
+from ChessBoard import START_FEN
+from perft import BACKENDS
+
+BENCH_DEPTH = 3
+
+BENCH_POSITIONS = [
+    START_FEN,
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+    'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+    'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+    'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+    'r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4',
+    'r2q1rk1/ppp2ppp/2npbn2/2b1p3/2B1P3/2NP1N2/PPP1QPPP/R1B2RK1 w - - 0 8',
+    '8/8/4k3/3p4/3P4/4K3/8/8 w - - 0 1',
+    '6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1',
+]
+
+def run_bench(depth: int = BENCH_DEPTH, board_class=None, positions=BENCH_POSITIONS,
+              verbose: bool = False, features=SEARCH_FEATURES) -> Tuple[int, float]:
+    """Search every position to depth with a fresh Player; return (total nodes, seconds)."""
+    board_class = board_class or BACKENDS['mailbox']
+    total_nodes = 0
+    total_time = 0.0
+    for index, fen in enumerate(positions):
+        board = board_class.from_fen(fen)
+        player = Player(board.to_move, human=False, features=features)
+        player.opening_book = {}
+        move, stats = player.select_move(board, depth=depth, with_stats=True)
+        total_nodes += stats.nodes
+        total_time += stats.time
+        if verbose:
+            print(f'position {index + 1:>2}: {stats.move}  nodes {stats.nodes:>8}  {stats.time:6.2f}s'
+                  f'  {stats.nps:8.0f} nps', file=sys.stderr)
+    return total_nodes, total_time
+
+class SamplingProfiler:
+    """
+    Sample the stack of one thread at a fixed interval from a background thread.
+    Python only switches threads at the interpreter's switch interval, so
+    start() lowers it to the sampling interval for the duration of the run.
+    """
+
+    def __init__(self, interval: float = 0.001, thread_id: Optional[int] = None) -> None:
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: Counter = Counter()
+        self._running = threading.Event()
+        self._thread = None
+        self._switch_interval = None
+
+    def start(self) -> None:
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval))
+        self._running.set()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running.clear()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def _sample(self) -> None:
+        while self._running.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, 'w') as collapsed:
+            for stack, count in self.stacks.most_common():
+                collapsed.write(f'{stack} {count}\n')
+
+    def ranked(self, top: int = 25) -> List[Tuple[str, int, int]]:
+        """(function, self samples, total samples) for the top functions by self samples."""
+        self_samples: Dict[str, int] = Counter()
+        total_samples: Dict[str, int] = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            self_samples[frames[-1]] += count
+            for frame in set(frames):
+                total_samples[frame] += count
+        ranked = sorted(self_samples.items(), key=lambda item: item[1], reverse=True)[:top]
+        return [(function, samples, total_samples[function]) for function, samples in ranked]
+
+def print_sample_table(profiler: SamplingProfiler, top: int) -> None:
+    total = sum(profiler.stacks.values()) or 1
+    print(f'{"self %":>7} {"total %":>8} {"samples":>8}  function')
+    for function, self_samples, total_samples in profiler.ranked(top):
+        print(f'{100 * self_samples / total:6.1f}% {100 * total_samples / total:7.1f}% {self_samples:>8}  {function}')
+
+def main():
+    parser = argparse.ArgumentParser(description='Fixed-depth search benchmark and profiler')
+    parser.add_argument('--depth', type=int, default=BENCH_DEPTH)
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='mailbox')
+    parser.add_argument('--profile', choices=('none', 'cprofile', 'sample'), default='none')
+    parser.add_argument('--top', type=int, default=25, help='rows in the hot function table')
+    parser.add_argument('--sort', default='tottime', help='cProfile sort key, e.g. tottime or cumulative')
+    parser.add_argument('--interval', type=float, default=0.001, help='sampling interval in seconds')
+    parser.add_argument('--collapsed', help='write collapsed stacks for flame graphs (sampling profiler)')
+    parser.add_argument('--verbose', action='store_true', help='report each position')
+    parser.add_argument('--disable', default='', help=f'comma-separated search features to turn off: '
+                                                      f'{", ".join(SEARCH_FEATURES)}')
+    args = parser.parse_args()
+    board_class = BACKENDS[args.backend]
+    disabled = set(filter(None, args.disable.split(',')))
+    unknown = disabled - set(SEARCH_FEATURES)
+    if unknown:
+        parser.error(f'unknown search features to disable: {", ".join(sorted(unknown))}')
+    features = [feature for feature in SEARCH_FEATURES if feature not in disabled]
+
+    if args.profile == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        nodes, seconds = run_bench(args.depth, board_class, verbose=args.verbose, features=features)
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats(args.sort).print_stats(args.top)
+    elif args.profile == 'sample':
+        profiler = SamplingProfiler(args.interval)
+        profiler.start()
+        nodes, seconds = run_bench(args.depth, board_class, verbose=args.verbose, features=features)
+        profiler.stop()
+        print_sample_table(profiler, args.top)
+        if args.collapsed:
+            profiler.write_collapsed(args.collapsed)
+            print(f'collapsed stacks written to {args.collapsed}')
+    else:
+        nodes, seconds = run_bench(args.depth, board_class, verbose=args.verbose, features=features)
+
+    # Profilers slow the search down, so only the node count is comparable in profiled runs
+    print(f'bench: {nodes} nodes {int(nodes / seconds) if seconds else 0} nps')
+
+if __name__ == '__main__':
+    main()
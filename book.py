@@ -0,0 +1,55 @@
+"""
+Build and inspect Polyglot opening books.
+
+    python book.py build games.txt book.bin --max-ply 16
+    python book.py probe book.bin --fen "<fen>"
+
+games.txt holds one game per line as UCI moves from the start position
+(the format tournament.py openings use). Positions are hashed with the
+standard Polyglot Random64 table, so books are shared with other programs;
+pass --random64 to hash with a different table.
+"""
+import argparse
+import sys
+
+from ChessBoard import ChessBoard, START_FEN
+from OpeningBook import DEFAULT_RANDOM64, OpeningBook, build_book, load_random64
+from Utils import move_to_uci, uci_to_move
+
+def read_games(path: str):
+    with open(path) as games:
+        for line in games:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield [uci_to_move(text) for text in line.split()]
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and inspect Polyglot opening books')
+    parser.add_argument('--random64', help='file with 781 Random64 numbers to hash with instead of the standard ones')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='write a book from UCI move lines')
+    build.add_argument('games')
+    build.add_argument('book')
+    build.add_argument('--max-ply', type=int, default=16)
+    probe = commands.add_parser('probe', help='list the book moves of a position')
+    probe.add_argument('book')
+    probe.add_argument('--fen', default=START_FEN)
+    args = parser.parse_args()
+    randoms = load_random64(args.random64) if args.random64 else DEFAULT_RANDOM64
+
+    if args.command == 'build':
+        written = build_book(args.book, read_games(args.games), ChessBoard, args.max_ply, randoms)
+        print(f'wrote {written} entries to {args.book}', file=sys.stderr)
+    else:
+        book = OpeningBook(args.book, randoms=randoms)
+        board = ChessBoard.from_fen(args.fen)
+        found = book.probe(board)
+        total = sum(weight for _, weight, _ in found) or 1
+        for move, weight, _ in found:
+            print(f'{board.get_san(move):<8} {move_to_uci(move):<6} {weight:>6} {100 * weight / total:5.1f}%')
+        if not found:
+            print('position not in book')
+        book.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Perft: count the leaf nodes of the legal move tree to a fixed depth.
+
+The node counts of the standard positions below are known exactly, which
+makes perft both the correctness gate and the throughput benchmark for the
+move generator and make/unmake. Run it from the command line:
+
+    python perft.py --depth 3
+    python perft.py --backend bitboard --depth 4
+    python perft.py --fen "<fen>" --depth 3 --divide
+"""
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+from ChessBoard import ChessBoard, START_FEN
+from BitBoard import BitBoard
+from Utils import move_to_uci
+
+BACKENDS = {'mailbox': ChessBoard, 'bitboard': BitBoard}
+
+# (name, fen, {depth: nodes})
+PERFT_SUITE: List[Tuple[str, str, Dict[int, int]]] = [
+    ('startpos', START_FEN,
+     {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    ('position 3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    ('position 4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    ('position 4 mirrored', 'r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1',
+     {1: 6, 2: 264, 3: 9467, 4: 422333}),
+    ('position 5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     {1: 44, 2: 1486, 3: 62379, 4: 2103487}),
+    ('position 6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+    # Edge cases for en passant, castling and promotion
+    ('illegal en passant, pinned pawn', '3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1',
+     {1: 18, 2: 92, 3: 1670, 6: 1134888}),
+    ('en passant gives discovered check', '8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1',
+     {1: 15, 2: 126, 3: 1928, 6: 1440467}),
+    ('en passant captures the checker', '8/8/8/2k5/3Pp3/8/8/4K3 b - d3 0 1',
+     {1: 9, 2: 50, 3: 379, 5: 17879}),
+    ('en passant exposes king on the rank', '8/8/8/8/k2Pp2Q/8/8/4K3 b - d3 0 1',
+     {1: 6, 2: 130, 3: 857, 5: 122897}),
+    ('short castling gives check', '5k2/8/8/8/8/8/8/4K2R w K - 0 1',
+     {1: 15, 2: 66, 3: 1198, 6: 661072}),
+    ('long castling gives check', '3k4/8/8/8/8/8/8/R3K3 w Q - 0 1',
+     {1: 16, 2: 71, 3: 1286, 6: 803711}),
+    ('castling rights lost by rook capture', 'r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1',
+     {1: 26, 2: 1141, 3: 27826, 4: 1274206}),
+    ('castling prevented', 'r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1',
+     {1: 44, 2: 1494, 3: 50509, 4: 1720476}),
+    ('promote out of check', '2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1',
+     {1: 11, 2: 133, 3: 1442, 6: 3821001}),
+    ('discovered check', '8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1',
+     {1: 29, 2: 165, 3: 5160, 5: 1004658}),
+    ('promote to give check', '4k3/1P6/8/8/8/8/K7/8 w - - 0 1',
+     {1: 9, 2: 40, 3: 472, 6: 217342}),
+    ('underpromote to give check', '8/P1k5/K7/8/8/8/8/8 w - - 0 1',
+     {1: 6, 2: 27, 3: 273, 6: 92683}),
+    ('self stalemate', 'K1k5/8/P7/8/8/8/8/8 w - - 0 1',
+     {1: 2, 2: 6, 3: 13, 6: 2217}),
+    ('stalemate and checkmate', '8/k1P5/8/1K6/8/8/8/8 w - - 0 1',
+     {1: 10, 2: 25, 3: 268, 7: 567584}),
+    ('double check', '8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1',
+     {1: 37, 2: 183, 3: 6559, 4: 23527}),
+]
+
+def perft(board: ChessBoard, depth: int) -> int:
+    """Count leaf nodes of the legal move tree to depth."""
+    moves = board.generate_moves(board.to_move)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        board.make_move(move)
+        nodes += perft(board, depth - 1)
+        board.unmake_move()
+    return nodes
+
+def divide(board: ChessBoard, depth: int) -> Dict[str, int]:
+    """Perft split by root move, for locating generator bugs against a reference engine."""
+    counts = {}
+    for move in board.generate_moves(board.to_move):
+        board.make_move(move)
+        counts[move_to_uci(move)] = perft(board, depth - 1)
+        board.unmake_move()
+    return counts
+
+def run_suite(max_depth: int = 3, board_class=ChessBoard, suite=PERFT_SUITE, verbose: bool = True) -> bool:
+    """Run every suite position at each known depth up to max_depth; report nodes/sec and return success."""
+    all_passed = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, expected in suite:
+        for depth in sorted(expected):
+            if depth > max_depth:
+                continue
+            board = board_class.from_fen(fen)
+            start = time.perf_counter()
+            nodes = perft(board, depth)
+            elapsed = time.perf_counter() - start
+            total_nodes += nodes
+            total_time += elapsed
+            passed = nodes == expected[depth]
+            all_passed = all_passed and passed
+            if verbose:
+                nps = nodes / elapsed if elapsed else 0
+                print(f"{'OK  ' if passed else 'FAIL'} {name:<36} depth {depth}  nodes {nodes:>9}"
+                      f"  expected {expected[depth]:>9}  {elapsed:7.2f}s  {nps:9.0f} nps")
+    if verbose and total_time:
+        print(f'total nodes {total_nodes}  time {total_time:.2f}s  {total_nodes / total_time:.0f} nps')
+    return all_passed
+
+def main():
+    parser = argparse.ArgumentParser(description='Move generator correctness and speed check')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='mailbox')
+    parser.add_argument('--fen', help='run a single position instead of the suite')
+    parser.add_argument('--divide', action='store_true', help='split the count by root move')
+    args = parser.parse_args()
+    board_class = BACKENDS[args.backend]
+
+    if args.fen:
+        board = board_class.from_fen(args.fen)
+        start = time.perf_counter()
+        if args.divide:
+            counts = divide(board, args.depth)
+            for move, nodes in sorted(counts.items()):
+                print(f'{move}: {nodes}')
+            nodes = sum(counts.values())
+        else:
+            nodes = perft(board, args.depth)
+        elapsed = time.perf_counter() - start
+        print(f'nodes {nodes}  time {elapsed:.2f}s  {nodes / elapsed if elapsed else 0:.0f} nps')
+    else:
+        raise SystemExit(0 if run_suite(args.depth, board_class) else 1)
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,7 @@ openings = {
     
 }
 
-piece_values = {'pawn': 1, 'knight': 3, 'bishop': 3, 'rook': 5, 'queen': 9}
+piece_values = {'pawn': 100, 'knight': 320, 'bishop': 330, 'rook': 500, 'queen': 900}  # centipawns, like the tables
 
 positional_dict = {
 'pawn': [[
@@ -0,0 +1,47 @@
+"""
+Generate and probe endgame tables.
+
+    python tbgen.py KQvK KRvK KPvK --dir tablebases
+    python tbgen.py --dir tablebases --probe "8/8/8/4k3/8/8/8/R3K3 w - - 0 1"
+
+Tables needed for captures and promotions out of a signature are generated
+first. Point Player(tablebase=Tablebase(dir)) or the UCI TablebasePath
+option at the directory to use them.
+"""
+import argparse
+import sys
+import time
+
+from ChessBoard import ChessBoard
+from Tablebase import Tablebase, generate_table
+from Utils import move_to_uci
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate and probe endgame tables')
+    parser.add_argument('signatures', nargs='*', help='material signatures such as KRvK')
+    parser.add_argument('--dir', default='tablebases', help='directory holding the table files')
+    parser.add_argument('--probe', help='FEN to look up after generating')
+    args = parser.parse_args()
+
+    for signature in args.signatures:
+        start = time.perf_counter()
+        stored = generate_table(signature, args.dir, verbose=True)
+        print(f'{stored} done in {time.perf_counter() - start:.1f}s', file=sys.stderr)
+
+    if args.probe:
+        tablebase = Tablebase(args.dir)
+        board = ChessBoard.from_fen(args.probe)
+        result = tablebase.probe(board)
+        if result is None:
+            print('position not in the tables')
+        else:
+            wdl, distance = result
+            print(f'{("loss", "draw", "win")[wdl + 1]} for {board.to_move}, mate in {distance} plies' if wdl
+                  else 'draw')
+            best = tablebase.best_move(board)
+            if best:
+                print(f'best move {move_to_uci(best[0])}')
+        tablebase.close()
+
+if __name__ == '__main__':
+    main()
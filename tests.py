@@ -1,31 +1,640 @@
-from ChessBoard import ChessBoard
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+from ChessBoard import DEFAULT_EVAL_TABLES, EMPTY, OFFBOARD, ChessBoard, START_FEN, build_piece_square_tables
+from BitBoard import BitBoard
+from AI import Player, _init_worker, _search_root_move
+from analyze import analyze_file, static_eval_file
+from bench import SamplingProfiler, run_bench, main as bench_main
+from OpeningBook import OpeningBook, build_book, polyglot_key
+from PawnStructure import PawnHashTable, evaluate_pawns
+from Tablebase import Tablebase, generate_table
+from Utils import move_to_uci, uci_to_move
+from perft import PERFT_SUITE, perft
+from positional_data import piece_values, positional_dict
+from uci import UCIEngine
+from tournament import elo_estimate, game_to_pgn, parse_engine, play_game, sprt
 
 def test_board_cloning(chess_board):
-    # Clone the board
+    # Clone the board and keep an untouched copy of the starting position to compare against
     cloned_board = chess_board.clone()
+    reference_board = ChessBoard()
 
     # Make a move on the original board
     # Example move: Move a pawn from e2 to e4
-    chess_board.move_piece((6, 4), (4, 4))
+    chess_board.move_piece((1, 4), (3, 4), 'white')
 
-    # Compare the boards
+    # The clone must still hold the position from before the move
     for rank in range(8):
         for file in range(8):
-            original_piece = chess_board.board[rank][file].piece
-            cloned_piece = cloned_board.board[rank][file].piece
+            reference_piece = reference_board.piece_at((rank, file))
+            cloned_piece = cloned_board.piece_at((rank, file))
 
             # Check if the pieces are the same
-            if original_piece is not None or cloned_piece is not None:
+            if reference_piece is not None or cloned_piece is not None:
                 # Check if both squares have a piece and if they are the same type and color
-                if original_piece is None or cloned_piece is None or \
-                   original_piece.type != cloned_piece.type or \
-                   original_piece.color != cloned_piece.color:
+                if reference_piece is None or cloned_piece is None or \
+                   reference_piece.type != cloned_piece.type or \
+                   reference_piece.color != cloned_piece.color:
                     print(f"Difference found at position {(rank, file)}")
                     return False
 
     print("Cloning successful. No differences found.")
     return True
 
+def test_perft_suite(board_class, max_depth=2):
+    # Node counts from the perft suite at shallow depths
+    for name, fen, expected in PERFT_SUITE:
+        board = board_class.from_fen(fen)
+        for depth in sorted(expected):
+            if depth <= max_depth and perft(board, depth) != expected[depth]:
+                print(f"Perft mismatch for {name} at depth {depth} with {board_class.__name__}")
+                return False
+
+    print(f"Perft suite passed with {board_class.__name__}.")
+    return True
+
+def test_make_unmake_round_trip(board_class):
+    # Every move followed by unmake must restore the position, key and evaluation exactly
+    for name, fen, _ in PERFT_SUITE:
+        board = board_class.from_fen(fen)
+        before = (board.get_fen(), bytes(board.squares), board.hash_key, board.pawn_key,
+                  board.midgame_score, board.endgame_score, board.phase, board.piece_count)
+        for move in board.generate_moves(board.to_move):
+            board.make_move(move)
+            if board.hash_key != board.compute_hash() or board.pawn_key != board.compute_pawn_key():
+                print(f"Incremental hash differs after {move} in {name}")
+                return False
+            if board.piece_count != sum(1 for code in board.squares if EMPTY < code < OFFBOARD):
+                print(f"Piece count differs after {move} in {name}")
+                return False
+            board.unmake_move()
+            after = (board.get_fen(), bytes(board.squares), board.hash_key, board.pawn_key,
+                     board.midgame_score, board.endgame_score, board.phase, board.piece_count)
+            if after != before:
+                print(f"Unmake did not restore the position after {move} in {name}")
+                return False
+        board.make_null_move()
+        if board.hash_key != board.compute_hash() or board.pawn_key != board.compute_pawn_key() \
+                or board.en_passant is not None:
+            print(f"Null move left a stale hash or en passant square in {name}")
+            return False
+        board.unmake_move()
+        after = (board.get_fen(), bytes(board.squares), board.hash_key, board.pawn_key,
+                 board.midgame_score, board.endgame_score, board.phase, board.piece_count)
+        if after != before:
+            print(f"Unmake did not restore the position after a null move in {name}")
+            return False
+
+    # Totals kept with other tables follow make/unmake just the same, and switching back restores them
+    custom_tables = build_piece_square_tables(dict(piece_values, knight=400), positional_dict)
+    board = board_class.from_fen(PERFT_SUITE[1][1])
+    before = (board.midgame_score, board.endgame_score)
+    board.set_eval_tables(custom_tables)
+    for move in board.generate_moves(board.to_move):
+        board.make_move(move)
+        totals = (board.midgame_score, board.endgame_score)
+        board.compute_evaluation_terms()
+        if totals != (board.midgame_score, board.endgame_score):
+            print(f"Totals with custom tables differ after {move}")
+            return False
+        board.unmake_move()
+    board.set_eval_tables(None)
+    if (board.midgame_score, board.endgame_score) != before:
+        print("Switching back to the built-in tables did not restore the totals")
+        return False
+
+    print(f"Make/unmake round trip passed with {board_class.__name__}.")
+    return True
+
+def test_capture_generation(board_class):
+    # The quiescence generator must match the full generator's captures and queen promotions
+    for name, fen, _ in PERFT_SUITE:
+        board = board_class.from_fen(fen)
+        for move in [None] + board.generate_moves(board.to_move):
+            if move:
+                board.make_move(move)
+            expected = sorted(legal for legal in board.generate_moves(board.to_move)
+                              if legal[2:] == ('queen',) or len(legal) == 2 and board.is_capture(legal[0], legal[1]))
+            if sorted(board.generate_captures(board.to_move)) != expected:
+                print(f"Capture generation differs from the full generator in {name}: {board.get_fen()}")
+                return False
+            if move:
+                board.unmake_move()
+
+    # Static exchange: a defended pawn, a knight lost for a pawn, and a doubled-rook battery
+    exchanges = [('1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1', 'e1e5', 100),
+                 ('1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1', 'd3e5', -220),
+                 ('4k3/3r4/3r4/3p4/8/8/3R4/3RK3 w - - 0 1', 'd2d5', -400)]
+    for fen, text, expected in exchanges:
+        value = board_class.from_fen(fen).static_exchange(uci_to_move(text))
+        if value != expected:
+            print(f"Static exchange of {text} is {value}, expected {expected}")
+            return False
+
+    print(f"Capture generation and static exchange passed with {board_class.__name__}.")
+    return True
+
+def test_fen_round_trip():
+    # Loading a FEN and writing it back must give the same string, and counters must follow the moves
+    for name, fen, _ in PERFT_SUITE:
+        for board_class in (ChessBoard, BitBoard):
+            written = board_class.from_fen(fen).get_fen()
+            if written != fen:
+                print(f"FEN round trip failed for {name}: {written}")
+                return False
+
+    board = ChessBoard()
+    for move in (((1, 4), (3, 4)), ((7, 6), (5, 5)), ((0, 6), (2, 5))):
+        board.make_move(move)
+    expected = 'rnbqkb1r/pppppppp/5n2/8/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 2 2'
+    if board.get_fen() != expected:
+        print(f"FEN after moves is {board.get_fen()}, expected {expected}")
+        return False
+
+    # Malformed en passant fields are ValueErrors like any other bad FEN, as are squares on the wrong
+    # rank for the side to move or with no pawn that could have just advanced past them
+    bad_fens = [f'4k3/8/8/8/8/8/8/4K3 w - {field} 0 1' for field in ('e', 'z9', 'e4', 'e33', 'E3')]
+    bad_fens += ['rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e3 0 1',
+                 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR b KQkq e3 0 1',
+                 'rnbqkbnr/ppp1pppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 2']
+    for bad_fen in bad_fens:
+        try:
+            ChessBoard.from_fen(bad_fen)
+        except ValueError:
+            continue
+        print(f"En passant field of {bad_fen!r} was accepted")
+        return False
+
+    # Castling rights whose king has left home are dropped, and no castling comes from an empty square
+    for board_class in (ChessBoard, BitBoard):
+        board = board_class.from_fen('r3k2r/8/8/8/8/8/8/R4K1R w KQkq - 0 1')
+        castles = [move for move in board.generate_moves('white') if move[0] == (0, 4)]
+        if board.get_fen() != 'r3k2r/8/8/8/8/8/8/R4K1R w kq - 0 1' or castles:
+            print(f"Castling rights without a king at home kept: {board.get_fen()}, {castles}")
+            return False
+
+    print("FEN round trip successful.")
+    return True
+
+def test_parallel_root_search():
+    # Root splitting must find a move with the same score as the serial search
+    fen = 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10'
+    serial = Player('white', human=False)
+    parallel = Player('white', human=False, workers=2)
+    serial.select_move(ChessBoard.from_fen(fen), depth=3)
+    board = ChessBoard.from_fen(fen)
+    move = parallel.select_move(board, depth=3)
+    parallel.close()
+
+    if parallel.best_score != serial.best_score or move not in board.generate_moves('white'):
+        print(f"Parallel search scored {parallel.best_score}, serial {serial.best_score}")
+        return False
+    if board.get_fen() != fen:
+        print("Parallel search left the board changed")
+        return False
+
+    # A worker searching under a shared alpha no move reaches only gets a bound, which must not count as exact
+    move = board.generate_moves('white')[0]
+    results = []
+    for shared_alpha in (-10 ** 6, 10 ** 6):
+        _init_worker('white', 1, multiprocessing.Value('d', shared_alpha), multiprocessing.Event())
+        results.append(_search_root_move(1, ChessBoard, fen, move, 2, -10 ** 6, None)[1:3])
+    if not results[0][1] or results[1][1] or results[1][0] > 10 ** 6:
+        print(f"Unexpected worker results for an open and a closed window: {results}")
+        return False
+
+    print("Parallel root search matches the serial search.")
+    return True
+
+def test_search_features():
+    # Every combination of selective techniques must still see a mate in one, scored one ply from mate
+    from AI import MATE_SCORE, SEARCH_FEATURES
+    fen = 'r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4'
+    for features in (SEARCH_FEATURES, ()) + tuple((feature,) for feature in SEARCH_FEATURES):
+        player = Player('white', human=False, features=features)
+        player.opening_book = {}
+        move = player.select_move(ChessBoard.from_fen(fen), depth=3)
+        if move_to_uci(move) != 'h5f7' or player.best_score != MATE_SCORE - 1:
+            print(f"Search with {features} played {move} scoring {player.best_score}")
+            return False
+
+    # A Player with its own tables searches on the board's incremental totals and hands the board back as it was
+    custom_tables = build_piece_square_tables(dict(piece_values, knight=400), positional_dict)
+    board = ChessBoard.from_fen(fen)
+    player = Player('white', human=False, eval_tables=custom_tables)
+    player.opening_book = {}
+    player.select_move(board, depth=2)
+    if board.eval_tables is not DEFAULT_EVAL_TABLES or board.get_fen() != fen:
+        print("Search with custom tables left the board's tables switched")
+        return False
+
+    # Mates keep their distance, also when a table entry is read back at a deeper ply than it was stored
+    player = Player('white', human=False)
+    board = ChessBoard.from_fen('k7/8/2K5/8/8/8/8/7R w - - 0 1')
+    move = player.select_move(board, depth=5)
+    board.make_move(move)
+    hits = player.transposition_table.hits
+    scores = [player.best_score, -player.negamax(board, 2, -MATE_SCORE, MATE_SCORE, ply=3)]
+    if scores != [MATE_SCORE - 3, MATE_SCORE - 5] or player.transposition_table.hits == hits:
+        print(f"Mate in two scored {scores}")
+        return False
+
+    # Passing is never tried with only kings and pawns left, where zugzwang is common
+    player = Player('white', human=False)
+    move, stats = player.select_move(ChessBoard.from_fen('8/5k2/8/3p4/3P4/4K3/8/8 w - - 0 1'), depth=5,
+                                     with_stats=True)
+    if stats.null_cutoffs:
+        print(f"Null move pruning ran in a pawn ending: {stats.as_dict()}")
+        return False
+
+    print("Search features successful.")
+    return True
+
+def test_pawn_structure():
+    # Hand-checked terms, color symmetry, and a cache that survives piece moves but not pawn moves
+    cases = [
+        ('4k3/8/8/8/8/8/P7/4K3 w - - 0 1', (-5, -5)),  # isolated, passed on its second rank
+        ('4k3/8/8/8/8/P7/P7/4K3 w - - 0 1', (-20, -35)),  # doubled and isolated, only the front one passed
+        ('4k3/8/8/8/4p3/2P5/3P4/4K3 w - - 0 1', (12, 18)),  # d2 backward, c3 passed, e4 isolated
+        ('4k3/3p4/2p5/4P3/8/8/8/4K3 w - - 0 1', (-12, -18)),  # the same with colors swapped
+    ]
+    for fen, expected in cases:
+        if evaluate_pawns(ChessBoard.from_fen(fen).squares) != expected:
+            print(f"Unexpected pawn terms {evaluate_pawns(ChessBoard.from_fen(fen).squares)} for {fen}")
+            return False
+
+    table = PawnHashTable(size_mb=0.01)
+    board = ChessBoard.from_fen(cases[2][0])
+    table.evaluate(board)
+    board.make_move(((0, 4), (0, 5)))
+    table.evaluate(board)
+    board.make_move(((3, 4), (2, 4)))
+    if table.evaluate(board) != evaluate_pawns(board.squares) or (table.probes, table.hits) != (3, 1):
+        print(f"Unexpected pawn hash table behaviour: {table.stats()}")
+        return False
+
+    player = Player('white', human=False)
+    _, stats = player.select_move(ChessBoard.from_fen(cases[3][0]), depth=3, with_stats=True)
+    data = stats.as_dict()
+    if not 0 < data['pawn_hits'] < data['pawn_probes'] or data['pawn_hit_rate'] < 0.5:
+        print(f"Pawn hash statistics missing: {data}")
+        return False
+
+    print("Pawn structure successful.")
+    return True
+
+def test_analyze_file():
+    # Batch analysis writes one JSON record per position, keeps EPD ids and honours the start line
+    lines = ['# comment', START_FEN, '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - bm b4f4; id "position 3";']
+    with tempfile.NamedTemporaryFile('w', suffix='.epd', delete=False) as positions:
+        positions.write('\n'.join(lines) + '\n')
+    try:
+        output = io.StringIO()
+        written = analyze_file(positions.name, output, depth=2)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        resumed = io.StringIO()
+        analyze_file(positions.name, resumed, depth=1, start_line=2)
+    finally:
+        os.remove(positions.name)
+
+    if written != 2 or [record['line'] for record in records] != [1, 2] or records[1].get('id') != 'position 3':
+        print(f"Unexpected analysis records: {records}")
+        return False
+    if any(record['depth'] != 2 or not record['best_move'] for record in records):
+        print(f"Analysis did not search to depth 2: {records}")
+        return False
+    if [json.loads(line)['line'] for line in resumed.getvalue().splitlines()] != [2]:
+        print("Resuming from a line offset re-analyzed earlier positions")
+        return False
+
+    print("Batch analysis successful.")
+    return True
+
+def test_batch_eval():
+    # The vectorized evaluator must reproduce score_chessboard exactly, with the built-in and custom tables
+    try:
+        from BatchEval import BatchEvaluator, encode_boards, encode_fens
+    except ImportError:
+        print("Batch evaluation skipped, NumPy is not installed.")
+        return True
+
+    boards = []
+    for _, fen, _ in PERFT_SUITE:
+        board = BitBoard.from_fen(fen)
+        for move in board.generate_moves(board.to_move)[:8]:
+            board.make_move(move)
+            boards.append(board.clone())
+            board.unmake_move()
+    fens = [board.get_fen() for board in boards]
+    if (encode_fens(fens) != encode_boards(boards)).any():
+        print("FEN and board encodings differ")
+        return False
+
+    custom_tables = build_piece_square_tables(dict(piece_values, knight=4), positional_dict)
+    expected = {}
+    for eval_tables in (None, custom_tables):
+        player = Player('white', human=False, eval_tables=eval_tables)
+        expected[eval_tables is None] = [player.score_chessboard(board) for board in boards]
+        if BatchEvaluator(eval_tables, chunk_size=50).evaluate_fens(fens).tolist() != expected[eval_tables is None]:
+            print(f"Batch scores differ from score_chessboard with tables {eval_tables is not None}")
+            return False
+
+    try:
+        encode_fens([START_FEN, '9/7/8/8/8/8/8/8 w - - 0 1'])
+    except ValueError:
+        pass
+    else:
+        print("Malformed FEN placement was encoded")
+        return False
+
+    with tempfile.NamedTemporaryFile('w', suffix='.epd', delete=False) as positions:
+        positions.write('\n'.join(fens[:3] + ['bad w - - 0 1']) + '\n')
+    try:
+        output = io.StringIO()
+        static_eval_file(positions.name, output, batch_size=2)
+    finally:
+        os.remove(positions.name)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    signs = [1 if board.to_move == 'white' else -1 for board in boards[:3]]
+    if [record.get('score') for record in records[:3]] != [sign * score for sign, score in zip(signs, expected[True])] \
+            or 'error' not in records[3]:
+        print(f"Unexpected static evaluation records: {records}")
+        return False
+
+    print("Batch evaluation successful.")
+    return True
+
+def test_tuning():
+    # Labeled lines in every supported format load, and tuning lowers the loss and writes a loadable module
+    try:
+        from tune import LabeledPositions, TexelTuner, write_positional_data
+    except ImportError:
+        print("Tuning skipped, NumPy is not installed.")
+        return True
+    from tournament import load_eval_tables
+
+    lines = ['# results from white\'s view', f'{START_FEN} c9 "1/2-1/2";',
+             'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBN1 w Qkq - 0 1 [0.0]',
+             'rnbqkbn1/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQq - 0 1 1-0',
+             '8/8/8/8/8/8/8/9 w - - 0 1 1-0', START_FEN]
+    with tempfile.NamedTemporaryFile('w', suffix='.epd', delete=False) as labeled:
+        labeled.write('\n'.join(lines * 20) + '\n')
+    module = labeled.name + '.py'
+    try:
+        positions = LabeledPositions.load(labeled.name, chunk_size=16)
+        tuner = TexelTuner()
+        tuner.scale = 1.0
+        before = tuner.loss(positions)
+        tuner.train(positions, epochs=5, batch_size=8, learning_rate=5.0)
+        write_positional_data(module, tuner.piece_values(), tuner.positional_dict())
+        tables = load_eval_tables(module)
+    finally:
+        os.remove(labeled.name)
+        if os.path.exists(module):
+            os.remove(module)
+
+    if len(positions) != 60 or positions.skipped != 40:
+        print(f"Loaded {len(positions)} labeled positions and skipped {positions.skipped}")
+        return False
+    if not tuner.loss(positions) < before or tuner.piece_values()['rook'] <= 500:
+        print(f"Tuning did not fit the results: {before} -> {tuner.loss(positions)}, {tuner.piece_values()}")
+        return False
+    if tables != build_piece_square_tables(tuner.piece_values(), tuner.positional_dict()):
+        print("The written module does not reproduce the tuned values")
+        return False
+
+    print("Tuning successful.")
+    return True
+
+def test_tournament():
+    # A short headless game produces SAN moves and a PGN, and the match statistics behave sensibly
+    engine = parse_engine('name=d1,depth=1')
+    game = play_game(0, START_FEN, engine, dict(engine, name='d1-2'), max_plies=12)
+    pgn = game_to_pgn(game)
+    if len(game['moves']) != 12 or not pgn.startswith('[Event') or '1. ' not in pgn:
+        print(f"Unexpected game record: {game['moves']}")
+        return False
+
+    elo, margin = elo_estimate(60, 20, 20)
+    if not (0 < elo - margin < elo < elo + margin) or elo_estimate(10, 10, 10)[0] != 0:
+        print(f"Unexpected Elo estimate {elo} +/- {margin}")
+        return False
+    if sprt(600, 200, 200)[3] != 'H1 accepted' or sprt(200, 200, 600)[3] != 'H0 accepted':
+        print("SPRT verdicts are wrong")
+        return False
+
+    print("Tournament runner successful.")
+    return True
+
+def test_uci():
+    # The UCI driver answers the handshake, searches in the background and stops on request
+    lines = []
+    engine = UCIEngine(output=lines.append)
+    for command in ('uci', 'isready', 'setoption name Hash value 4', 'position startpos moves e2e4 e7e5',
+                    'go depth 2'):
+        engine.handle(command)
+    engine.search_thread.join()
+    engine.handle('position fen k7/8/2K5/8/8/8/8/7R w - - 0 1')
+    engine.handle('go depth 4')
+    engine.search_thread.join()
+    engine.handle('position fen 6k1/5ppp/8/8/8/8/8/R3K3 w Q - 0 1')
+    engine.handle('go infinite')
+    engine.handle('stop')
+    engine.handle('quit')
+
+    bestmoves = [line for line in lines if line.startswith('bestmove')]
+    if 'uciok' not in lines or 'readyok' not in lines or len(bestmoves) != 3:
+        print(f"Unexpected UCI output: {lines}")
+        return False
+    if not any(line.startswith('info depth 2 ') and ' pv ' in line for line in lines):
+        print("UCI search sent no info lines")
+        return False
+    if not any(' score mate 2 ' in line for line in lines):
+        print(f"Mate in two not reported as one: {lines}")
+        return False
+    if engine.player.transposition_table.stats()['size_entries'] != 4 * 1024 * 1024 // 16:
+        print("setoption Hash did not resize the table")
+        return False
+
+    # With worker processes, a finished search must not leave a stop behind for the next one
+    lines = []
+    engine = UCIEngine(output=lines.append)
+    for command in ('setoption name Threads value 2', 'position startpos moves e2e4', 'go depth 5'):
+        engine.handle(command)
+    engine.search_thread.join()
+    first = len(lines)
+    for command in ('position startpos moves e2e4', 'go depth 5'):
+        engine.handle(command)
+    engine.search_thread.join()
+    engine.handle('go depth x wtime')
+    engine.handle('quit')
+    if not any(line.startswith('info depth 5 ') for line in lines[first:]):
+        print(f"Second parallel search stopped early: {lines[first:]}")
+        return False
+    if 'info string invalid value for go depth' not in lines or not lines[-1].startswith('bestmove'):
+        print(f"Bad go arguments not reported: {lines[-3:]}")
+        return False
+
+    print("UCI session successful.")
+    return True
+
+def test_search_stats():
+    # select_move can return its statistics, and they add up
+    fen = 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'
+    player = Player('white', human=False, time_phases=True)
+    move, stats = player.select_move(ChessBoard.from_fen(fen), depth=2, with_stats=True)
+    data = json.loads(stats.to_json())
+
+    if data['move'] is None or data['depth'] != 2 or sum(data['iteration_nodes']) != data['nodes']:
+        print(f"Unexpected search statistics: {data}")
+        return False
+    if not 0 < data['qnodes'] < data['nodes'] or data['seldepth'] < 2 or data['tt_probes'] == 0:
+        print(f"Node, depth or table counters missing: {data}")
+        return False
+    if min(data['phase_time'].values()) <= 0:
+        print(f"Phase timing missing: {data['phase_time']}")
+        return False
+
+    print("Search statistics successful.")
+    return True
+
+def test_bench():
+    # The bench node count is the cross-commit signature, so it must be reproducible
+    positions = [START_FEN, '6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1']
+    profiler = SamplingProfiler(interval=0.0005)
+    profiler.start()
+    nodes, seconds = run_bench(2, positions=positions)
+    profiler.stop()
+    repeat_nodes, _ = run_bench(2, positions=positions)
+
+    if nodes == 0 or nodes != repeat_nodes or seconds <= 0:
+        print(f"Bench not reproducible: {nodes} then {repeat_nodes} nodes")
+        return False
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.folded')
+        profiler.write_collapsed(path)
+        with open(path) as collapsed:
+            lines = collapsed.read().splitlines()
+    if not all(line.rsplit(' ', 1)[1].isdigit() for line in lines) or not any('select_move' in line for line in lines):
+        print(f"Malformed collapsed stacks: {lines[:3]}")
+        return False
+
+    # A misspelt feature must stop the run rather than report an ablation that never happened
+    argv, sys.argv = sys.argv, ['bench.py', '--depth', '1', '--disable', 'lmr_']
+    try:
+        with contextlib.redirect_stderr(io.StringIO()) as errors:
+            bench_main()
+    except SystemExit as exit_error:
+        rejected = exit_error.code != 0 and 'lmr_' in errors.getvalue()
+    else:
+        rejected = False
+    finally:
+        sys.argv = argv
+    if not rejected:
+        print("bench --disable accepted an unknown feature")
+        return False
+
+    print("Bench successful.")
+    return True
+
+def test_opening_book():
+    # Build a small Polyglot book, then read it back through the memory-mapped binary search
+    lines = ['e2e4 e7e5 g1f3 b8c6 f1c4 g8f6', 'e2e4 c7c5', 'd2d4 d7d5', 'e2e4 e7e5 f1c4 g8f6 g1f3 f8e7 e1g1']
+    games = [[uci_to_move(text) for text in line.split()] for line in lines]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'book.bin')
+        build_book(path, games, ChessBoard, max_ply=8)
+        book = OpeningBook(path, selection='best')
+        found = [(move_to_uci(move), weight) for move, weight, _ in book.probe(ChessBoard())]
+        castle = book.probe(ChessBoard.from_fen('rnbqk2r/ppppbppp/5n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4'))
+        late = ChessBoard.from_fen('rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2')
+        book.max_ply = 2
+        limited = book.choose(late)
+        player = Player('white', human=False, book=book)
+        move, stats = player.select_move(ChessBoard(), depth=2, with_stats=True)
+        book.close()
+
+    # Keys from the Polyglot format description, the last one with an en passant capture available
+    keyed = [('', 0x463B96181691FC9C), ('e2e4 d7d5', 0x0756B94461C50FB0),
+             ('e2e4 d7d5 e4e5 f7f5', 0x22A48B5A8E47FF78)]
+    for line, expected in keyed:
+        board = ChessBoard()
+        for text in line.split():
+            board.make_move(uci_to_move(text))
+        if polyglot_key(board) != expected:
+            print(f"Polyglot key {polyglot_key(board):#x} after '{line}', expected {expected:#x}")
+            return False
+    if found != [('e2e4', 3), ('d2d4', 1)]:
+        print(f"Unexpected book moves for the start position: {found}")
+        return False
+    if [move_to_uci(move) for move, _, _ in castle] != ['e1g1']:
+        print(f"Castling not decoded from king-takes-rook: {castle}")
+        return False
+    if limited is not None or move_to_uci(move) != 'e2e4' or not stats.book:
+        print(f"Book depth or Player book lookup wrong: {limited}, {move}, {stats.book}")
+        return False
+
+    print("Opening book successful.")
+    return True
+
+def test_tablebase():
+    # Generate KRvK, then check that following the tables mates in exactly the promised plies
+    with tempfile.TemporaryDirectory() as directory:
+        generate_table('KRvK', directory)
+        tablebase = Tablebase(directory)
+        board = ChessBoard.from_fen('8/8/8/4k3/8/8/8/R3K3 w - - 0 1')
+        wdl, distance = tablebase.probe(board)
+        plies = 0
+        while board.generate_moves(board.to_move):
+            board.make_move(tablebase.best_move(board)[0])
+            plies += 1
+        mated = board.is_check(board.to_move)
+        flipped = tablebase.probe(ChessBoard.from_fen('r3k3/8/8/8/8/8/8/4K3 b - - 0 1'))
+
+        # The search scores a rook-takes-knight conversion from the tables
+        player = Player('white', human=False, tablebase=tablebase)
+        player.opening_book = {}
+        move, stats = player.select_move(ChessBoard.from_fen('8/8/8/7n/4k3/8/8/4K2R w - - 0 1'), depth=2,
+                                         with_stats=True)
+        tablebase.close()
+
+    if wdl != 1 or not mated or plies != distance:
+        print(f"Tablebase line did not mate as promised: {wdl}, {distance} plies, played {plies}")
+        return False
+    if flipped is None or flipped[0] != 1:
+        print(f"Colour-flipped probe failed: {flipped}")
+        return False
+    if move_to_uci(move) != 'h1h5' or stats.tb_hits == 0:
+        print(f"Search did not use the tables: {move}, {stats.as_dict()}")
+        return False
+
+    print("Tablebase successful.")
+    return True
+
 chess_board = ChessBoard()
 
-test_board_cloning(chess_board)
\ No newline at end of file
+test_board_cloning(chess_board)
+test_perft_suite(ChessBoard)
+test_perft_suite(BitBoard)
+test_make_unmake_round_trip(ChessBoard)
+test_make_unmake_round_trip(BitBoard)
+test_capture_generation(ChessBoard)
+test_capture_generation(BitBoard)
+test_fen_round_trip()
+test_parallel_root_search()
+test_search_features()
+test_pawn_structure()
+test_analyze_file()
+test_batch_eval()
+test_tuning()
+test_tournament()
+test_uci()
+test_search_stats()
+test_bench()
+test_opening_book()
+test_tablebase()
@@ -0,0 +1,296 @@
+"""
+Headless self-play match between two Player configurations.
+
+Every opening is played twice with colors swapped, games run in parallel
+worker processes, and the result is reported as W/D/L from the first
+engine's side, an Elo difference with a 95% error bar, an SPRT verdict and
+nodes per second for each engine. All games are written to a PGN file.
+
+    python tournament.py --engine name=new,depth=3 --engine name=base,depth=3,eval=old_tables.py --games 200
+    python tournament.py --engine name=a,time=60,inc=0.5 --engine name=b,time=60,inc=0.5 --openings book.epd
+
+Engine options: name, depth, movetime (seconds per move), time and inc
+(seconds of clock and increment), hash (MB) and eval (a Python file that
+defines piece_values and positional_dict like positional_data.py).
+"""
+import argparse
+import importlib.util
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import Dict, List, Optional
+
+from AI import Player
+from ChessBoard import ChessBoard, START_FEN, build_piece_square_tables
+from Utils import uci_to_move
+from analyze import read_positions
+
+MAX_PLIES = 400  # games still running after this many plies are adjudicated as draws
+
+# Openings as move sequences from the start position, used when no openings file is given
+DEFAULT_OPENINGS = [
+    'e2e4 e7e5 g1f3 b8c6',
+    'e2e4 c7c5 g1f3 d7d6',
+    'e2e4 e7e6 d2d4 d7d5',
+    'e2e4 c7c6 d2d4 d7d5',
+    'd2d4 d7d5 c2c4 e7e6',
+    'd2d4 g8f6 c2c4 g7g6',
+    'c2c4 e7e5 b1c3 g8f6',
+    'g1f3 d7d5 g2g3 g8f6',
+]
+
+ENGINE_OPTIONS = {'name': str, 'depth': int, 'movetime': float, 'time': float, 'inc': float, 'hash': int,
+                  'eval': str}
+
+def parse_engine(spec: str) -> Dict:
+    """Parse 'name=a,depth=3,...' into an engine configuration dict."""
+    config = {'name': None, 'depth': None, 'movetime': None, 'time': None, 'inc': 0.0, 'hash': 16, 'eval': None}
+    for option in filter(None, spec.split(',')):
+        key, _, value = option.partition('=')
+        if key not in ENGINE_OPTIONS:
+            raise ValueError(f'Unknown engine option {key!r}')
+        config[key] = ENGINE_OPTIONS[key](value)
+    return config
+
+def load_eval_tables(path: str):
+    """Build piece-square tables from a positional_data-style Python file."""
+    spec = importlib.util.spec_from_file_location('eval_tables', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return build_piece_square_tables(module.piece_values, module.positional_dict)
+
+def opening_position(opening: str) -> str:
+    """FEN of an opening given as a FEN or as UCI moves from the start position."""
+    if '/' in opening:
+        return opening
+    board = ChessBoard()
+    for text in opening.split():
+        board.make_move(uci_to_move(text))
+    return board.get_fen()
+
+def _make_player(config: Dict, color: str) -> Player:
+    eval_tables = load_eval_tables(config['eval']) if config['eval'] else None
+    player = Player(color, human=False, hash_mb=config['hash'], eval_tables=eval_tables)
+    player.opening_book = {}  # the openings file decides the opening
+    return player
+
+def play_game(game_index: int, fen: str, white: Dict, black: Dict, max_plies: int = MAX_PLIES) -> Dict:
+    """Play one game and return its result, SAN moves and per-engine search totals."""
+    board = ChessBoard.from_fen(fen)
+    configs = {'white': white, 'black': black}
+    players = {color: _make_player(config, color) for color, config in configs.items()}
+    clocks = {color: config['time'] for color, config in configs.items()}
+    nodes = {'white': 0, 'black': 0}
+    search_time = {'white': 0.0, 'black': 0.0}
+    repetitions = {board.hash_key: 1}
+    moves: List[str] = []
+    result, termination = '1/2-1/2', 'adjudication'
+
+    for _ in range(max_plies):
+        color = board.to_move
+        legal_moves = board.generate_moves(color)
+        if not legal_moves:
+            if board.is_check(color):
+                result, termination = ('0-1' if color == 'white' else '1-0'), 'checkmate'
+            else:
+                termination = 'stalemate'
+            break
+        if board.halfmove_clock >= 100:
+            termination = 'fifty-move rule'
+            break
+        if repetitions[board.hash_key] >= 3:
+            termination = 'threefold repetition'
+            break
+        if board.is_insufficient_material():
+            termination = 'insufficient material'
+            break
+
+        config = configs[color]
+        start = time.perf_counter()
+        move = players[color].select_move(board, depth=config['depth'], movetime=config['movetime'],
+                                          time_left=clocks[color], increment=config['inc'])
+        elapsed = time.perf_counter() - start
+        nodes[color] += players[color].nodes
+        search_time[color] += elapsed
+        if clocks[color] is not None:
+            clocks[color] -= elapsed
+            if clocks[color] < 0:
+                result, termination = ('0-1' if color == 'white' else '1-0'), 'time forfeit'
+                break
+            clocks[color] += config['inc']
+        if move is None or (move[0], move[1]) not in [(legal[0], legal[1]) for legal in legal_moves]:
+            result, termination = ('0-1' if color == 'white' else '1-0'), f'illegal move by {color}'
+            break
+
+        moves.append(board.get_san(move))
+        board.make_move(move)
+        repetitions[board.hash_key] = repetitions.get(board.hash_key, 0) + 1
+
+    return {'index': game_index, 'fen': fen, 'white': white['name'], 'black': black['name'], 'result': result,
+            'termination': termination, 'moves': moves, 'nodes': nodes, 'time': search_time}
+
+def game_to_pgn(game: Dict, event: str = 'Self-play match') -> str:
+    first_move_black = ' b ' in game['fen']
+    fullmove = int(game['fen'].split()[5]) if len(game['fen'].split()) > 5 else 1
+    headers = [('Event', event), ('Site', '?'), ('Date', date.today().strftime('%Y.%m.%d')),
+               ('Round', str(game['index'] + 1)), ('White', game['white']), ('Black', game['black']),
+               ('Result', game['result']), ('Termination', game['termination'])]
+    if game['fen'] != START_FEN:
+        headers += [('SetUp', '1'), ('FEN', game['fen'])]
+
+    tokens = []
+    for ply, san in enumerate(game['moves']):
+        black_to_move = (ply % 2 == 1) != first_move_black
+        if not black_to_move:
+            tokens.append(f'{fullmove}.')
+        elif ply == 0:
+            tokens.append(f'{fullmove}...')
+        tokens.append(san)
+        if black_to_move:
+            fullmove += 1
+    tokens.append(game['result'])
+
+    # Wrap movetext at 80 columns as PGN export format asks
+    lines, line = [], ''
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 80:
+            lines.append(line)
+            line = token
+        else:
+            line = f'{line} {token}' if line else token
+    lines.append(line)
+    return '\n'.join(f'[{tag} "{value}"]' for tag, value in headers) + '\n\n' + '\n'.join(lines) + '\n\n'
+
+def elo_estimate(wins: int, draws: int, losses: int):
+    """Elo difference and 95% error margin from a W/D/L record, by the trinomial normal approximation."""
+    games = wins + draws + losses
+    if not games:
+        return 0.0, float('inf')
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.959964 * math.sqrt(variance / games)
+
+    def to_elo(p):
+        p = min(max(p, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / p - 1)
+
+    elo = to_elo(score)
+    return elo, (to_elo(score + margin) - to_elo(score - margin)) / 2
+
+def sprt(wins: int, draws: int, losses: int, elo0: float = 0.0, elo1: float = 5.0,
+         alpha: float = 0.05, beta: float = 0.05):
+    """
+    Sequential probability ratio test of H0: elo = elo0 against H1: elo = elo1.
+    Returns (log-likelihood ratio, lower bound, upper bound, verdict).
+    """
+    lower, upper = math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+    games = wins + draws + losses
+    if not games or wins + losses == 0:
+        return 0.0, lower, upper, 'continue'
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    if variance == 0:
+        return 0.0, lower, upper, 'continue'
+    score0 = 1 / (1 + 10 ** (-elo0 / 400))
+    score1 = 1 / (1 + 10 ** (-elo1 / 400))
+    llr = games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+    if llr >= upper:
+        verdict = 'H1 accepted'
+    elif llr <= lower:
+        verdict = 'H0 accepted'
+    else:
+        verdict = 'continue'
+    return llr, lower, upper, verdict
+
+def run_match(first: Dict, second: Dict, openings: List[str], games: int, concurrency: int = 1,
+              pgn_path: Optional[str] = None, max_plies: int = MAX_PLIES, elo0: float = 0.0, elo1: float = 5.0,
+              verbose: bool = True) -> Dict:
+    """Play games pairs over the openings with colors swapped; report from first's point of view."""
+    first['name'] = first['name'] or 'engine1'
+    second['name'] = second['name'] or 'engine2'
+    if first['name'] == second['name']:
+        second['name'] += '-2'
+    fens = [opening_position(opening) for opening in openings]
+    schedule = []
+    for index in range(games):
+        fen = fens[(index // 2) % len(fens)]
+        white, black = (first, second) if index % 2 == 0 else (second, first)
+        schedule.append((index, fen, white, black, max_plies))
+
+    wins = draws = losses = 0
+    nodes = {first['name']: 0, second['name']: 0}
+    search_time = {first['name']: 0.0, second['name']: 0.0}
+    pgn = open(pgn_path, 'w') if pgn_path else None
+
+    def record(game):
+        nonlocal wins, draws, losses
+        first_color = 'white' if game['white'] == first['name'] else 'black'
+        if game['result'] == '1/2-1/2':
+            draws += 1
+        elif (game['result'] == '1-0') == (first_color == 'white'):
+            wins += 1
+        else:
+            losses += 1
+        for color in ('white', 'black'):
+            nodes[game[color]] += game['nodes'][color]
+            search_time[game[color]] += game['time'][color]
+        if pgn:
+            pgn.write(game_to_pgn(game))
+            pgn.flush()
+        if verbose:
+            print(f"game {game['index'] + 1}/{games}: {game['white']} - {game['black']} {game['result']}"
+                  f" ({game['termination']})  score +{wins}={draws}-{losses}")
+
+    try:
+        if concurrency <= 1:
+            for game in schedule:
+                record(play_game(*game))
+        else:
+            with ProcessPoolExecutor(max_workers=concurrency) as pool:
+                for future in as_completed([pool.submit(play_game, *game) for game in schedule]):
+                    record(future.result())
+    finally:
+        if pgn:
+            pgn.close()
+
+    elo, margin = elo_estimate(wins, draws, losses)
+    llr, lower, upper, verdict = sprt(wins, draws, losses, elo0, elo1)
+    summary = {
+        'wins': wins, 'draws': draws, 'losses': losses,
+        'elo': elo, 'elo_margin': margin,
+        'sprt': {'llr': llr, 'lower': lower, 'upper': upper, 'elo0': elo0, 'elo1': elo1, 'verdict': verdict},
+        'nps': {name: nodes[name] / search_time[name] if search_time[name] else 0.0 for name in nodes},
+    }
+    if verbose:
+        print(f"{first['name']} vs {second['name']}: W/D/L {wins}/{draws}/{losses}"
+              f"  Elo {elo:+.1f} +/- {margin:.1f}")
+        print(f"SPRT elo0={elo0:g} elo1={elo1:g}: LLR {llr:.2f} [{lower:.2f}, {upper:.2f}] {verdict}")
+        for name, nps in summary['nps'].items():
+            print(f'{name}: {nps:.0f} nps')
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description='Play a self-play match between two engine configurations')
+    parser.add_argument('--engine', action='append', required=True, help='engine options, give exactly two')
+    parser.add_argument('--games', type=int, default=16, help='games to play, rounded up to an even number')
+    parser.add_argument('--openings', help='FEN/EPD file of opening positions, each played with both colors')
+    parser.add_argument('--concurrency', type=int, default=1, help='games played in parallel')
+    parser.add_argument('--pgn', default='match.pgn')
+    parser.add_argument('--max-plies', type=int, default=MAX_PLIES)
+    parser.add_argument('--elo0', type=float, default=0.0)
+    parser.add_argument('--elo1', type=float, default=5.0)
+    args = parser.parse_args()
+    if len(args.engine) != 2:
+        parser.error('give exactly two --engine options')
+
+    first, second = (parse_engine(spec) for spec in args.engine)
+    for config in (first, second):
+        if config['depth'] is None and config['movetime'] is None and config['time'] is None:
+            config['depth'] = 3
+    openings = [fen for _, fen, _ in read_positions(args.openings)] if args.openings else DEFAULT_OPENINGS
+    run_match(first, second, openings, args.games + args.games % 2, args.concurrency, args.pgn,
+              args.max_plies, args.elo0, args.elo1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""
+Texel tuning of the material values and piece-square tables in positional_data.
+
+    python tune.py labeled.epd --output tuned_data.py --epochs 10
+    python tournament.py --engine name=tuned,depth=3,eval=tuned_data.py --engine name=base,depth=3
+
+Each input line holds a FEN and the game's result from white's view, as
+1-0 / 0-1 / 1/2-1/2 (bare, quoted or as an EPD c9 operation) or as [1.0],
+[0.5] or [0.0]. Positions are streamed into chunk arrays of about 70
+bytes per position, so tens of millions fit in a few GB. The tapered
+evaluation is fitted to the results through a sigmoid by Adam on
+mini-batches with vectorized gradients, after the sigmoid's scale has been
+fitted to the starting values. The pawn structure terms are held fixed.
+The output is a drop-in replacement for positional_data.py.
+"""
+import argparse
+import inspect
+import math
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import positional_data
+from BatchEval import PHASE_ARRAY, encode_fens, pawn_terms
+from ChessBoard import MAX_PHASE, PIECE_NAMES, PAWN, KING
+
+PIECE_TYPES = PIECE_NAMES[PAWN:KING + 1]  # in the order of BatchEval's white and black index planes
+MATERIAL_TYPES = PIECE_TYPES[:-1]  # the king has no material value
+RESULT_PATTERN = re.compile(r'1/2-1/2|1-0|0-1|\[\s*(?:1(?:\.0*)?|0?\.5|0(?:\.0*)?)\s*\]')
+RESULT_HALVES = {'1-0': 2, '0-1': 0, '1/2-1/2': 1}
+DEFAULT_CHUNK = 1 << 16
+LOG10 = math.log(10)
+
+def parse_labeled_line(line: str) -> Optional[Tuple[str, int]]:
+    """(fen, result in half points for white) from one labeled line, or None if it has no result."""
+    matches = RESULT_PATTERN.findall(line)
+    if not matches:
+        return None
+    result = matches[-1]
+    halves = RESULT_HALVES.get(result)
+    if halves is None:
+        halves = round(float(result.strip('[] ')) * 2)
+    return ' '.join(line.split()[:4]), halves
+
+class LabeledPositions:
+    """Encoded positions with their phase, result and pawn terms, kept as a list of chunks rather than one copy."""
+
+    def __init__(self) -> None:
+        # (encoded, phase, result halves, (midgame, endgame) pawn structure terms)
+        self.chunks: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return sum(len(chunk[2]) for chunk in self.chunks)
+
+    def add(self, fens: List[str], halves: List[int]) -> None:
+        """Encode and append one chunk; malformed FENs are dropped and counted as skipped."""
+        try:
+            encoded = encode_fens(fens)
+        except ValueError:
+            kept = [index for index, fen in enumerate(fens) if _well_formed(fen)]
+            self.skipped += len(fens) - len(kept)
+            if not kept:
+                return
+            encoded = encode_fens([fens[index] for index in kept])
+            halves = [halves[index] for index in kept]
+        phase = np.minimum(PHASE_ARRAY[encoded].sum(axis=1), MAX_PHASE).astype(np.int8)
+        pawns = np.stack(pawn_terms(encoded), axis=1).astype(np.int16)
+        self.chunks.append((encoded, phase, np.array(halves, dtype=np.int8), pawns))
+
+    @classmethod
+    def load(cls, path: str, chunk_size: int = DEFAULT_CHUNK, limit: Optional[int] = None) -> 'LabeledPositions':
+        """Stream a labeled file into chunks; lines without a result are skipped."""
+        positions = cls()
+        fens, halves = [], []
+        read = 0
+        with open(path) as lines:
+            for line in lines:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if limit is not None and read >= limit:
+                    break
+                labeled = parse_labeled_line(line)
+                if labeled is None:
+                    positions.skipped += 1
+                    continue
+                read += 1
+                fens.append(labeled[0])
+                halves.append(labeled[1])
+                if len(fens) >= chunk_size:
+                    positions.add(fens, halves)
+                    fens, halves = [], []
+        if fens:
+            positions.add(fens, halves)
+        return positions
+
+def _well_formed(fen: str) -> bool:
+    try:
+        encode_fens([fen])
+    except ValueError:
+        return False
+    return True
+
+class TexelTuner:
+    """
+    The evaluation as a linear model: per-type material plus midgame and
+    endgame piece-square entries, tapered by phase, for white minus black,
+    plus the fixed pawn structure terms. Entries are indexed by piece type and square from white's side, the
+    layout positional_dict's tables are written in.
+    """
+
+    def __init__(self, piece_values: Dict[str, int] = None, tables: Dict[str, list] = None) -> None:
+        piece_values = positional_data.piece_values if piece_values is None else piece_values
+        tables = positional_data.positional_dict if tables is None else tables
+        self.material = np.array([piece_values.get(name, 0) for name in PIECE_TYPES], dtype=np.float64)
+        # (phase, piece type * 64 + row * 8 + column), row 0 being the first rank
+        self.tables = np.array([[value for name in PIECE_TYPES for row in tables[name][phase] for value in row]
+                                for phase in (0, 1)], dtype=np.float64)
+        self.scale = 1.0
+
+    @staticmethod
+    def features(encoded: np.ndarray, phase: np.ndarray):
+        """
+        The occupied squares of a batch as flat arrays: position, piece type,
+        table entry, +1/-1 for white/black, and the midgame weight of the position.
+        """
+        positions, squares = np.nonzero(encoded)
+        indices = encoded[positions, squares].astype(np.int64) - 1
+        black = indices >= len(PIECE_TYPES)
+        piece_types = indices % len(PIECE_TYPES)
+        # Black pieces read the tables upside down, as build_piece_square_tables does
+        entries = piece_types * 64 + np.where(black, squares ^ 56, squares)
+        signs = np.where(black, -1.0, 1.0)
+        return positions, piece_types, entries, signs, phase.astype(np.float64) / MAX_PHASE
+
+    def scores(self, batch, features=None) -> np.ndarray:
+        """White-relative scores of (encoded, phase, ...) batch, as the engine computes them without rounding."""
+        encoded, phase, pawns = batch[0], batch[1], batch[3]
+        positions, piece_types, entries, signs, midgame = features or self.features(encoded, phase)
+        weight = midgame[positions]
+        values = signs * (self.material[piece_types] + weight * self.tables[0][entries]
+                          + (1 - weight) * self.tables[1][entries])
+        return (np.bincount(positions, weights=values, minlength=len(encoded))
+                + midgame * pawns[:, 0] + (1 - midgame) * pawns[:, 1])
+
+    def _win_probability(self, scores: np.ndarray, scale: float) -> np.ndarray:
+        return 1 / (1 + np.power(10.0, -scale * scores / 400))
+
+    def loss(self, positions: LabeledPositions, scale: float = None) -> float:
+        """Mean squared error between the results and the sigmoid of the scores."""
+        scale = self.scale if scale is None else scale
+        total = 0.0
+        for chunk in positions.chunks:
+            errors = chunk[2] / 2 - self._win_probability(self.scores(chunk), scale)
+            total += float(np.dot(errors, errors))
+        return total / max(len(positions), 1)
+
+    def fit_scale(self, positions: LabeledPositions, low: float = 0.05, high: float = 5.0,
+                  iterations: int = 40) -> float:
+        """Golden-section search for the sigmoid scale that best fits the current values."""
+        scores = [(self.scores(chunk), chunk[2] / 2) for chunk in positions.chunks]
+
+        def loss(scale):
+            return sum(float(np.sum((results - self._win_probability(chunk_scores, scale)) ** 2))
+                       for chunk_scores, results in scores)
+
+        ratio = (math.sqrt(5) - 1) / 2
+        a, b = low, high
+        c, d = b - ratio * (b - a), a + ratio * (b - a)
+        loss_c, loss_d = loss(c), loss(d)
+        for _ in range(iterations):
+            if loss_c < loss_d:
+                b, d, loss_d = d, c, loss_c
+                c = b - ratio * (b - a)
+                loss_c = loss(c)
+            else:
+                a, c, loss_c = c, d, loss_d
+                d = a + ratio * (b - a)
+                loss_d = loss(d)
+        self.scale = (a + b) / 2
+        return self.scale
+
+    def gradient(self, batch):
+        """Loss gradients for (material, tables) over one batch."""
+        features = self.features(batch[0], batch[1])
+        positions, piece_types, entries, signs, midgame = features
+        probabilities = self._win_probability(self.scores(batch, features), self.scale)
+        # d loss / d score per position, then spread over the pieces standing in it
+        slopes = (-2 / len(batch[2]) * (batch[2] / 2 - probabilities) * probabilities * (1 - probabilities)
+                  * LOG10 * self.scale / 400)
+        weights = slopes[positions] * signs
+        material = np.bincount(piece_types, weights=weights, minlength=len(PIECE_TYPES))
+        material[-1] = 0  # the king's value cancels out
+        weight = midgame[positions]
+        tables = np.stack([np.bincount(entries, weights=weights * weight, minlength=self.tables.shape[1]),
+                           np.bincount(entries, weights=weights * (1 - weight), minlength=self.tables.shape[1])])
+        return material, tables
+
+    def train(self, positions: LabeledPositions, epochs: int = 10, batch_size: int = 16384,
+              learning_rate: float = 1.0, seed: int = 0, on_epoch=None) -> None:
+        """Adam over shuffled mini-batches; on_epoch(epoch, loss) is called after each pass."""
+        rng = np.random.default_rng(seed)
+        parameters = (self.material, self.tables)
+        first = [np.zeros_like(parameter) for parameter in parameters]
+        second = [np.zeros_like(parameter) for parameter in parameters]
+        beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+        step = 0
+        for epoch in range(1, epochs + 1):
+            for chunk_index in rng.permutation(len(positions.chunks)):
+                chunk = positions.chunks[chunk_index]
+                order = rng.permutation(len(chunk[2]))
+                for start in range(0, len(order), batch_size):
+                    rows = order[start:start + batch_size]
+                    gradients = self.gradient(tuple(array[rows] for array in chunk))
+                    step += 1
+                    for parameter, gradient, mean, variance in zip(parameters, gradients, first, second):
+                        mean *= beta1
+                        mean += (1 - beta1) * gradient
+                        variance *= beta2
+                        variance += (1 - beta2) * gradient * gradient
+                        corrected_mean = mean / (1 - beta1 ** step)
+                        corrected_variance = variance / (1 - beta2 ** step)
+                        parameter -= learning_rate * corrected_mean / (np.sqrt(corrected_variance) + epsilon)
+            if on_epoch:
+                on_epoch(epoch, self.loss(positions))
+
+    def piece_values(self) -> Dict[str, int]:
+        return {name: int(round(value)) for name, value in zip(MATERIAL_TYPES, self.material)}
+
+    def positional_dict(self) -> Dict[str, list]:
+        tables = np.rint(self.tables).astype(int).reshape(2, len(PIECE_TYPES), 8, 8)
+        return {name: [tables[phase][index].tolist() for phase in (0, 1)] for index, name in enumerate(PIECE_TYPES)}
+
+def write_positional_data(path: str, piece_values: Dict[str, int], tables: Dict[str, list]) -> None:
+    """Write a module laid out like positional_data.py with the given values."""
+    lines = ['from Utils import flip_table', '', f'openings = {positional_data.openings!r}', '',
+             f'piece_values = {piece_values!r}', '', 'positional_dict = {']
+    for name, (midgame, endgame) in tables.items():
+        lines.append(f'{name!r}: [[')
+        lines.extend(f'    [{",".join(str(value) for value in row)}],' for row in midgame)
+        lines.append('],')
+        lines.append('[')
+        lines.extend(f'    [{",".join(str(value) for value in row)}],' for row in endgame)
+        lines.append(']],')
+        lines.append('')
+    lines[-1] = '}'
+    lines.append('')
+    lines.append(inspect.getsource(positional_data.postional_values))
+    with open(path, 'w') as module:
+        module.write('\n'.join(lines))
+
+def main():
+    parser = argparse.ArgumentParser(description='Tune material and piece-square values on labeled positions')
+    parser.add_argument('positions', help='file of FENs labeled with game results')
+    parser.add_argument('--output', default='tuned_data.py', help='module to write the tuned values to')
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=16384)
+    parser.add_argument('--learning-rate', type=float, default=1.0, help='Adam step size in centipawns')
+    parser.add_argument('--scale', type=float, help='sigmoid scale, fitted to the starting values by default')
+    parser.add_argument('--limit', type=int, help='use at most this many positions')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    positions = LabeledPositions.load(args.positions, limit=args.limit)
+    print(f'loaded {len(positions)} positions ({positions.skipped} skipped) in {time.perf_counter() - start:.1f}s',
+          file=sys.stderr)
+    if not len(positions):
+        raise SystemExit('no labeled positions to tune on')
+
+    tuner = TexelTuner()
+    if args.scale:
+        tuner.scale = args.scale
+    else:
+        tuner.fit_scale(positions)
+    print(f'scale {tuner.scale:.4f}  loss {tuner.loss(positions):.6f}', file=sys.stderr)
+
+    def report(epoch, loss):
+        print(f'epoch {epoch}  loss {loss:.6f}  {time.perf_counter() - start:.1f}s', file=sys.stderr)
+
+    tuner.train(positions, args.epochs, args.batch_size, args.learning_rate, args.seed, report)
+    write_positional_data(args.output, tuner.piece_values(), tuner.positional_dict())
+    print(f'wrote {args.output}', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""
+UCI front-end, so GUIs and match tools can drive the engine over stdin/stdout:
+
+    python uci.py
+
+Searches run on a background thread so stop, isready and quit are answered
+while the engine thinks. Supported options are Hash (MB), Threads
+(root-splitting worker processes), BookFile (a Polyglot book to play
+from before searching) and TablebasePath (a directory of tables written by
+tbgen.py); empty paths turn the last two off.
+"""
+import sys
+import threading
+from typing import Callable, List, Optional
+
+from AI import MATE_BOUND, MATE_SCORE, MAX_DEPTH, Player
+from ChessBoard import ChessBoard, START_FEN
+from OpeningBook import OpeningBook
+from Tablebase import Tablebase
+from TranspositionTable import TranspositionTable
+from Utils import move_to_uci, uci_to_move
+
+ENGINE_NAME = 'Python Chess Engine'
+ENGINE_AUTHOR = 'Python Chess Engine contributors'
+DEFAULT_HASH_MB = 16
+MAX_HASH_MB = 1024
+MAX_THREADS = 64
+
+class UCIEngine:
+    """One UCI session: parse commands with handle() and write replies through output."""
+
+    def __init__(self, output: Optional[Callable[[str], None]] = None, board_class=ChessBoard) -> None:
+        self.output = output or self._print
+        self.board_class = board_class
+        self.board = board_class()
+        self.hash_mb = DEFAULT_HASH_MB
+        self.book: Optional[OpeningBook] = None
+        self.tablebase: Optional[Tablebase] = None
+        self.player = self._new_player(workers=1)
+        self.search_thread: Optional[threading.Thread] = None
+        self.infinite = False
+        self.stop_requested = threading.Event()  # lets an infinite search finish before printing bestmove
+        self._output_lock = threading.Lock()
+
+    @staticmethod
+    def _print(line: str) -> None:
+        sys.stdout.write(line + '\n')
+        sys.stdout.flush()
+
+    def send(self, line: str) -> None:
+        with self._output_lock:
+            self.output(line)
+
+    def _new_player(self, workers: int) -> Player:
+        player = Player('white', human=False, hash_mb=self.hash_mb, workers=workers, book=self.book,
+                        tablebase=self.tablebase)
+        player.opening_book = {}  # GUIs supply their own books, or set BookFile
+        player.on_iteration = self.send_info
+        return player
+
+    def handle(self, line: str) -> bool:
+        """Process one command line; returns False on quit."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, arguments = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.send(f'id name {ENGINE_NAME}')
+            self.send(f'id author {ENGINE_AUTHOR}')
+            self.send(f'option name Hash type spin default {DEFAULT_HASH_MB} min 1 max {MAX_HASH_MB}')
+            self.send(f'option name Threads type spin default 1 min 1 max {MAX_THREADS}')
+            self.send('option name BookFile type string default <empty>')
+            self.send('option name TablebasePath type string default <empty>')
+            self.send('uciok')
+        elif command == 'isready':
+            self.send('readyok')
+        elif command == 'ucinewgame':
+            self.stop()
+            self.player.transposition_table.clear()
+            self.player.history = [0] * len(self.player.history)
+            self.board = self.board_class()
+        elif command == 'setoption':
+            self.stop()
+            self.set_option(arguments)
+        elif command == 'position':
+            self.stop()
+            self.set_position(arguments)
+        elif command == 'go':
+            self.stop()
+            self.go(arguments)
+        elif command == 'stop':
+            self.stop()
+        elif command == 'quit':
+            self.stop()
+            self.player.close()
+            if self.book is not None:
+                self.book.close()
+            if self.tablebase is not None:
+                self.tablebase.close()
+            return False
+        return True
+
+    def set_option(self, arguments: List[str]) -> None:
+        # setoption name <id> [value <x>]
+        if 'name' not in arguments:
+            return
+        value_index = arguments.index('value') if 'value' in arguments else len(arguments)
+        name = ' '.join(arguments[arguments.index('name') + 1:value_index]).lower()
+        value = ' '.join(arguments[value_index + 1:])
+        try:
+            if name == 'hash':
+                self.hash_mb = min(max(int(value), 1), MAX_HASH_MB)
+                self.player.transposition_table = TranspositionTable(self.hash_mb)
+            elif name == 'threads':
+                workers = min(max(int(value), 1), MAX_THREADS)
+                self.player.close()
+                self.player = self._new_player(workers)
+            elif name == 'bookfile':
+                if self.book is not None:
+                    self.book.close()
+                self.book = OpeningBook(value) if value and value != '<empty>' else None
+                self.player.book = self.book
+            elif name == 'tablebasepath':
+                if self.tablebase is not None:
+                    self.tablebase.close()
+                self.tablebase = Tablebase(value) if value and value != '<empty>' else None
+                self.player.tablebase = self.tablebase
+                self.player.close()  # parallel workers get the tables when their pool restarts
+        except OSError as error:
+            self.send(f'info string cannot open {value!r}: {error}')
+            if name == 'bookfile':
+                self.book = self.player.book = None
+            else:
+                self.tablebase = self.player.tablebase = None
+        except ValueError:
+            self.send(f'info string invalid value {value!r} for option {name}')
+
+    def set_position(self, arguments: List[str]) -> None:
+        # position [startpos | fen <fen>] [moves <move> ...]
+        moves_index = arguments.index('moves') if 'moves' in arguments else len(arguments)
+        if arguments and arguments[0] == 'fen':
+            fen = ' '.join(arguments[1:moves_index])
+        else:
+            fen = START_FEN
+        try:
+            board = self.board_class.from_fen(fen)
+            for text in arguments[moves_index + 1:]:
+                move = uci_to_move(text)
+                if (move[0], move[1]) not in [(legal[0], legal[1]) for legal in board.generate_moves(board.to_move)]:
+                    raise ValueError(f'illegal move {text}')
+                board.make_move(move)
+        except (ValueError, KeyError, IndexError) as error:
+            self.send(f'info string bad position: {error}')
+            return
+        self.board = board
+
+    def go(self, arguments: List[str]) -> None:
+        # go [depth d] [movetime ms] [wtime ms] [btime ms] [winc ms] [binc ms] [infinite]
+        options = {}
+        for index, token in enumerate(arguments):
+            if token in ('depth', 'movetime', 'wtime', 'btime', 'winc', 'binc'):
+                try:
+                    options[token] = int(arguments[index + 1])
+                except (ValueError, IndexError):
+                    self.send(f'info string invalid value for go {token}')
+        self.infinite = 'infinite' in arguments
+        color = self.board.to_move
+        depth = options.get('depth')
+        movetime = options['movetime'] / 1000 if 'movetime' in options else None
+        clock = options.get('wtime' if color == 'white' else 'btime')
+        time_left = clock / 1000 if clock is not None else None
+        increment = options.get('winc' if color == 'white' else 'binc', 0) / 1000
+        if depth is None and movetime is None and time_left is None:
+            depth = MAX_DEPTH  # infinite, or go with no limits: search until stop
+
+        self.player.color = color
+        # Clears a stop left by stop() on the workers' shared event as well as the player's own
+        self.player.finish_search()
+        self.stop_requested.clear()
+        board = self.board.clone()
+        self.search_thread = threading.Thread(target=self._search, args=(board, depth, movetime, time_left, increment),
+                                              daemon=True)
+        self.search_thread.start()
+
+    def _search(self, board, depth, movetime, time_left, increment) -> None:
+        move = self.player.select_move(board, depth=depth, movetime=movetime, time_left=time_left, increment=increment)
+        if self.infinite:
+            # UCI forbids bestmove before stop during go infinite, even if the search ended on its own
+            self.stop_requested.wait()
+        self.send(f'bestmove {move_to_uci(move) if move else "0000"}')
+
+    def stop(self) -> None:
+        """End a running search and wait for its bestmove to be sent."""
+        if self.search_thread is not None:
+            self.stop_requested.set()
+            if self.search_thread.is_alive():
+                self.player.stop()
+            self.search_thread.join()
+            self.search_thread = None
+
+    def send_info(self, depth: int, score: int, nodes: int, seconds: float, pv: list) -> None:
+        if abs(score) >= MATE_BOUND:
+            moves_to_mate = (MATE_SCORE - abs(score) + 1) // 2
+            score_text = f'mate {moves_to_mate if score > 0 else -moves_to_mate}'
+        else:
+            score_text = f'cp {int(score)}'
+        nps = int(nodes / seconds) if seconds > 0 else 0
+        self.send(f'info depth {depth} seldepth {max(depth, self.player.stats.seldepth)} score {score_text}'
+                  f' nodes {nodes} nps {nps} time {int(seconds * 1000)}'
+                  f' pv {" ".join(move_to_uci(move) for move in pv)}')
+
+def main():
+    engine = UCIEngine()
+    # Read through a second file object on the same descriptor: forked worker processes close
+    # sys.stdin at startup and would deadlock on its lock while this thread waits for input
+    commands = open(sys.stdin.fileno(), closefd=False)
+    for line in commands:
+        if not engine.handle(line):
+            break
+    else:
+        engine.stop()
+        engine.player.close()
+
+if __name__ == '__main__':
+    main()